@@ -0,0 +1,38 @@
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+import pandas as pd
+
+from default_repo.utils.fingerprint_backfill import backfill_fingerprints
+from default_repo.utils.trip_services import get_service, resolve_services
+from default_repo.utils.warehouse import get_warehouse
+
+
+@custom
+def backfill_trip_fp(*args, **kwargs) -> pd.DataFrame:
+    """
+    Migración única: completa `trip_fp` en BRONZE para las filas cargadas antes de
+    que copy_into_bronze calculara la huella (utils/fingerprint_backfill), con la
+    misma función que la carga. Después corresponde reconstruir silver y gold una
+    vez (trigger_gold_incremental con full_refresh=True).
+    kwargs:
+      - warehouse / duckdb_path / database / schema (como copy_into_bronze)
+      - services (list, default ['yellow','green'])
+    Retorna las filas completadas por partición.
+    """
+    warehouse = get_warehouse(kwargs)
+    db = kwargs.get('database') or warehouse.database
+    schema = kwargs.get('schema') or warehouse.schema('raw')
+    services = resolve_services(kwargs.get('services'))
+    conn = warehouse.connect(schema)
+    try:
+        # tablas de antes de la huella: el registro agrega la columna trip_fp si falta
+        registry = warehouse.registry(db, schema)
+        for service in services:
+            svc = get_service(service)
+            registry.ensure(conn, svc.table, svc.column_types, refresh=True)
+        out = backfill_fingerprints(conn, db, schema, services=services, writer=warehouse.write_pandas)
+    finally:
+        conn.close()
+    print(f"[trip_fp] {len(out)} particiones | {int(out['rows'].sum()) if len(out) else 0} filas completadas")
+    return out
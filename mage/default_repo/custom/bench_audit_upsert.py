@@ -0,0 +1,125 @@
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+import statistics
+import time
+
+import pandas as pd
+
+from default_repo.data_exporters.sync_coverage_to_audit_py import (
+    _audit_rows, _coverage_rows, _ensure_tables, _write_delete_insert, _write_merge,
+)
+from default_repo.utils.warehouse import Warehouse, get_warehouse
+
+YEARS_PER_SERVICE = 11  # 2015..2025 -> 132 particiones por servicio
+
+
+def _partitions(n: int, run: str) -> pd.DataFrame:
+    """`n` claves (service_type, year, month): 264 = la malla real green/yellow 2015-2025."""
+    per_service = YEARS_PER_SERVICE * 12
+    rows = []
+    for i in range(n):
+        s = i // per_service
+        service = ('green', 'yellow')[s] if s < 2 else f'svc{s:03d}'
+        rows.append({
+            'service_type': service,
+            'year': 2015 + (i % per_service) // 12,
+            'month': i % 12 + 1,
+            'row_count': (i * 7919) % 3_000_000,
+            'latest_ingest_ts': '2025-01-01 00:00:00',
+            'run_id': run,
+        })
+    return pd.DataFrame(rows)
+
+
+def _frames(n: int, run: str):
+    counts = _partitions(n, run)
+    audit_df = _audit_rows(counts)
+    return audit_df, _coverage_rows(counts, audit_df, 'bench')
+
+
+def _reset(wh: Warehouse, conn, db: str, schema: str, n: int) -> None:
+    """Deja ambas tablas con las `n` claves de una sincronización anterior."""
+    audit_df, cov_df = _frames(n, 'previous')
+    cur = conn.cursor()
+    try:
+        _write_delete_insert(conn, cur, db, schema, audit_df, cov_df, truncate=True, write_pandas=wh.write_pandas)
+    finally:
+        cur.close()
+
+
+def _run(wh: Warehouse, variant: str, conn, db: str, schema: str, n: int) -> float:
+    audit_df, cov_df = _frames(n, variant)
+    t0 = time.perf_counter()
+    if variant == 'merge':
+        _write_merge(conn, db, schema, audit_df, cov_df, truncate=False, write_pandas=wh.write_pandas)
+    else:
+        cur = conn.cursor()
+        try:
+            _write_delete_insert(conn, cur, db, schema, audit_df, cov_df, truncate=(variant == 'truncate'),
+                                 write_pandas=wh.write_pandas)
+        finally:
+            cur.close()
+    return time.perf_counter() - t0
+
+
+@custom
+def run_benchmark(*args, **kwargs) -> pd.DataFrame:
+    """
+    Escritura de LOAD_AUDIT + COVERAGE_MATRIX en sync_coverage_to_audit_py:
+      - delete_insert: DELETE ... where (service_type,year,month) in (<lista de claves>) + write_pandas
+      - truncate:      TRUNCATE de ambas tablas + write_pandas
+      - merge:         tabla temporal por destino + MERGE de ambas en una transacción
+    Antes de cada iteración las tablas se cargan con las mismas claves (sincronización
+    anterior), así que cada variante reescribe todas las particiones.
+    Corre en un schema aparte que se crea y se borra al final.
+    kwargs:
+      - partitions (list[int], default [264, 10000])
+      - iterations (int, default 3) -> se reporta la mediana
+      - schema     (str, default 'AUDIT_BENCH')
+      - keep       (bool, default False) -> no borra el schema al terminar
+      - warehouse / duckdb_path -> backend (utils/warehouse; default Snowflake)
+    """
+    sizes = [int(n) for n in kwargs.get('partitions', [264, 10_000])]
+    iterations = int(kwargs.get('iterations', 3))
+    wh = get_warehouse(kwargs)
+    db = wh.database
+    schema = kwargs.get('schema', 'AUDIT_BENCH')
+
+    conn = wh.connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"create schema if not exists {db}.{schema}")
+        cur.close()
+    finally:
+        conn.close()
+
+    rows = []
+    conn = wh.connect(schema)
+    try:
+        _ensure_tables(conn, wh.registry(db, schema), refresh=True)
+        for n in sizes:
+            for variant in ('delete_insert', 'truncate', 'merge'):
+                times = []
+                for _ in range(iterations):
+                    _reset(wh, conn, db, schema, n)
+                    times.append(_run(wh, variant, conn, db, schema, n))
+                rows.append({
+                    'partitions': n, 'variant': variant, 'iterations': iterations,
+                    'median_s': round(statistics.median(times), 3),
+                    'min_s': round(min(times), 3),
+                })
+                print(f"[bench_audit_upsert] n={n:>6} {variant:13s} mediana={rows[-1]['median_s']}s | "
+                      f"min={rows[-1]['min_s']}s")
+    finally:
+        if not kwargs.get('keep', False):
+            cur = conn.cursor()
+            try: cur.execute(f"drop schema if exists {db}.{schema} cascade")
+            except Exception: pass
+            cur.close()
+        conn.close()
+
+    out = pd.DataFrame(rows)
+    base = out[out['variant'] == 'delete_insert'].set_index('partitions')['median_s']
+    out['speedup'] = (out['partitions'].map(base) / out['median_s']).round(2)
+    return out
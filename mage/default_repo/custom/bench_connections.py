@@ -0,0 +1,102 @@
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+import statistics
+import time
+
+import pandas as pd
+from mage_ai.data_preparation.shared.secrets import get_secret_value
+
+from default_repo.utils.snowflake_pool import SnowflakePool, connect, ensure_once, reset_ddl
+
+
+def _legacy_ddl(conn, db: str, schema: str) -> None:
+    """DDL que cada bloque corría antes en cada ejecución (2 CREATE + 3 ALTER)."""
+    from default_repo.utils.trip_services import GREEN_DDL, YELLOW_DDL
+    cs = conn.cursor()
+    try:
+        cs.execute(YELLOW_DDL.format(db=db, schema=schema))
+        cs.execute(GREEN_DDL.format(db=db, schema=schema))
+        cs.execute(f"alter table if exists {db}.{schema}.yellow_trips add column if not exists cbd_congestion_fee float")
+        cs.execute(f"alter table if exists {db}.{schema}.green_trips  add column if not exists cbd_congestion_fee float")
+        cs.execute(f"alter table if exists {db}.{schema}.green_trips  add column if not exists ehail_fee float")
+    finally:
+        cs.close()
+
+
+def _bootstrap_ddl(conn, db: str, schema: str) -> None:
+    from default_repo.data_exporters.copy_into_bronze import _ensure_tables
+    _ensure_tables(conn, db, schema)
+
+
+def _run_direct(n: int, db: str, schema: str, ddl: bool) -> list:
+    """Antes: conexión nueva (sin keep-alive) + DDL completa en cada bloque."""
+    times = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        conn = connect(schema, client_session_keep_alive=False)
+        try:
+            if ddl:
+                _legacy_ddl(conn, db, schema)
+            cur = conn.cursor()
+            cur.execute('select 1'); cur.fetchone(); cur.close()
+        finally:
+            conn.close()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def _run_pool(n: int, db: str, schema: str, ddl: bool) -> list:
+    """Después: sesión del pool reutilizada + DDL una vez por proceso."""
+    pool = SnowflakePool()
+    reset_ddl('bench:')
+    times = []
+    try:
+        for _ in range(n):
+            t0 = time.perf_counter()
+            conn = pool.acquire(schema)
+            try:
+                if ddl:
+                    ensure_once(conn, f'bench:{db}.{schema}', lambda c: _bootstrap_ddl(c, db, schema))
+                cur = conn.cursor()
+                cur.execute('select 1'); cur.fetchone(); cur.close()
+            finally:
+                conn.close()
+            times.append(time.perf_counter() - t0)
+    finally:
+        pool.log_stats('[bench_connections]')
+        pool.close_all()
+    return times
+
+
+@custom
+def run_benchmark(*args, **kwargs) -> pd.DataFrame:
+    """
+    Tiempo de "abrir conexión y dejarla lista" por ejecución de bloque:
+    conexión directa por bloque (antes) vs pool compartido (utils/snowflake_pool).
+    Cada iteración simula un bloque: conexión + (opcional) DDL de BRONZE + `select 1`.
+    kwargs:
+      - iterations (int, default 5)
+      - ddl        (bool, default True) -> incluye CREATE/ALTER de las tablas BRONZE
+    """
+    n = int(kwargs.get('iterations', 5))
+    ddl = bool(kwargs.get('ddl', True))
+    db = get_secret_value('SNOWFLAKE_DATABASE')
+    schema = get_secret_value('SNOWFLAKE_SCHEMA_RAW')
+
+    rows = []
+    for name, fn in (('direct', _run_direct), ('pool', _run_pool)):
+        times = fn(n, db, schema, ddl)
+        rows.append({
+            'variant': name, 'iterations': n,
+            'first_s': round(times[0], 3),
+            'median_s': round(statistics.median(times), 3),
+            'total_s': round(sum(times), 3),
+        })
+        print(f"[bench_connections] {name:6s} primera={rows[-1]['first_s']}s | "
+              f"mediana={rows[-1]['median_s']}s | total={rows[-1]['total_s']}s")
+
+    out = pd.DataFrame(rows)
+    base = out.loc[out['variant'] == 'direct', 'total_s'].iloc[0]
+    out['speedup'] = (base / out['total_s']).round(2)
+    return out
@@ -0,0 +1,99 @@
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+import pandas as pd
+
+from default_repo.utils.benchmark import measure
+
+_MODULE = 'default_repo.custom.bench_coverage_frame'
+
+SCENARIOS = [
+    # (nombre, servicios, inicio, fin, freq)
+    ('month_2svc', ['yellow', 'green'], '2015-01', '2025-12', 'MS'),
+    ('month_4svc', ['yellow', 'green', 'fhv', 'fhvhv'], '2009-01', '2025-12', 'MS'),
+    ('day_4svc', ['yellow', 'green', 'fhv', 'fhvhv'], '2009-01-01', '2025-12-31', 'D'),
+    ('hour_4svc', ['yellow', 'green', 'fhv', 'fhvhv'], '2015-01-01', '2025-12-31 23:00', 'h'),
+    ('minute_4svc', ['yellow', 'green', 'fhv', 'fhvhv'], '2024-01-01', '2024-12-31 23:59', 'min'),
+]
+
+
+def _periods(start, end, freq) -> pd.DatetimeIndex:
+    return pd.date_range(start, pd.Timestamp(end) + pd.offsets.MonthEnd(0) if freq == 'MS' else end, freq=freq)
+
+
+# ===================== Workloads (corren en un proceso aparte) =====================
+def _run_loops(services, start, end, freq) -> int:
+    """Como antes: loops anidados + _build_url por fila + apply(axis=1) para estados."""
+    rows = []
+    for svc in services:
+        for p in _periods(start, end, freq):
+            rows.append((svc, p.year, p.month))
+    df = pd.DataFrame(rows, columns=['service_type', 'year', 'month'])
+    base = "https://d37ci6vzurychx.cloudfront.net/trip-data"
+    df['row_count'] = (df.index % 3) * 1000
+    df['url'] = df.apply(lambda r: f"{base}/{r['service_type']}_tripdata_{r['year']}-{r['month']:02d}.parquet", axis=1)
+    df['status'] = df['row_count'].apply(lambda x: 'OK' if x > 0 else 'MISSING')
+    df['has_parquet'] = df['row_count'] > 0
+    df['http_status'] = df['has_parquet'].apply(lambda v: 200 if bool(v) else None)
+    df['notes'] = None
+
+    def decide_status(row):
+        if pd.notnull(row.get('notes')) and str(row['notes']).startswith('error'):
+            return 'error'
+        if not row['has_parquet']:
+            return 'missing'
+        return 'ok' if row['row_count'] > 0 else 'pending'
+
+    df['load_status'] = df.apply(decide_status, axis=1)
+    return len(df)
+
+
+def _run_vectorized(services, start, end, freq) -> int:
+    from default_repo.utils.coverage_frame import audit_status, build_urls, grid, http_status, load_status
+    df = grid(services, start, end, freq)
+    df['row_count'] = (df.index % 3) * 1000
+    df['url'] = build_urls(df['service_type'], df['year'], df['month']).to_numpy()
+    df['status'] = audit_status(df['row_count'])
+    df['has_parquet'] = df['row_count'] > 0
+    df['http_status'] = http_status(df['has_parquet']).to_numpy()
+    df['notes'] = None
+    df['load_status'] = load_status(df['has_parquet'], df['row_count'], df['notes'])
+    return len(df)
+
+
+@custom
+def run_benchmark(*args, **kwargs) -> pd.DataFrame:
+    """
+    Construcción de frames de cobertura (malla + url + estados):
+    loops anidados + apply(axis=1) (antes) vs utils/coverage_frame (vectorizado),
+    de la malla mensual actual (264 particiones) a particiones por día/hora/minuto
+    con 4 servicios (yellow, green, fhv, fhvhv).
+    Cada variante corre en un proceso nuevo; se reportan filas/s y RSS pico.
+    kwargs:
+      - scenarios:       list[str] (default: todos los de SCENARIOS)
+      - loops_max_rows:  int (default 500_000) -> por encima se omite la variante con loops
+      - repeat:          repeticiones por variante, se toma la mejor (default 3)
+    """
+    wanted = kwargs.get('scenarios')
+    loops_max_rows = int(kwargs.get('loops_max_rows', 500_000))
+    repeat = int(kwargs.get('repeat', 3))
+
+    results = []
+    for name, services, start, end, freq in SCENARIOS:
+        if wanted and name not in wanted:
+            continue
+        partitions = len(_periods(start, end, freq)) * len(services)
+        for variant in ('loops', 'vectorized'):
+            if variant == 'loops' and partitions > loops_max_rows:
+                print(f"[bench_coverage_frame] {name:12s} loops omitido ({partitions:,} particiones > {loops_max_rows:,})")
+                continue
+            r = measure(f'{_MODULE}:_run_{variant}', services, start, end, freq, repeat=repeat)
+            r.update({'scenario': name, 'variant': variant, 'partitions': partitions})
+            results.append(r)
+            print(f"[bench_coverage_frame] {name:12s} {variant:10s} particiones={partitions:,} | "
+                  f"rows/s={r['rows_per_s']:,} | {r['seconds']}s | peak_rss={r['peak_rss_mb']} MB")
+
+    out = pd.DataFrame(results)[['scenario', 'variant', 'partitions', 'seconds', 'rows_per_s', 'peak_rss_mb']]
+    base = out[out['variant'] == 'loops'].set_index('scenario')['seconds']
+    out['speedup'] = (out['scenario'].map(base) / out['seconds']).round(1)
+    return out
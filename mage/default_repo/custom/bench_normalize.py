@@ -0,0 +1,86 @@
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from default_repo.utils.benchmark import measure
+from default_repo.utils.bronze_batches import normalize_batch_arrow, normalize_batch_pandas, utc_now_iso
+from default_repo.utils.sample_data import write_sample_trips
+from default_repo.utils.trip_services import get_service
+
+_MODULE = 'default_repo.custom.bench_normalize'
+
+
+# ===================== Workloads (corren en un proceso aparte) =====================
+def _batches(path: str, batch_size: int):
+    pf = pq.ParquetFile(path)
+    for rg in range(pf.num_row_groups):
+        tbl: pa.Table = pf.read_row_group(rg)
+        for start in range(0, tbl.num_rows, batch_size):
+            yield tbl.slice(start, batch_size)
+
+
+def _run_pandas(path: str, service: str, batch_size: int) -> int:
+    meta = {'run_id': 'bench', 'year': 2024, 'month': 1, 'service_type': service, 'source_url': path}
+    rows = 0
+    for slice_tbl in _batches(path, batch_size):
+        pdf = normalize_batch_pandas(slice_tbl, service, meta)
+        rows += len(pdf)
+    return rows
+
+
+def _run_arrow(path: str, service: str, batch_size: int) -> int:
+    column_types = get_service(service).column_types
+    meta = {'run_id': 'bench', 'year': 2024, 'month': 1, 'service_type': service, 'source_url': path}
+    rows = 0
+    for slice_tbl in _batches(path, batch_size):
+        pdf = normalize_batch_arrow(slice_tbl, column_types, {**meta, 'ingest_ts': utc_now_iso()})
+        rows += len(pdf)
+    return rows
+
+
+@custom
+def run_benchmark(*args, **kwargs) -> pd.DataFrame:
+    """
+    Microbenchmark de la normalización por batch de copy_into_bronze:
+    path pandas original (to_pandas + strftime) vs path Arrow (pyarrow.compute).
+    Cada variante corre en un proceso nuevo; se reportan filas/s y RSS pico.
+    kwargs:
+      - path:       Parquet local a usar (default: genera uno sintético)
+      - rows:       filas del Parquet sintético (default 3_000_000)
+      - service:    'yellow' | 'green' (default 'yellow')
+      - batch_size: filas por batch (default 400_000)
+      - repeat:     repeticiones por variante, se toma la mejor (default 3)
+    """
+    service = kwargs.get('service', 'yellow')
+    batch_size = int(kwargs.get('batch_size', 400_000))
+    repeat = int(kwargs.get('repeat', 3))
+    path = kwargs.get('path')
+    tmp_dir = None
+    if not path:
+        tmp_dir = tempfile.mkdtemp(prefix='bench_normalize_')
+        path = write_sample_trips(os.path.join(tmp_dir, f'{service}_sample.parquet'), service, 2024, 1,
+                                  int(kwargs.get('rows', 3_000_000)))
+
+    try:
+        results = []
+        for name in ('pandas', 'arrow'):
+            r = measure(f'{_MODULE}:_run_{name}', path, service, batch_size, repeat=repeat)
+            r['variant'] = name
+            results.append(r)
+            print(f"[bench_normalize] {name:6s} rows/s={r['rows_per_s']:,} | {r['seconds']}s | "
+                  f"peak_rss={r['peak_rss_mb']} MB (+{r['peak_rss_delta_mb']} MB)")
+    finally:
+        if tmp_dir:
+            try: os.remove(path); os.rmdir(tmp_dir)
+            except OSError: pass
+
+    out = pd.DataFrame(results)[['variant', 'rows', 'seconds', 'rows_per_s', 'peak_rss_mb', 'peak_rss_delta_mb']]
+    base = out.loc[out['variant'] == 'pandas', 'rows_per_s'].iloc[0]
+    out['speedup'] = (out['rows_per_s'] / base).round(2)
+    return out
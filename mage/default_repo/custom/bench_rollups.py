@@ -0,0 +1,182 @@
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from default_repo.utils.local_warehouse import DB_FILE, DBT_PROJECT, load_sample_partition, run_dbt, seed_bronze
+
+# Viajes de 2019-01 (README): la compresión de los rollups depende de cuántos viajes caen por hora x zona
+ROWS_2019_01 = {'yellow': 7_696_617, 'green': 672_105}
+
+# analysis/notebook/<nombre>.sql (fct_trips) vs analysis/rollups/rollup_<nombre>.sql -> (rollup leído, CSV de evidencia)
+ANALYSES = {
+    'demanda_zona_mes_pu':       ('agg_trips_pu_hourly', 'Demanda_por_zona_y_mes.csv'),
+    'demanda_zona_mes_do':       ('agg_trips_do_hourly', 'Demanda_por_zona_y_mes_DROPOFF.csv'),
+    'ingresos_borough_mes':      ('agg_trips_pu_hourly', 'Ingresos por borough y mes.csv'),
+    'ingresos_borough_mes_tips': ('agg_trips_pu_hourly', 'Ingresos_por_borough_y_mes_TIPS.csv'),
+    'velocidad_franja_horaria':  ('agg_trips_pu_hourly', 'Velocidad_promedio_por_franja_horaria.csv'),
+    'duracion_viaje':            ('agg_trip_minutes_daily', 'Duracion_del_viaje.csv'),
+    'elasticidad_temporal':      ('agg_trips_pu_hourly', 'Elasticidad_temporal.csv'),
+    'horas_pico':                ('agg_trips_pu_hourly', 'Horas_pico.csv'),
+}
+
+# El notebook usa approx_percentile; el rollup da el percentil exacto -> se compara contra quantile_disc
+EXACT_REFERENCE = {
+    'duracion_viaje': """
+        select dz.zone_id as pu_location_id,
+               quantile_disc(t.trip_minutes, 0.5) as p50_minutes,
+               quantile_disc(t.trip_minutes, 0.9) as p90_minutes,
+               count(*) as trips
+        from GOLD.fct_trips t
+        left join GOLD.dim_zone dz on dz.zone_sk = t.pu_zone_sk
+        where t.trip_minutes > 0 and t.trip_minutes < 240
+          and t.pickup_datetime between '2019-01-01' and '2019-12-31'
+        group by dz.zone_id""",
+}
+
+
+# ===================== helpers =====================
+def _compiled(project_dir: str, folder: str, name: str) -> str:
+    path = os.path.join(project_dir, 'target', 'compiled', 'nyc_tlc', 'analysis', folder, f'{name}.sql')
+    with open(path) as f:
+        return f.read()
+
+
+def _timed(con, sql: str, repeat: int):
+    best, df = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        df = con.execute(sql).df()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, df
+
+
+def _normalized(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df.columns = [c.lower() for c in df.columns]
+    for c in df.columns:
+        if pd.api.types.is_numeric_dtype(df[c]):
+            df[c] = df[c].astype('float64')
+    order = df.round(4).astype(str).sort_values(list(df.columns)).index
+    return df.loc[order].reset_index(drop=True)
+
+
+def _same(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    a, b = _normalized(a), _normalized(b)
+    if a.shape != b.shape or list(a.columns) != list(b.columns):
+        return False
+    for c in a.columns:
+        if pd.api.types.is_float_dtype(a[c]):
+            if not np.allclose(a[c], b[c], rtol=1e-9, atol=1e-6, equal_nan=True):
+                return False
+        elif not (a[c].fillna('').astype(str) == b[c].fillna('').astype(str)).all():
+            return False
+    return True
+
+
+def _compare(db_path: str, project_dir: str, repeat: int) -> list:
+    import duckdb
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        fct_rows = con.execute("select count(*) from GOLD.fct_trips").fetchone()[0]
+        out = []
+        for name, (rollup, _) in ANALYSES.items():
+            t_fct, df_fct = _timed(con, _compiled(project_dir, 'notebook', name), repeat)
+            t_roll, df_roll = _timed(con, _compiled(project_dir, 'rollups', f'rollup_{name}'), repeat)
+            reference = con.execute(EXACT_REFERENCE[name]).df() if name in EXACT_REFERENCE else df_fct
+            rollup_rows = con.execute(f"select count(*) from GOLD.{rollup}").fetchone()[0]
+            out.append({'analysis': name, 'rollup': rollup,
+                        'fct_seconds': round(t_fct, 4), 'rollup_seconds': round(t_roll, 4),
+                        'fct_rows_scanned': fct_rows, 'rollup_rows_scanned': rollup_rows,
+                        'match': _same(reference, df_roll), 'result': df_roll})
+        return out
+    finally:
+        con.close()
+
+
+@custom
+def run_benchmark(*args, **kwargs) -> pd.DataFrame:
+    """
+    Consultas del notebook (analysis/notebook, sobre fct_trips) vs las mismas
+    desde los rollups de gold (analysis/rollups), en DuckDB local con BRONZE de
+    utils/sample_data. Por consulta: segundos (mejor de `repeat`), filas de la
+    relación leída (fct_trips vs rollup) y si el resultado coincide (percentiles:
+    contra quantile_disc exacto sobre fct_trips). Después recarga un mes en
+    BRONZE, corre silver + fct_trips + rollups incrementales y vuelve a comparar.
+    Requiere duckdb, dbt-duckdb y `dbt deps` hecho en el proyecto dbt.
+    kwargs:
+      - services    (list[str], default ['yellow','green'])
+      - year        (int, default 2019)
+      - months      (list[int], default [1])
+      - rows        (int | dict, default ROWS_2019_01) -> filas por partición;
+                    con menos filas por mes que las reales los rollups comprimen menos
+      - repeat      (int, default 3)
+      - dbt_bin     (str, default 'dbt')
+      - project_dir (str, default dbt/nyc_tlc del repo)
+      - export_dir  (str, opcional) -> escribe los resultados de los rollups con
+                    los nombres / columnas de evidencia/notebook_result
+      - workdir     (str, default temporal) / keep (bool, default False)
+    """
+    services = list(kwargs.get('services', ['yellow', 'green']))
+    year = int(kwargs.get('year', 2019))
+    months = [int(m) for m in kwargs.get('months', [1])]
+    rows = kwargs.get('rows', ROWS_2019_01)
+    repeat = int(kwargs.get('repeat', 3))
+    dbt_bin = kwargs.get('dbt_bin') or shutil.which('dbt') or 'dbt'
+    project_dir = kwargs.get('project_dir') or DBT_PROJECT
+    export_dir = kwargs.get('export_dir')
+    workdir = kwargs.get('workdir') or tempfile.mkdtemp(prefix='bench_rollups_')
+    os.makedirs(workdir, exist_ok=True)
+    db_path = os.path.join(workdir, DB_FILE)
+
+    def dbt(args):
+        return run_dbt(args, db_path, dbt_bin, project_dir=project_dir)
+
+    try:
+        total = seed_bronze(db_path, services, year, months, rows)
+        gold = ['--target', 'duckdb_gold']
+        dbt(['run', '--select', '+silver_trips', '--target', 'duckdb'])
+        t_fct = dbt(['run', '--select', '+dim_payment_type', '+dim_ratecode', 'dim_zone', 'fct_trips', *gold])
+        t_rollups = dbt(['run', '--select', 'fct_trips+', '--exclude', 'fct_trips', *gold])
+        dbt(['compile', '--select', 'path:analysis', *gold])
+        print(f"[bench_rollups] BRONZE {total:,} filas | build gold {t_fct:.1f}s | build rollups {t_rollups:.1f}s")
+
+        results = _compare(db_path, project_dir, repeat)
+
+        # recarga de un mes + incremental de punta a punta, los rollups tienen que seguir cuadrando
+        import duckdb
+        con = duckdb.connect(db_path)
+        try:
+            reload_rows = rows[services[0]] if isinstance(rows, dict) else rows
+            load_sample_partition(con, services[0], year, months[0], reload_rows, seed=999)
+        finally:
+            con.close()
+        dbt(['run', '--select', 'silver_trips', '--target', 'duckdb'])
+        t_reload = dbt(['run', '--select', 'fct_trips+', *gold])
+        after = {r['analysis']: r['match'] for r in _compare(db_path, project_dir, 1)}
+        print(f"[bench_rollups] recarga {services[0]}-{year}-{months[0]:02d}: fct_trips + rollups {t_reload:.1f}s")
+    finally:
+        if not kwargs.get('keep', False) and not kwargs.get('workdir'):
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if export_dir:
+        os.makedirs(export_dir, exist_ok=True)
+        for r in results:
+            df = r['result'].rename(columns=str.upper)
+            df.to_csv(os.path.join(export_dir, ANALYSES[r['analysis']][1]), encoding='utf-8-sig')
+
+    out = pd.DataFrame([{k: v for k, v in r.items() if k != 'result'} for r in results])
+    out['speedup'] = (out['fct_seconds'] / out['rollup_seconds']).round(1)
+    out['scan_fraction'] = (out['rollup_rows_scanned'] / out['fct_rows_scanned']).round(4)
+    out['match_after_reload'] = out['analysis'].map(after)
+    for r in out.itertuples():
+        print(f"[bench_rollups] {r.analysis:26s} fct {r.fct_seconds:.3f}s  rollup {r.rollup_seconds:.3f}s  "
+              f"x{r.speedup}  filas {r.scan_fraction:.2%}  match={r.match}/{r.match_after_reload}")
+    return out
@@ -0,0 +1,182 @@
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from default_repo.utils.local_warehouse import DB_FILE, load_sample_partition, run_dbt, seed_bronze
+
+# Consultas de notebooks/data_analysis.ipynb (dialecto DuckDB: approx_quantile)
+NOTEBOOK_QUERIES = {
+    'top_pu_zones': """
+        with base as (
+          select t.year, t.month, dz.zone_id, dz.borough, dz.zone, count(*) as trips
+          from GOLD.FCT_TRIPS t
+          left join GOLD.DIM_ZONE dz on dz.zone_sk = t.pu_zone_sk
+          where t.pickup_datetime between '2019-01-01' and '2019-12-31'
+          group by 1,2,3,4,5
+        ),
+        ranked as (select *, row_number() over (partition by year, month order by trips desc) as rn from base)
+        select year, month, zone_id, borough, zone, trips from ranked where rn <= 10 order by year, month, trips desc""",
+    'revenue_tips_borough': """
+        select dz.borough, t.year, t.month,
+               sum(t.total_amount) as revenue_gross_usd,
+               sum(coalesce(t.tip_amount,0)) as tips_usd,
+               round(nullif(sum(coalesce(t.tip_amount,0)),0) / nullif(sum(t.total_amount),0) * 100, 2) as tip_pct
+        from GOLD.FCT_TRIPS t
+        left join GOLD.DIM_ZONE dz on dz.zone_sk = t.pu_zone_sk
+        where t.pickup_datetime >= '2019-01-01' and t.pickup_datetime < '2020-01-01'
+        group by 1,2,3 order by 2,3,1""",
+    'speed_day_night': """
+        with base as (
+          select dz.borough,
+                 case when extract(hour from t.pickup_datetime) between 6 and 21 then 'day' else 'night' end as band,
+                 sum(t.trip_distance) as sum_miles, sum(t.trip_minutes) as sum_minutes
+          from GOLD.FCT_TRIPS t
+          left join GOLD.DIM_ZONE dz on dz.zone_sk = t.pu_zone_sk
+          where t.trip_distance is not null and t.trip_minutes > 0
+            and t.pickup_datetime between '2019-01-01' and '2019-12-31'
+          group by 1,2
+        )
+        select borough, band, round(sum_miles / nullif(sum_minutes,0) * 60, 2) as avg_mph from base order by 1,2""",
+    'duration_percentiles': """
+        select dz.zone_id as pu_location_id,
+               approx_quantile(t.trip_minutes, 0.5) as p50_minutes,
+               approx_quantile(t.trip_minutes, 0.9) as p90_minutes,
+               count(*) as trips
+        from GOLD.FCT_TRIPS t
+        left join GOLD.DIM_ZONE dz on dz.zone_sk = t.pu_zone_sk
+        where t.trip_minutes > 0 and t.trip_minutes < 240
+          and t.pickup_datetime between '2019-01-01' and '2019-12-31'
+        group by dz.zone_id order by trips desc""",
+    'trips_dow_hour': """
+        select dayofweek(t.pickup_datetime) as dow, extract(hour from t.pickup_datetime) as hh, count(*) as trips
+        from GOLD.FCT_TRIPS t
+        where t.pickup_datetime between '2019-01-01' and '2019-12-31'
+        group by 1,2 order by 1,2""",
+}
+
+# Las mismas preguntas directo sobre silver (lo que leen los tests de dbt y el watermark de fct_trips)
+SILVER_QUERIES = {
+    'silver_revenue_borough': """
+        select pu_borough, year, month, sum(total_amount_clean) as revenue_usd
+        from SILVER.silver_trips
+        where pickup_datetime between '2019-01-01' and '2019-12-31'
+        group by 1,2,3 order by 2,3,1""",
+    'silver_trips_hour': """
+        select extract(hour from pickup_datetime) as hh, count(*) as trips
+        from SILVER.silver_trips
+        where pickup_datetime between '2019-03-01' and '2019-03-31'
+        group by 1 order by 1""",
+}
+
+
+# ===================== consultas / dbt =====================
+def _queries(path: str, queries: dict, repeat: int) -> dict:
+    import duckdb
+    con = duckdb.connect(path, read_only=True)
+    try:
+        out = {}
+        for name, sql in queries.items():
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                con.execute(sql).fetchall()
+                times.append(time.perf_counter() - t0)
+            out[name] = min(times)
+        return out
+    finally:
+        con.close()
+
+
+def _run_variant(variant: str, seed_path: str, workdir: str, dbt_bin: str, project_dir: str, reload: tuple,
+                 rows: int, repeat: int) -> list:
+    db_path = os.path.join(workdir, variant, DB_FILE)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    shutil.copyfile(seed_path, db_path)
+
+    def dbt(args, check=True):
+        return run_dbt(args, db_path, dbt_bin, check=check, project_dir=project_dir)
+
+    silver_vars = ['--vars', f'{{"silver_materialization": "{variant}"}}']
+    gold = ['--select', '+dim_payment_type', '+dim_ratecode', 'dim_zone', 'fct_trips', '--target', 'duckdb_gold']
+
+    steps = [
+        ('build_silver', dbt(['run', '--select', '+silver_trips', '--target', 'duckdb', *silver_vars])),
+        ('build_gold', dbt(['run', *gold, '--full-refresh'])),
+        ('test_silver', dbt(['test', '--select', 'silver_trips', '--target', 'duckdb', *silver_vars], check=False)),
+    ]
+    steps += [(f'query:{k}', v) for k, v in _queries(db_path, NOTEBOOK_QUERIES, repeat).items()]
+    steps += [(f'query:{k}', v) for k, v in _queries(db_path, SILVER_QUERIES, repeat).items()]
+
+    # recarga de una partición en BRONZE + corrida incremental de silver y fct_trips
+    import duckdb
+    con = duckdb.connect(db_path)
+    try:
+        load_sample_partition(con, *reload, rows, seed=999)
+    finally:
+        con.close()
+    t_silver = dbt(['run', '--select', 'silver_trips', '--target', 'duckdb', *silver_vars])
+    t_gold = dbt(['run', '--select', 'fct_trips', '--target', 'duckdb_gold'])
+    steps += [('reload_silver', t_silver), ('reload_fct_trips', t_gold)]
+    return [{'variant': variant, 'step': step, 'seconds': round(sec, 3)} for step, sec in steps]
+
+
+@custom
+def run_benchmark(*args, **kwargs) -> pd.DataFrame:
+    """
+    Silver como vista (cadena stg_* -> silver_trips, antes) vs tabla incremental
+    clusterizada (ahora), sobre DuckDB local (targets `duckdb` / `duckdb_gold` de
+    profiles.yml) con BRONZE generado por utils/sample_data.
+    Pasos medidos por variante: dbt run de silver, dbt run de gold (dims +
+    fct_trips desde cero), dbt test de silver, consultas del notebook sobre
+    fct_trips y consultas directas sobre silver, y la recarga de una partición
+    (dbt run incremental de silver + fct_trips).
+    Requiere duckdb, dbt-duckdb y `dbt deps` hecho en el proyecto dbt
+    (utils/local_warehouse.py).
+    kwargs:
+      - services (list[str], default ['yellow','green'])
+      - year     (int, default 2019) -> el año que consultan los notebooks
+      - months   (list[int], default 1..12)
+      - rows     (int, default 200_000) -> filas por partición
+      - repeat   (int, default 3) -> repeticiones por consulta, se toma la mejor
+      - dbt_bin  (str, default 'dbt')
+      - project_dir (str, default dbt/nyc_tlc del repo)
+      - workdir  (str, default temporal) / keep (bool, default False)
+    """
+    services = list(kwargs.get('services', ['yellow', 'green']))
+    year = int(kwargs.get('year', 2019))
+    months = [int(m) for m in kwargs.get('months', range(1, 13))]
+    rows = int(kwargs.get('rows', 200_000))
+    repeat = int(kwargs.get('repeat', 3))
+    dbt_bin = kwargs.get('dbt_bin') or shutil.which('dbt') or 'dbt'
+    project_dir = kwargs.get('project_dir')
+    workdir = kwargs.get('workdir') or tempfile.mkdtemp(prefix='bench_silver_')
+
+    os.makedirs(workdir, exist_ok=True)
+
+    try:
+        seed_path = os.path.join(workdir, 'seed.duckdb')
+        t0 = time.perf_counter()
+        total = seed_bronze(seed_path, services, year, months, rows)
+        print(f"[bench_silver] BRONZE: {total:,} filas ({len(services)} servicios x {len(months)} meses) "
+              f"en {time.perf_counter() - t0:.1f}s")
+
+        results = []
+        for variant in ('view', 'incremental'):
+            results += _run_variant(variant, seed_path, workdir, dbt_bin, project_dir,
+                                    (services[0], year, months[0]), rows, repeat)
+            for r in results[-(len(NOTEBOOK_QUERIES) + len(SILVER_QUERIES) + 5):]:
+                print(f"[bench_silver] {variant:11s} {r['step']:30s} {r['seconds']}s")
+    finally:
+        if not kwargs.get('keep', False) and not kwargs.get('workdir'):
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out = pd.DataFrame(results)
+    base = out[out['variant'] == 'view'].set_index('step')['seconds']
+    out['speedup'] = (out['step'].map(base) / out['seconds']).round(2)
+    return out
@@ -0,0 +1,101 @@
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from default_repo.data_exporters.copy_into_bronze import export_data as copy_into_bronze
+from default_repo.data_exporters.load_taxi_zones import export_data as load_taxi_zones
+from default_repo.data_exporters.sync_coverage_to_audit_py import export_data as sync_coverage_to_audit
+from default_repo.data_exporters.trigger_gold_incremental import touched_partitions
+from default_repo.transformers.fetch_and_stage_parquet import transform as fetch_and_stage_parquet
+from default_repo.transformers.generate_months import transform as generate_months
+from default_repo.transformers.plan_incremental_load import transform as plan_incremental_load
+from default_repo.utils.local_warehouse import DB_FILE, run_dbt
+from default_repo.utils.warehouse import Warehouse, get_warehouse
+
+SILVER_SELECT = ['--select', '+silver_trips', '--target', 'duckdb']
+GOLD_SELECT = ['--select', '+dim_payment_type', '+dim_ratecode', 'dim_zone', 'fct_trips', 'path:models/marts/rollups',
+               '--target', 'duckdb_gold']
+
+
+def _has_zones(warehouse: Warehouse) -> bool:
+    conn = warehouse.connect()
+    try:
+        cur = conn.cursor()
+        cur.execute("select count(*) from information_schema.tables where table_schema = %s "
+                    "and table_name = 'taxi_zones'", (warehouse.schema('raw'),))
+        return cur.fetchone()[0] > 0
+    finally:
+        conn.close()
+
+
+@custom
+def run_pipeline(*args, **kwargs) -> pd.DataFrame:
+    """
+    Pipeline completo sobre un DuckDB local y Parquet en disco, sin cuenta de Snowflake:
+    generate_months -> fetch_and_stage_parquet (base_url = `parquet_dir`) ->
+    plan_incremental_load -> copy_into_bronze -> sync_coverage_to_audit_py ->
+    load_taxi_zones -> dbt de silver (target `duckdb`) y gold (`duckdb_gold`) con
+    las particiones tocadas, como gold_incremental. Los bloques corren tal cual con
+    warehouse='duckdb' (utils/warehouse); el resto de kwargs les llega igual que
+    las variables del pipeline (load_mode, max_workers, mode, ...).
+    Los Parquet se buscan como `<parquet_dir>/<servicio>_tripdata_YYYY-MM.parquet`.
+    Una segunda corrida solo recarga lo que cambió (ETag local = tamaño + mtime).
+    Requiere duckdb; para los pasos de dbt, dbt-duckdb y `dbt deps` hecho.
+    kwargs:
+      - parquet_dir (str, requerido)
+      - duckdb_path (str, default <parquet_dir>/nyc_tlc.duckdb) -> debe llamarse nyc_tlc.duckdb
+      - services / years / months (list, default ['yellow','green'] / todos / todos)
+      - zones_csv (str, opcional) -> taxi_zone_lookup.csv local; sin él se descarga
+      - dbt (bool, default True) / dbt_bin (str, default 'dbt') / project_dir (str, default dbt/nyc_tlc)
+      - fresh (bool, default False) -> borra el archivo DuckDB antes de empezar
+    Retorna los segundos por paso.
+    """
+    parquet_dir = os.path.abspath(kwargs['parquet_dir'])
+    db_path = os.path.abspath(kwargs.get('duckdb_path') or os.path.join(parquet_dir, DB_FILE))
+    if os.path.basename(db_path) != DB_FILE:
+        raise ValueError(f"duckdb_path debe llamarse {DB_FILE} (las sources de dbt apuntan a NYC_TLC)")
+    if kwargs.get('fresh', False):
+        for path in (db_path, db_path + '.wal'):
+            if os.path.exists(path):
+                os.remove(path)
+    block_kwargs = {
+        'services': ['yellow', 'green'], **kwargs,
+        'warehouse': 'duckdb', 'duckdb_path': db_path, 'base_url': parquet_dir, 'use_cache': False,
+    }
+    warehouse = get_warehouse(block_kwargs)
+    steps = []
+
+    def _step(name, fn, *a):
+        t0 = time.perf_counter()
+        out = fn(*a, **block_kwargs)
+        steps.append({'step': name, 'seconds': round(time.perf_counter() - t0, 3)})
+        print(f"[local] {name}: {steps[-1]['seconds']}s")
+        return out
+
+    months = _step('generate_months', generate_months)
+    available = _step('fetch_and_stage_parquet', fetch_and_stage_parquet, months)
+    plan = _step('plan_incremental_load', plan_incremental_load, available)
+    summary = _step('copy_into_bronze', copy_into_bronze, plan)
+    _step('sync_coverage_to_audit_py', sync_coverage_to_audit)
+    if kwargs.get('zones_csv') or not _has_zones(warehouse):
+        _step('load_taxi_zones', load_taxi_zones)
+
+    parts = touched_partitions(summary)
+    if kwargs.get('dbt', True) and parts:
+        dbt_bin = kwargs.get('dbt_bin') or shutil.which('dbt') or 'dbt'
+        partitions = ','.join(parts)
+        dbt_vars = ['--vars', f'{{"partitions": "{partitions}"}}']
+        for name, select in (('dbt_silver', SILVER_SELECT), ('dbt_gold', GOLD_SELECT)):
+            seconds = run_dbt(['run', *select, *dbt_vars], db_path, dbt_bin, project_dir=kwargs.get('project_dir'))
+            steps.append({'step': name, 'seconds': round(seconds, 3)})
+            print(f"[local] {name}: {steps[-1]['seconds']}s")
+    elif not parts:
+        print("[local] Sin particiones cargadas: no se corre dbt")
+
+    warehouse.log_stats()
+    return pd.DataFrame(steps)
@@ -2,267 +2,347 @@
 if 'data_exporter' not in globals():
     from mage_ai.data_preparation.decorators import data_exporter
 
-from mage_ai.data_preparation.shared.secrets import get_secret_value
-
 from pandas import DataFrame
 import pandas as pd
-import uuid
-import time, requests, tempfile, os, logging, math
+import time, logging
 
-import snowflake.connector
 from snowflake.connector.pandas_tools import write_pandas
-import pyarrow.parquet as pq
-import pyarrow as pa
+
+from default_repo.utils.adaptive_batch import AdaptiveBatcher
+from default_repo.utils.bronze_batches import produce_batches
+from default_repo.utils.bronze_sink import CopyIntoSink, WritePandasSink
+from default_repo.utils.checkpoint import ensure_checkpoint
+from default_repo.utils.download_cache import DownloadCache
+from default_repo.utils.schema_registry import SchemaRegistry, get_registry
+from default_repo.utils.load_ledger import ensure_ledger, record_load
+from default_repo.utils.parquet_pushdown import MODES as PICKUP_FILTER_MODES, pickup_window
+from default_repo.utils.parquet_source import open_source, release_source
+from default_repo.utils.stage_pipeline import StagePipeline, StageFailure
+from default_repo.utils.trip_services import get_service, resolve_services
+from default_repo.utils.warehouse import get_warehouse
+from default_repo.utils.worker_pool import run_partitions
 
 # Silenciar logs ruidosos de Snowflake
 logging.getLogger('snowflake.connector').setLevel(logging.WARNING)
 logging.getLogger('snowflake.connector.ocsp_snowflake').setLevel(logging.ERROR)
 logging.getLogger('snowflake.connector.file_transfer_agent').setLevel(logging.ERROR)
 
-# ===================== DDL BRONZE (ingest_ts como STRING) =====================
-YELLOW_DDL = """
-create table if not exists {db}.{schema}.yellow_trips (
-    vendorid integer,
-    tpep_pickup_datetime timestamp,
-    tpep_dropoff_datetime timestamp,
-    passenger_count integer,
-    trip_distance float,
-    ratecodeid integer,
-    store_and_fwd_flag string,
-    pulocationid integer,
-    dolocationid integer,
-    payment_type integer,
-    fare_amount float,
-    extra float,
-    mta_tax float,
-    tip_amount float,
-    tolls_amount float,
-    improvement_surcharge float,
-    total_amount float,
-    congestion_surcharge float,
-    airport_fee float,
-    cbd_congestion_fee float,
-    -- metadatos
-    run_id string,
-    ingest_ts string,    -- ISO string
-    year int,
-    month int,
-    service_type string,
-    source_url string
-);
-"""
+# ===================== Carga de una partición =====================
+def _ensure_tables(conn, db: str, schema: str, refresh: bool = False, services=None,
+                   registry: SchemaRegistry = None) -> None:
+    """
+    Crea las tablas de `services` (default yellow + green) o agrega solo las columnas
+    que les falten respecto de la DDL (utils/schema_registry). Con la huella cacheada
+    no hace ningún round trip.
+    """
+    registry = registry or get_registry(db, schema)
+    for name in resolve_services(services):
+        svc = get_service(name)
+        registry.ensure(conn, svc.table, svc.column_types, refresh=refresh)
+
+def _load_partition(conn, task: dict, *, db: str, schema: str, batcher: AdaptiveBatcher,
+                    writer=write_pandas, pipelined: bool = False, queue_size: int = 2,
+                    load_mode: str = 'write_pandas', stage_backend=None, normalize: str = 'arrow',
+                    checkpoint: bool = False, resume: bool = False,
+                    download_cache: DownloadCache = None, download_segments: int = 4,
+                    read_mode: str = 'download', schema_registry: SchemaRegistry = None,
+                    pickup_filter: dict = None) -> dict:
+    """
+    Reemplaza una partición natural (service, year, month): fetch (utils/parquet_source)
+    -> decode (utils/bronze_batches) -> sink (utils/bronze_sink). Con pipelined=True
+    fetch y decode corren en hilos propios unidos por colas de `queue_size`.
+    """
+    service, year, month, urls = task['service_type'], task['year'], task['month'], task['urls']
+    tag = f"[{service} {year}-{month:02d}]"
+    copy_mode = load_mode == 'copy_into'
+    window = pickup_window(year=year, month=month, **pickup_filter) if pickup_filter else None
+    if copy_mode:
+        sink = CopyIntoSink(conn, db, schema, service, year, month, stage_backend=stage_backend, tag=tag)
+    else:
+        sink = WritePandasSink(conn, db, schema, service, year, month, writer=writer, batcher=batcher,
+                               arrow=normalize == 'arrow', checkpoint=checkpoint, resume=resume, window=window,
+                               tag=tag)
+    run_id = sink.start()
+    meta = {'run_id': run_id, 'year': year, 'month': month, 'service_type': service}
+    failed = set()  # urls con error: el decode deja de producir batches para ellas
+    skipped = {'rows_skipped': 0, 'row_groups_skipped': 0, 'bytes_skipped': 0}
 
-GREEN_DDL = """
-create table if not exists {db}.{schema}.green_trips (
-    vendorid integer,
-    lpep_pickup_datetime timestamp,
-    lpep_dropoff_datetime timestamp,
-    passenger_count integer,
-    trip_distance float,
-    ratecodeid integer,
-    store_and_fwd_flag string,
-    pulocationid integer,
-    dolocationid integer,
-    payment_type integer,
-    fare_amount float,
-    extra float,
-    mta_tax float,
-    tip_amount float,
-    tolls_amount float,
-    improvement_surcharge float,
-    total_amount float,
-    congestion_surcharge float,
-    trip_type integer,
-    cbd_congestion_fee float,
-    ehail_fee float,
-    -- metadatos
-    run_id string,
-    ingest_ts string,    -- ISO string
-    year int,
-    month int,
-    service_type string,
-    source_url string
-);
-"""
+    def _fetch(url):
+        if url in sink.done_urls:
+            print(f"{tag} Ya cargado en el run previo: {url}")
+            return
+        # metadatos del HEAD solo si la partición es de un único archivo
+        single = len(urls) == 1
+        size = task.get('content_length') if single else None
+        size = int(size) if size is not None and not pd.isna(size) else None
+        yield open_source(url, read_mode=read_mode, cache=download_cache, size=size,
+                          etag=task.get('etag') if single else None, segments=download_segments, tag=tag)
 
-# ===================== Columnas esperadas =====================
-YELLOW_COLS = [
-    'vendorid','tpep_pickup_datetime','tpep_dropoff_datetime','passenger_count','trip_distance',
-    'ratecodeid','store_and_fwd_flag','pulocationid','dolocationid','payment_type','fare_amount',
-    'extra','mta_tax','tip_amount','tolls_amount','improvement_surcharge','total_amount',
-    'congestion_surcharge','airport_fee','cbd_congestion_fee'
-]
-GREEN_COLS = [
-    'vendorid','lpep_pickup_datetime','lpep_dropoff_datetime','passenger_count','trip_distance',
-    'ratecodeid','store_and_fwd_flag','pulocationid','dolocationid','payment_type','fare_amount',
-    'extra','mta_tax','tip_amount','tolls_amount','improvement_surcharge','total_amount',
-    'congestion_surcharge','trip_type','cbd_congestion_fee','ehail_fee'
-]
-META_COLS = ['run_id','ingest_ts','year','month','service_type','source_url']
+    def _decode(source):
+        yield from produce_batches(source, meta, batcher=batcher, normalize=normalize, copy_mode=copy_mode,
+                                   accept_drift=schema_registry is not None, window=window,
+                                   resume_at=sink.resume_offset(source.url),
+                                   cancelled=lambda: source.url in failed, tag=tag)
+
+    files_ok = len(set(urls) & sink.done_urls)
+    errors = []
+    t_start = time.time()
+    first_batch_s = None
+    if not copy_mode:
+        print(f"{tag} Batches: {batcher.describe()}")
+    pipeline = StagePipeline([('fetch', _fetch), ('decode', _decode)],
+                             queue_size=queue_size, threaded=pipelined, discard=release_source)
+    try:
+        for item in pipeline.run(urls):
+            if isinstance(item, StageFailure):
+                url = item.item if item.stage == 'fetch' else getattr(item.item, 'url', None)
+                print(f"{tag} Error ({item.stage}): {item.error}")
+                errors.append(f"{url}: {type(item.error).__name__}: {item.error}")
+                failed.add(url)
+                continue
+            url = item['url']
+            if url in failed:
+                continue
+            if item.get('drift'):
+                try:
+                    added = sink.add_columns(schema_registry, item['drift'])
+                    print(f"{tag} Schema drift: {', '.join(item['drift'])} "
+                          f"({'agregadas: ' + ', '.join(added) if added else 'ya existían'})")
+                except Exception as e:
+                    print(f"{tag} Error (schema): {e}")
+                    errors.append(f"{url}: schema: {type(e).__name__}: {e}")
+                    failed.add(url)
+                continue
+            if item.get('done'):
+                for k, v in item['skipped'].items():
+                    skipped[k] += v
+                try:
+                    sink.file_done(url)
+                except Exception as e:
+                    errors.append(f"{url}: checkpoint: {type(e).__name__}: {e}")
+                    continue
+                files_ok += 1
+                continue
+            if first_batch_s is None:
+                first_batch_s = round(time.time() - t_start, 2)
+                print(f"{tag} Primer batch listo en {first_batch_s}s")
 
-# ===================== Conexión Snowflake =====================
-def _conn():
-    return snowflake.connector.connect(
-        account=get_secret_value('SNOWFLAKE_ACCOUNT'),
-        user=get_secret_value('SNOWFLAKE_USER'),
-        password=get_secret_value('SNOWFLAKE_PASSWORD'),
-        role=get_secret_value('SNOWFLAKE_ROLE'),
-        warehouse=get_secret_value('SNOWFLAKE_WAREHOUSE'),
-        database=get_secret_value('SNOWFLAKE_DATABASE'),
-        schema=get_secret_value('SNOWFLAKE_SCHEMA_RAW'),
-        client_session_keep_alive=False,
-        ocsp_fail_open=True,
-        insecure_mode=True,
-    )
+            t0 = time.time()
+            try:
+                nrows = sink.write(item)
+            except Exception as e:
+                print(f"{tag} Error: {e}")
+                errors.append(f"{url}: {type(e).__name__}: {e}")
+                failed.add(url)
+                continue
+            of = f"/{item['num_batches']}" if item.get('num_batches') else ''
+            print(f"{tag} RG {item['rg']+1}/{item['num_groups']} | batch {item['b']+1}{of} → rows={nrows} ({round(time.time()-t0,1)}s)")
 
-# ===================== Utilidades =====================
-def _download_parquet(url: str, timeout_connect=8, timeout_read=90) -> str:
-    headers = {'User-Agent': 'mage-ai/nyc-tlc-pipeline'}
-    with requests.get(url, headers=headers, stream=True, timeout=(timeout_connect, timeout_read)) as r:
-        r.raise_for_status()
-        fd, tmp_path = tempfile.mkstemp(suffix='.parquet'); os.close(fd)
-        with open(tmp_path, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk: f.write(chunk)
-    return tmp_path
+        try:
+            sink.finish(ok=not errors)
+        except Exception as e:
+            print(f"{tag} Error ({load_mode}): {e}")
+            errors.append(f"{load_mode}: {type(e).__name__}: {e}")
+    finally:
+        sink.close()
 
-def _normalize_trip_datetimes(pdf: pd.DataFrame, service: str) -> None:
-    """
-    Convierte pickup/dropoff a 'YYYY-MM-DD HH:MM:SS' como string (Snowflake TIMESTAMP_NTZ friendly).
-    """
-    if service == 'yellow':
-        dt_cols = ['tpep_pickup_datetime', 'tpep_dropoff_datetime']
+    if copy_mode:
+        avg_batch = None
+        print(f"{tag} Total subido: {sink.rows} filas")
     else:
-        dt_cols = ['lpep_pickup_datetime', 'lpep_dropoff_datetime']
-    for c in dt_cols:
-        dt = pd.to_datetime(pdf[c], errors='coerce', utc=False)
-        iso = dt.dt.strftime('%Y-%m-%d %H:%M:%S')
-        pdf[c] = iso
-        pdf.loc[dt.isna(), c] = None
+        avg_batch = round((sink.rows - sink.resumed_rows) / sink.batches) if sink.batches else None
+        print(f"{tag} Total subido: {sink.rows} filas | {sink.batches} batches (~{avg_batch} filas/batch) | "
+              f"{batcher.describe()}")
+    return {
+        'service_type': service, 'year': year, 'month': month,
+        'run_id': run_id, 'rows': sink.rows, 'files': files_ok, 'errors': errors,
+        'first_batch_s': first_batch_s, 'batches': sink.batches, 'avg_batch_rows': avg_batch,
+        'latest_ingest_ts': sink.latest_ingest_ts, **skipped,
+    }
+
+SUMMARY_COLS = ['service_type', 'year', 'month', 'run_id', 'rows', 'files', 'seconds', 'first_batch_s',
+                'batches', 'avg_batch_rows', 'rows_skipped', 'row_groups_skipped', 'bytes_skipped',
+                'worker', 'status', 'errors']
+
+
+def _summarize(results: list) -> pd.DataFrame:
+    """Fusiona los resultados de todos los workers en un resumen por partición."""
+    summary = pd.DataFrame([{
+        'service_type': r.get('service_type'),
+        'year': r.get('year'),
+        'month': r.get('month'),
+        'run_id': r.get('run_id'),
+        'rows': int(r.get('rows') or 0),
+        'files': int(r.get('files') or 0),
+        'seconds': r.get('seconds'),
+        'first_batch_s': r.get('first_batch_s'),
+        'batches': r.get('batches'),
+        'avg_batch_rows': r.get('avg_batch_rows'),
+        'rows_skipped': int(r.get('rows_skipped') or 0),
+        'row_groups_skipped': int(r.get('row_groups_skipped') or 0),
+        'bytes_skipped': int(r.get('bytes_skipped') or 0),
+        'worker': r.get('worker'),
+        'status': 'OK' if not r.get('errors') else 'ERROR',
+        'errors': '; '.join(r.get('errors') or []) or None,
+    } for r in results], columns=SUMMARY_COLS)
+    if summary.empty:
+        return summary
+    summary = summary.sort_values(['service_type', 'year', 'month']).reset_index(drop=True)
+    n_err = int((summary['status'] == 'ERROR').sum())
+    print(f"[bronze] Particiones: {len(summary)} | filas: {int(summary['rows'].sum())} | con error: {n_err}")
+    if summary['rows_skipped'].any() or summary['bytes_skipped'].any():
+        print(f"[bronze] Pushdown: {int(summary['rows_skipped'].sum())} filas descartadas | "
+              f"{int(summary['row_groups_skipped'].sum())} row groups saltados | "
+              f"{summary['bytes_skipped'].sum() / 1e6:.1f} MB no leídos")
+    for r in summary[summary['status'] == 'ERROR'].itertuples(index=False):
+        print(f"[bronze][error] {r.service_type} {r.year}-{int(r.month):02d}: {r.errors}")
+    return summary
 
 # ===================== Exportador principal =====================
 @data_exporter
-def export_data(df: DataFrame, **kwargs) -> None:
+def export_data(df: DataFrame, **kwargs) -> DataFrame:
     """
-    Input (desde bloque 2): ['year','month','service_type','url','has_parquet', ...]
-    - Crea tablas con ingest_ts como STRING (ISO)
-    - Idempotencia por (service, year, month): DELETE previo
-    - Descarga parquet, lee por row group, sube en micro-batches
-    - Normaliza columnas y fechas (pickup/dropoff ISO; ingest_ts ISO)
-    kwargs:
-      - batch_size_yellow (int, default 100_000)
-      - batch_size_green  (int, default 600_000)
+    Input (desde bloque 2 / plan_incremental_load): ['year','month','service_type','url','has_parquet', ...]
+    - Reemplaza cada partición (service, year, month) de BRONZE (DELETE + carga) para los
+      servicios del registro (utils/trip_services); con `action` solo carga action='load'
+    - Cada fila lleva la huella `trip_fp` (utils/trip_fingerprint) y metadatos de la carga
+    - max_workers particiones en paralelo (una conexión por worker); registra cada una en LOAD_LEDGER
+    kwargs (detalle en docs/README.md):
+      - warehouse / duckdb_path / database / schema / conn_factory / writer
+      - max_workers (1) / pipelined (False) / queue_size (2)
+      - load_mode ('write_pandas' | 'copy_into') / stage_backend / normalize ('arrow' | 'pandas')
+      - adaptive_batches (True) / batch_target_mb / batch_min_mb / batch_max_mb / batch_max_rss_mb / batch_size_<servicio>
+      - read_mode ('download' | 'remote') / download_cache (True) / download_cache_dir /
+        download_cache_max_gb / verify_checksum / download_segments (4)
+      - pickup_filter (None | 'silver' | 'partition') / pickup_tolerance_days / pickup_min / pickup_max
+      - ledger / checkpoint (True) / resume (False) / schema_evolution (True) / schema_refresh (False)
+    Retorna un DataFrame resumen por partición (filas, pushdown, errores, worker); vacío sin nada que cargar.
     """
     if df is None or len(df) == 0:
-        print('No hay filas de entrada.'); return
+        print('No hay filas de entrada.'); return _summarize([])
+    if 'action' in df.columns:
+        skipped = int((df['action'] != 'load').sum())
+        df = df[df['action'] == 'load']
+        print(f"[bronze] Plan incremental: {len(df)} a cargar | {skipped} omitidas")
     df = df[df['has_parquet'] == True].copy()
     if df.empty:
-        print('No hay archivos Parquet disponibles para cargar.'); return
+        print('No hay archivos Parquet disponibles para cargar.'); return _summarize([])
 
-    DB = get_secret_value('SNOWFLAKE_DATABASE')
-    SCHEMA_RAW = get_secret_value('SNOWFLAKE_SCHEMA_RAW')
+    warehouse = get_warehouse(kwargs)
+    DB = kwargs.get('database') or warehouse.database
+    SCHEMA_RAW = kwargs.get('schema') or warehouse.schema('raw')
 
     df['year'] = df['year'].astype(int)
     df['month'] = df['month'].astype(int)
-    df['service_type'] = df['service_type'].astype(str)
+    df['service_type'] = df['service_type'].astype(str).str.lower()
+    services = resolve_services(sorted(df['service_type'].unique()))  # falla con servicios desconocidos
 
-    bs_yellow = int(kwargs.get('batch_size_yellow', 400_000))
-    bs_green  = int(kwargs.get('batch_size_green',  600_000))
+    adaptive = bool(kwargs.get('adaptive_batches', True))
+    max_workers = int(kwargs.get('max_workers', 1))
+    pipelined = bool(kwargs.get('pipelined', False))
+    queue_size = int(kwargs.get('queue_size', 2))
+    conn_factory = kwargs.get('conn_factory') or warehouse.factory(SCHEMA_RAW)
+    writer = kwargs.get('writer') or warehouse.write_pandas
+    load_mode = str(kwargs.get('load_mode', 'write_pandas'))
+    if load_mode not in ('write_pandas', 'copy_into'):
+        raise ValueError(f"load_mode inválido: {load_mode}")
+    normalize = str(kwargs.get('normalize', 'arrow'))
+    if normalize not in ('arrow', 'pandas'):
+        raise ValueError(f"normalize inválido: {normalize}")
+    stage_factory = kwargs.get('stage_backend') or (lambda c: warehouse.stage_backend(c, DB, SCHEMA_RAW))
+    use_ledger = bool(kwargs.get('ledger', True))
+    checkpoint = bool(kwargs.get('checkpoint', True)) and load_mode == 'write_pandas'
+    resume = bool(kwargs.get('resume', False))
+    download_segments = int(kwargs.get('download_segments', 4))
+    read_mode = str(kwargs.get('read_mode', 'download'))
+    registry = warehouse.registry(DB, SCHEMA_RAW) if kwargs.get('schema_evolution', True) else None
+    if read_mode not in ('download', 'remote'):
+        raise ValueError(f"read_mode inválido: {read_mode}")
+    pickup_filter = None
+    if kwargs.get('pickup_filter'):
+        if kwargs['pickup_filter'] not in PICKUP_FILTER_MODES:
+            raise ValueError(f"pickup_filter inválido: {kwargs['pickup_filter']}")
+        pickup_filter = {
+            'mode': kwargs['pickup_filter'],
+            'tolerance_days': float(kwargs.get('pickup_tolerance_days', 1)),
+            'pickup_min': kwargs.get('pickup_min'),
+            'pickup_max': kwargs.get('pickup_max'),
+        }
+    cache = None
+    if kwargs.get('download_cache', True) and read_mode == 'download':
+        cache = DownloadCache(kwargs.get('download_cache_dir'),
+                              max_bytes=int(float(kwargs.get('download_cache_max_gb', 10)) * 1024 ** 3),
+                              verify_checksum=bool(kwargs.get('verify_checksum', True)))
 
-    conn = _conn()
+    # DDL/ALTER una sola vez por proceso (no en cada ejecución del bloque)
+    conn = conn_factory()
     try:
-        cs = conn.cursor()
-        # Crear tablas si no existen
-        cs.execute(YELLOW_DDL.format(db=DB, schema=SCHEMA_RAW))
-        cs.execute(GREEN_DDL.format(db=DB, schema=SCHEMA_RAW))
-        # Asegurar columnas recientes
-        cs.execute(f"alter table if exists {DB}.{SCHEMA_RAW}.yellow_trips add column if not exists cbd_congestion_fee float")
-        cs.execute(f"alter table if exists {DB}.{SCHEMA_RAW}.green_trips  add column if not exists cbd_congestion_fee float")
-        cs.execute(f"alter table if exists {DB}.{SCHEMA_RAW}.green_trips  add column if not exists ehail_fee float")
-
-        for (service, year, month), part in df.groupby(['service_type', 'year', 'month']):
-            urls = part['url'].tolist()
-            table_name = f'{service}_trips'
-            fq_table = f'{DB}.{SCHEMA_RAW}.{table_name}'
-
-            # Cursor fresco por iteración
-            try:
-                cs = conn.cursor()
-            except Exception:
-                try: conn.close()
-                except Exception: pass
-                conn = _conn(); cs = conn.cursor()
-
-            # Idempotencia por lote (replace de partición natural)
-            cs.execute(
-                f"delete from {fq_table} where year = %s and month = %s and service_type = %s",
-                (year, month, service)
-            )
-
-            run_id = str(uuid.uuid4())
-            total_rows = 0
-
-            for url in urls:
-                try:
-                    print(f"[{service} {year}-{month:02d}] Descargando: {url}")
-                    local_path = _download_parquet(url)
-
-                    pf = pq.ParquetFile(local_path)
-                    num_groups = pf.num_row_groups
-                    print(f"[{service} {year}-{month:02d}] Row groups: {num_groups}")
-
-                    for rg in range(num_groups):
-                        tbl: pa.Table = pf.read_row_group(rg)
-                        num_rows = tbl.num_rows
-                        batch_size = bs_yellow if service == 'yellow' else bs_green
-                        num_batches = max(1, math.ceil(num_rows / batch_size))
-
-                        for b in range(num_batches):
-                            t0 = time.time()
-                            start = b * batch_size
-                            end = min((b + 1) * batch_size, num_rows)
-                            slice_tbl: pa.Table = tbl.slice(offset=start, length=end - start)
-                            pdf = slice_tbl.to_pandas(split_blocks=True, self_destruct=True)
-
-                            # normalizar columnas
-                            pdf.columns = [str(c).lower() for c in pdf.columns]
-                            base_cols = YELLOW_COLS if service == 'yellow' else GREEN_COLS
-                            for c in base_cols:
-                                if c not in pdf.columns:
-                                    pdf[c] = pd.NA
-
-                            # metadatos (ingest_ts ISO string)
-                            pdf['run_id'] = run_id
-                            pdf['ingest_ts'] = pd.Timestamp.utcnow().tz_localize(None).strftime('%Y-%m-%d %H:%M:%S')
-                            pdf['year'] = year
-                            pdf['month'] = month
-                            pdf['service_type'] = service
-                            pdf['source_url'] = url
-
-                            # normalizar fechas pickup/dropoff a ISO
-                            _normalize_trip_datetimes(pdf, service)
+        # tablas BRONZE: solo la DDL que falte (schema_registry)
+        _ensure_tables(conn, DB, SCHEMA_RAW, refresh=bool(kwargs.get('schema_refresh', False)), services=services,
+                       registry=warehouse.registry(DB, SCHEMA_RAW))
+        if use_ledger:
+            ensure_ledger(conn, DB, SCHEMA_RAW, registry=warehouse.registry(DB, SCHEMA_RAW))
+        if checkpoint:
+            ensure_checkpoint(conn, DB, SCHEMA_RAW, registry=warehouse.registry(DB, SCHEMA_RAW))
+        if load_mode == 'copy_into':
+            stage_factory(conn).ensure()
+    finally:
+        conn.close()
 
-                            # orden final
-                            pdf = pdf[base_cols + META_COLS]
+    def _first(part, col):
+        return part[col].iloc[0] if col in part.columns else None
 
-                            ok, nchunks, nrows, _ = write_pandas(
-                                conn, pdf,
-                                table_name=table_name,
-                                database=DB,
-                                schema=SCHEMA_RAW,
-                                quote_identifiers=False,
-                                chunk_size=100_000,
-                            )
-                            total_rows += nrows
-                            print(f"[{service} {year}-{month:02d}] RG {rg+1}/{num_groups} | batch {b+1}/{num_batches} → rows={nrows} ({round(time.time()-t0,1)}s)")
+    tasks = [
+        {'service_type': service, 'year': int(year), 'month': int(month), 'urls': part['url'].tolist(),
+         'content_length': _first(part, 'content_length'), 'etag': _first(part, 'etag'),
+         'last_modified': _first(part, 'last_modified')}
+        for (service, year, month), part in df.groupby(['service_type', 'year', 'month'])
+    ]
 
-                    os.remove(local_path)
-                except Exception as e:
-                    print(f"[{service} {year}-{month:02d}] Error: {e}")
+    # un batcher por servicio: lo aprendido en una partición sirve para las siguientes
+    batchers = {
+        service: AdaptiveBatcher(
+            service,
+            target_mb=float(kwargs.get('batch_target_mb', 128)),
+            min_mb=float(kwargs.get('batch_min_mb', 16)),
+            max_mb=float(kwargs.get('batch_max_mb', 1024)),
+            max_rss_mb=float(kwargs.get('batch_max_rss_mb', 4096)),
+            fixed_rows=None if adaptive else int(kwargs.get(f'batch_size_{service}', get_service(service).batch_rows)),
+        )
+        for service in services
+    }
 
-            print(f"[{service} {year}-{month:02d}] Total subido: {total_rows} filas")
+    def _work(conn, task):
+        stage = stage_factory(conn) if load_mode == 'copy_into' else None
+        res = _load_partition(conn, task, db=DB, schema=SCHEMA_RAW, batcher=batchers[task['service_type']], writer=writer,
+                              pipelined=pipelined, queue_size=queue_size,
+                              load_mode=load_mode, stage_backend=stage, normalize=normalize,
+                              checkpoint=checkpoint, resume=resume, download_cache=cache,
+                              download_segments=download_segments, read_mode=read_mode,
+                              schema_registry=registry, pickup_filter=pickup_filter)
+        if use_ledger:
+            try:
+                record_load(conn, DB, SCHEMA_RAW, {
+                    **task, 'source_url': task['urls'][0], 'row_count': res['rows'], 'run_id': res['run_id'],
+                    'latest_ingest_ts': res.get('latest_ingest_ts'), 'status': 'ERROR' if res['errors'] else 'OK',
+                })
+            except Exception as e:
+                res['errors'].append(f"ledger: {type(e).__name__}: {e}")
+        return res
 
+    print(f"[bronze] {len(tasks)} particiones | max_workers={max_workers} | pipelined={pipelined} | "
+          f"load_mode={load_mode} | read_mode={read_mode} | adaptive_batches={adaptive} | "
+          f"pickup_filter={kwargs.get('pickup_filter')}")
+    try:
+        results = run_partitions(tasks, _work, conn_factory=conn_factory, max_workers=max_workers)
     finally:
-        try: cs.close()
-        except Exception: pass
-        conn.close()
+        if cache is not None:
+            st = cache.stats()
+            print(f"[download_cache] hits={st['hits']} | misses={st['misses']} | hit_ratio={st['hit_ratio']} | "
+                  f"descargado={st['bytes_downloaded'] / 1e6:.1f} MB | servido={st['bytes_served'] / 1e6:.1f} MB | "
+                  f"evictions={st['evictions']} | verify_failures={st['verify_failures']} | "
+                  f"en cache={st['objects']} archivos / {st['bytes_cached'] / 1e6:.1f} MB")
+            cache.close()
+        if 'conn_factory' not in kwargs:
+            warehouse.log_stats()
+    return _summarize(results)
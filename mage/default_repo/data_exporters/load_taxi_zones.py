@@ -2,12 +2,10 @@
 if 'data_exporter' not in globals():
     from mage_ai.data_preparation.decorators import data_exporter
 
-from mage_ai.data_preparation.shared.secrets import get_secret_value
-
 import pandas as pd
 import requests, tempfile, os, logging
-import snowflake.connector
-from snowflake.connector.pandas_tools import write_pandas
+
+from default_repo.utils.warehouse import get_warehouse
 
 logging.getLogger('snowflake.connector').setLevel(logging.WARNING)
 
@@ -26,20 +24,6 @@ create table if not exists {db}.{schema}.taxi_zones (
 );
 """
 
-def _conn():
-    return snowflake.connector.connect(
-        account=get_secret_value('SNOWFLAKE_ACCOUNT'),
-        user=get_secret_value('SNOWFLAKE_USER'),
-        password=get_secret_value('SNOWFLAKE_PASSWORD'),
-        role=get_secret_value('SNOWFLAKE_ROLE'),
-        warehouse=get_secret_value('SNOWFLAKE_WAREHOUSE'),
-        database=get_secret_value('SNOWFLAKE_DATABASE'),
-        schema=get_secret_value('SNOWFLAKE_SCHEMA_RAW'),
-        client_session_keep_alive=False,
-        ocsp_fail_open=True,
-        insecure_mode=True,
-    )
-
 def _download_csv() -> str:
     last_err = None
     for url in CANDIDATE_URLS:
@@ -58,15 +42,24 @@ def _download_csv() -> str:
 
 @data_exporter
 def export_data(*args, **kwargs) -> None:
-    DB = get_secret_value('SNOWFLAKE_DATABASE')
-    SCHEMA = get_secret_value('SNOWFLAKE_SCHEMA_RAW')  # BRONZE
-
-    # 1) Descargar CSV
-    csv_path = _download_csv()
+    """
+    Reemplaza BRONZE.taxi_zones con el lookup de zonas de TLC.
+    kwargs:
+      - zones_csv: str (opcional) -> CSV local en vez de descargarlo
+      - warehouse / duckdb_path -> backend (utils/warehouse; default Snowflake)
+    """
+    warehouse = get_warehouse(kwargs)
+    DB = warehouse.database
+    SCHEMA = warehouse.schema('raw')  # BRONZE
+
+    # 1) Descargar CSV (o usar el local)
+    local_csv = kwargs.get('zones_csv')
+    csv_path = local_csv or _download_csv()
 
     # 2) Leer y normalizar
     df = pd.read_csv(csv_path)
-    os.remove(csv_path)
+    if not local_csv:
+        os.remove(csv_path)
 
     # normalizar nombres
     df.columns = [c.strip().lower() for c in df.columns]
@@ -89,17 +82,18 @@ def export_data(*args, **kwargs) -> None:
     # tipificar
     df['locationid'] = pd.to_numeric(df['locationid'], errors='coerce').astype('Int64')
 
-    # 3) Crear tabla si no existe
-    conn = _conn()
+    # 3) Crear tabla si no existe (una vez por proceso)
+    conn = warehouse.connect(SCHEMA)
     cs = conn.cursor()
     try:
-        cs.execute(DDL_ZONES.format(db=DB, schema=SCHEMA))
+        warehouse.ensure_once(conn, f'taxi_zones:{DB}.{SCHEMA}',
+                              lambda c: cs.execute(DDL_ZONES.format(db=DB, schema=SCHEMA)))
 
         # 4) Idempotencia: reemplazar contenido
         cs.execute(f"truncate table {DB}.{SCHEMA}.taxi_zones")
 
         # 5) Cargar
-        ok, nchunks, nrows, _ = write_pandas(
+        ok, nchunks, nrows, _ = warehouse.write_pandas(
             conn,
             df,
             table_name='taxi_zones',
@@ -2,131 +2,76 @@
 if 'data_exporter' not in globals():
     from mage_ai.data_preparation.decorators import data_exporter
 
-from mage_ai.data_preparation.shared.secrets import get_secret_value
-from mage_ai.settings.repo import get_repo_path
-
-import os
 import pandas as pd
-import snowflake.connector
-from snowflake.connector.pandas_tools import write_pandas
 from datetime import datetime
 
+from default_repo.utils.coverage_frame import KEY_COLUMNS, audit_status, fill_urls, http_status, year_grid
+from default_repo.utils.coverage_store import open_store
+from default_repo.utils.load_ledger import read_unsynced
+from default_repo.utils.table_merge import merge_frames
+from default_repo.utils.trip_services import get_service, resolve_services
+from default_repo.utils.warehouse import get_warehouse
+
 # ============== Conexión ==============
-def _conn(schema_override=None):
+def _conn(warehouse, schema_override=None):
     # SIN fallback: siempre RAW (o lo que pases explícitamente en schema_override)
-    schema = schema_override or get_secret_value('SNOWFLAKE_SCHEMA_RAW')
-    return snowflake.connector.connect(
-        account=get_secret_value('SNOWFLAKE_ACCOUNT'),
-        user=get_secret_value('SNOWFLAKE_USER'),
-        password=get_secret_value('SNOWFLAKE_PASSWORD'),
-        role=get_secret_value('SNOWFLAKE_ROLE'),
-        warehouse=get_secret_value('SNOWFLAKE_WAREHOUSE'),
-        database=get_secret_value('SNOWFLAKE_DATABASE'),
-        schema=schema,
-        client_session_keep_alive=False,
-        ocsp_fail_open=True,
-        insecure_mode=True,
-    )
-
-# ============== DDLs mínimas + ensure columns ==============
-DDL_AUDIT_MIN = """
-create table if not exists {db}.{schema}.load_audit (
-  service_type string,
-  year int,
-  month int
-);
-"""
+    return warehouse.connect(schema_override or warehouse.schema('raw'))
 
-DDL_COVERAGE_MIN = """
-create table if not exists {db}.{schema}.coverage_matrix (
-  service_type string,
-  year int,
-  month int
-);
-"""
+# ============== Esquema declarado (schema_registry aplica solo lo que falte) ==============
+AUDIT_COLUMNS = {
+    'service_type': 'string',
+    'year': 'int',
+    'month': 'int',
+    'row_count': 'number',
+    'latest_ingest_ts': 'timestamp_ntz',
+    'status': 'string',           # OK | MISSING | ERROR
+    'note': 'string',
+    'run_id': 'string',           # run de copy_into_bronze que produjo la fila (modo ledger)
+}
 
-def _ensure_audit_columns(conn, db, schema, table='load_audit'):
-    fq = f"{db}.{schema}.{table}"
-    cur = conn.cursor()
-    try:
-        cur.execute(f"alter table if exists {fq} add column if not exists row_count number")
-        cur.execute(f"alter table if exists {fq} add column if not exists latest_ingest_ts timestamp_ntz")
-        cur.execute(f"alter table if exists {fq} add column if not exists status string")  # OK | MISSING
-        cur.execute(f"alter table if exists {fq} add column if not exists note string")
-    finally:
-        cur.close()
+COVERAGE_COLUMNS = {
+    'service_type': 'string',
+    'year': 'int',
+    'month': 'int',
+    'url': 'string',
+    'has_parquet': 'boolean',
+    'http_status': 'int',
+    'content_length': 'number(38,0)',
+    'checked_at': 'timestamp_ntz',
+    'notes': 'string',
+}
 
-def _ensure_coverage_columns(conn, db, schema, table='coverage_matrix'):
-    fq = f"{db}.{schema}.{table}"
-    cur = conn.cursor()
-    try:
-        cur.execute(f"alter table if exists {fq} add column if not exists url string")
-        cur.execute(f"alter table if exists {fq} add column if not exists has_parquet boolean")
-        cur.execute(f"alter table if exists {fq} add column if not exists http_status int")
-        cur.execute(f"alter table if exists {fq} add column if not exists content_length number(38,0)")
-        cur.execute(f"alter table if exists {fq} add column if not exists checked_at timestamp_ntz")
-        cur.execute(f"alter table if exists {fq} add column if not exists notes string")
-    finally:
-        cur.close()
+def _ensure_tables(conn, registry, refresh=False):
+    registry.ensure(conn, 'load_audit', AUDIT_COLUMNS, refresh=refresh)
+    registry.ensure(conn, 'coverage_matrix', COVERAGE_COLUMNS, refresh=refresh)
 
 # ============== Helpers ==============
-BASE_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data"
-def _build_url(service: str, year: int, month: int) -> str:
-    return f"{BASE_URL}/{service}_tripdata_{year}-{month:02d}.parquet"
-
-def _grid_to_df(services, years_from, years_to):
-    rows = []
-    for svc in services:
-        for y in range(int(years_from), int(years_to) + 1):
-            for m in range(1, 13):
-                rows.append((svc, y, m))
-    return pd.DataFrame(rows, columns=['service_type','year','month'])
-
 def _values_rows_int(int_iterable):
-    # genera: (2015),(2016),...  -> múltiples filas (correcto para Snowflake VALUES)
+    # genera: (2015),(2016),...  -> múltiples filas de VALUES
     return ", ".join(f"({int(v)})" for v in int_iterable)
 
-# ============== Exportador principal ==============
-@data_exporter
-def export_data(*args, **kwargs) -> None:
-    """
-    Construye/actualiza LOAD_AUDIT y COVERAGE_MATRIX directamente desde RAW.
-    kwargs:
-      - years_from: int (default 2015)
-      - years_to:   int (default 2025)
-      - services:   list[str] (default ['green','yellow'])
-      - schema:     str (default: secreto SNOWFLAKE_SCHEMA_RAW)  -> SIN fallback
-      - truncate:   bool (default True)  -> TRUNCATE + INSERT
-      - write_csv:  bool (default True)  -> guarda coverage_matrix.csv en el repo
-    """
-    DB = get_secret_value('SNOWFLAKE_DATABASE')
-    SCHEMA = kwargs.get('schema') or get_secret_value('SNOWFLAKE_SCHEMA_RAW')  # SIN fallback
-
-    years_from = int(kwargs.get('years_from', 2015))
-    years_to   = int(kwargs.get('years_to', 2025))
-    services   = [s.lower() for s in kwargs.get('services', ['green','yellow']) if s.lower() in ('green','yellow')]
-    if not services:
-        services = ['green','yellow']
-    truncate   = bool(kwargs.get('truncate', True))
-    write_csv  = bool(kwargs.get('write_csv', True))
-
-    # 1) Armar malla completa
-    base = _grid_to_df(services, years_from, years_to)
-
-    # 2) SQL de conteos desde RAW (VALUES como filas)
+# ============== Conteos ==============
+def _sql_counts(DB, SCHEMA, services, years_from, years_to):
+    """Recuento completo desde RAW (modo 'scan'). SQL válido en Snowflake y en DuckDB."""
     services_vals = ", ".join([f"('{s}')" for s in services])
     years_rows  = _values_rows_int(range(years_from, years_to + 1))  # -> (2015),(2016),...
     months_rows = _values_rows_int(range(1, 13))                     # -> (1),(2),...
-
-    sql_counts = f"""
-with services(service_type) as (
-  select column1 from values {services_vals}
+    # un count(*) por tabla BRONZE de cada servicio pedido (registro utils/trip_services)
+    counts_sql = "\n  union all\n".join(f"""  select '{s}' as service_type, year, month,
+         count(*) as row_count,
+         max(try_to_timestamp(ingest_ts)) as latest_ingest_ts
+  from {DB}.{SCHEMA}.{get_service(s).table}
+  where year between {years_from} and {years_to}
+  group by 1,2,3""" for s in services)
+    return f"""
+with services as (
+  select * from (values {services_vals}) as v(service_type)
 ),
-years(year) as (
-  select column1 from values {years_rows}
+years as (
+  select * from (values {years_rows}) as v(year)
 ),
-months(month) as (
-  select column1 from values {months_rows}
+months as (
+  select * from (values {months_rows}) as v(month)
 ),
 base as (
   select s.service_type, y.year, m.month
@@ -135,19 +80,7 @@ base as (
   cross join months m
 ),
 counts as (
-  select 'green' as service_type, year, month,
-         count(*) as row_count,
-         max(try_to_timestamp(ingest_ts)) as latest_ingest_ts
-  from {DB}.{SCHEMA}.green_trips
-  where year between {years_from} and {years_to}
-  group by 1,2,3
-  union all
-  select 'yellow' as service_type, year, month,
-         count(*) as row_count,
-         max(try_to_timestamp(ingest_ts)) as latest_ingest_ts
-  from {DB}.{SCHEMA}.yellow_trips
-  where year between {years_from} and {years_to}
-  group by 1,2,3
+{counts_sql}
 )
 select
   b.service_type,
@@ -163,65 +96,174 @@ left join counts c
 order by b.service_type, b.year, b.month
 """
 
-    conn = _conn(schema_override=SCHEMA)
+def _counts_from_ledger(conn, DB, SCHEMA, base, services, years_from, years_to):
+    """
+    Modo 'ledger': particiones cuyo último run (LOAD_LEDGER) aún no está en
+    LOAD_AUDIT + claves de la malla que la auditoría no tiene todavía (MISSING).
+    Solo lee tablas chicas (ledger / auditoría); no toca BRONZE.
+    """
+    changed = read_unsynced(conn, DB, SCHEMA, services=services, years=range(years_from, years_to + 1))
+    changed = changed[['service_type','year','month','row_count','latest_ingest_ts','run_id','status',
+                       'source_url','content_length']].rename(columns={'status': 'ledger_status'})
+    changed['year'] = changed['year'].astype(int)
+    changed['month'] = changed['month'].astype(int)
+
+    cur = conn.cursor()
+    try:
+        cur.execute(f"select service_type, year, month from {DB}.{SCHEMA}.load_audit "
+                    f"where year between {years_from} and {years_to}")
+        audited = pd.DataFrame(cur.fetchall(), columns=KEY_COLUMNS)
+    finally:
+        cur.close()
+    keys = KEY_COLUMNS
+    known = pd.concat([audited, changed[keys]]).astype({'year': int, 'month': int}).drop_duplicates()
+    missing = base.merge(known, on=keys, how='left', indicator=True)
+    missing = missing[missing['_merge'] == 'left_only'][keys]
+    return pd.concat([changed, missing.assign(row_count=0)], ignore_index=True)
+
+# ============== Construcción de filas ==============
+def _audit_rows(counts: pd.DataFrame) -> pd.DataFrame:
+    audit_df = counts.copy()
+    audit_df['row_count'] = audit_df['row_count'].fillna(0).astype(int)
+    for c in ('latest_ingest_ts', 'run_id', 'ledger_status'):
+        if c not in audit_df.columns:
+            audit_df[c] = None
+    audit_df['status'] = audit_status(audit_df['row_count'], audit_df['ledger_status'])
+    audit_df['note'] = None
+    audit_df.loc[audit_df['status'] == 'ERROR', 'note'] = 'última carga con error (ver LOAD_LEDGER)'
+    return audit_df[list(AUDIT_COLUMNS)]
+
+def _coverage_rows(counts: pd.DataFrame, audit_df: pd.DataFrame, notes: str) -> pd.DataFrame:
+    now_ntz = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    cov_df = audit_df[['service_type','year','month','row_count']].copy()
+    src = counts['source_url'] if 'source_url' in counts.columns else None
+    cov_df['url'] = fill_urls(src, cov_df['service_type'], cov_df['year'], cov_df['month']).to_numpy()
+    cov_df['has_parquet'] = cov_df['row_count'] > 0
+    cov_df['http_status'] = http_status(cov_df['has_parquet']).to_numpy()
+    cov_df['content_length'] = counts['content_length'] if 'content_length' in counts.columns else pd.NA
+    cov_df['checked_at'] = pd.to_datetime(now_ntz)  # NTZ
+    cov_df['notes'] = notes
+    return cov_df[list(COVERAGE_COLUMNS)]
+
+def _delete_keys(cur, fq, keys_df):
+    keys = ", ".join([f"('{r.service_type}',{int(r.year)},{int(r.month)})" for r in keys_df.itertuples(index=False)])
+    if keys:
+        cur.execute(f"delete from {fq} where (service_type,year,month) in ({keys})")
+
+def _write_delete_insert(conn, cur, DB, SCHEMA, audit_df, cov_df, truncate, write_pandas):
+    """Escritura previa a MERGE: TRUNCATE o DELETE por lista de claves + write_pandas."""
+    fq_audit = f"{DB}.{SCHEMA}.load_audit"
+    fq_cov   = f"{DB}.{SCHEMA}.coverage_matrix"
+    if truncate:
+        cur.execute(f"truncate table {fq_audit}")
+        cur.execute(f"truncate table {fq_cov}")
+    else:
+        # delete selectivo: solo las claves que se reescriben
+        keys_df = audit_df[KEY_COLUMNS]
+        _delete_keys(cur, fq_audit, keys_df)
+        _delete_keys(cur, fq_cov, keys_df)
+
+    ok1, c1, n1, _ = write_pandas(conn, audit_df, table_name='load_audit', database=DB, schema=SCHEMA, quote_identifiers=False, chunk_size=100_000)
+    ok2, c2, n2, _ = write_pandas(conn, cov_df,   table_name='coverage_matrix', database=DB, schema=SCHEMA, quote_identifiers=False, chunk_size=100_000)
+    print(f"[load_audit] ok={ok1}, rows={n1}, chunks={c1}")
+    print(f"[coverage_matrix] ok={ok2}, rows={n2}, chunks={c2}")
+
+def _write_merge(conn, DB, SCHEMA, audit_df, cov_df, truncate, write_pandas):
+    """Stage único por tabla + MERGE de ambas en una transacción (truncate -> borra claves ausentes)."""
+    out = merge_frames(conn, DB, SCHEMA, [
+        {'table': 'load_audit', 'df': audit_df, 'columns': AUDIT_COLUMNS, 'keys': KEY_COLUMNS, 'replace': truncate},
+        {'table': 'coverage_matrix', 'df': cov_df, 'columns': COVERAGE_COLUMNS, 'keys': KEY_COLUMNS, 'replace': truncate},
+    ], writer=write_pandas)
+    print(f"[load_audit] merge rows={out['load_audit']} | [coverage_matrix] merge rows={out['coverage_matrix']}")
+
+def _write_store(audit_df, cov_df, kwargs):
+    """Upsert de las particiones escritas en el store de cobertura local + CSV atómico."""
+    local = cov_df.assign(row_count=audit_df['row_count'].to_numpy())
+    with open_store(kwargs) as store:
+        n = store.upsert(local)
+        out_path = store.export_csv(kwargs.get('coverage_csv_path'))
+    print(f"[coverage_matrix] Store local: {n} particiones | CSV escrito en {out_path}")
+
+# ============== Exportador principal ==============
+@data_exporter
+def export_data(*args, **kwargs) -> None:
+    """
+    Construye/actualiza LOAD_AUDIT y COVERAGE_MATRIX.
+    kwargs:
+      - mode:       'ledger' (default) | 'scan'
+                    ledger -> solo las particiones cuyo run de LOAD_LEDGER todavía no está en
+                              LOAD_AUDIT (+ MISSING para claves nuevas de la malla); DELETE + INSERT
+                              de esas claves, sin escanear BRONZE
+                    scan   -> recuento completo desde RAW (count(*) / max(ingest_ts)); para
+                              particiones cargadas antes de existir el ledger
+      - years_from: int (default 2015)
+      - years_to:   int (default 2025)
+      - services:   list[str] (default ['green','yellow']; cualquiera del registro utils/trip_services,
+                    p.ej. ['yellow','green','fhv','fhvhv']; un nombre desconocido -> ValueError)
+      - warehouse:  'snowflake' | 'duckdb' (default env WAREHOUSE_BACKEND o 'snowflake'; utils/warehouse)
+      - duckdb_path: str (default env DBT_DUCKDB_PATH o nyc_tlc.duckdb) -> solo warehouse='duckdb'
+      - schema:     str (default: RAW del warehouse; en Snowflake el secreto SNOWFLAKE_SCHEMA_RAW)  -> SIN fallback
+      - truncate:   bool (default True)  -> solo mode='scan': la tabla queda con exactamente las claves
+                                            recontadas (MERGE + delete de las ausentes, o TRUNCATE + INSERT)
+      - write_method: 'merge' (default) | 'delete_insert'
+                    merge         -> una tabla temporal por destino + MERGE de load_audit y
+                                     coverage_matrix en una sola transacción
+                    delete_insert -> DELETE por lista de claves (o TRUNCATE) + write_pandas del warehouse
+      - write_csv:  bool (default True)  -> upsert de las particiones escritas en el store de
+                                            cobertura local (utils/coverage_store) + coverage_matrix.csv
+      - coverage_store_path / coverage_csv_path: rutas del store y del CSV (default en el repo)
+      - schema_refresh: bool (default False) -> ignora la huella cacheada del esquema y re-introspecciona
+    """
+    warehouse = get_warehouse(kwargs)
+    DB = warehouse.database
+    SCHEMA = kwargs.get('schema') or warehouse.schema('raw')  # SIN fallback
+
+    mode = str(kwargs.get('mode', 'ledger'))
+    if mode not in ('ledger', 'scan'):
+        raise ValueError(f"mode inválido: {mode}")
+    years_from = int(kwargs.get('years_from', 2015))
+    years_to   = int(kwargs.get('years_to', 2025))
+    services   = resolve_services(kwargs.get('services') or ['green','yellow'])  # ValueError con desconocidos
+    truncate   = bool(kwargs.get('truncate', True)) and mode == 'scan'
+    write_csv  = bool(kwargs.get('write_csv', True))
+    write_method = str(kwargs.get('write_method', 'merge'))
+    if write_method not in ('merge', 'delete_insert'):
+        raise ValueError(f"write_method inválido: {write_method}")
+
+    # 1) Armar malla completa
+    base = year_grid(services, years_from, years_to)
+
+    conn = _conn(warehouse, schema_override=SCHEMA)
     cur = conn.cursor()
     try:
-        # 3) Ejecutar conteos
-        cur.execute(sql_counts)
-        df_counts: pd.DataFrame = cur.fetch_pandas_all()
-        df_counts.columns = [c.lower() for c in df_counts.columns]
-        df_counts['row_count'] = df_counts['row_count'].fillna(0).astype(int)
-
-        # 4) Construir LOAD_AUDIT
-        audit_df = df_counts.copy()
-        audit_df['status'] = audit_df['row_count'].apply(lambda x: 'OK' if x > 0 else 'MISSING')
-        audit_df['note'] = pd.NA
-        audit_df = audit_df[['service_type','year','month','row_count','latest_ingest_ts','status','note']]
-
-        # 5) Construir COVERAGE_MATRIX (basado en audit_df)
-        now_ntz = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-        cov_df = audit_df[['service_type','year','month','row_count']].copy()
-        cov_df['url'] = cov_df.apply(lambda r: _build_url(r['service_type'], int(r['year']), int(r['month'])), axis=1)
-        cov_df['has_parquet'] = cov_df['row_count'] > 0
-        cov_df['http_status'] = cov_df['has_parquet'].apply(lambda v: 200 if bool(v) else None)
-        cov_df['content_length'] = pd.NA
-        cov_df['checked_at'] = pd.to_datetime(now_ntz)  # NTZ
-        cov_df['notes'] = 'from_raw'
-        cov_df = cov_df[['service_type','year','month','url','has_parquet','http_status','content_length','checked_at','notes']]
-
-        # 6) Asegurar tablas y columnas
-        cur.execute(DDL_AUDIT_MIN.format(db=DB, schema=SCHEMA))
-        _ensure_audit_columns(conn, DB, SCHEMA)
-
-        cur.execute(DDL_COVERAGE_MIN.format(db=DB, schema=SCHEMA))
-        _ensure_coverage_columns(conn, DB, SCHEMA)
-
-        # 7) Escribir en Snowflake (TRUNCATE + INSERT por defecto)
-        fq_audit = f"{DB}.{SCHEMA}.load_audit"
-        fq_cov   = f"{DB}.{SCHEMA}.coverage_matrix"
-
-        if truncate:
-            cur.execute(f"truncate table {fq_audit}")
-            cur.execute(f"truncate table {fq_cov}")
+        # 2) Asegurar tablas y columnas (solo la DDL que falte)
+        _ensure_tables(conn, warehouse.registry(DB, SCHEMA), refresh=bool(kwargs.get('schema_refresh', False)))
+
+        # 3) Conteos: ledger (particiones tocadas) o recuento completo desde RAW
+        if mode == 'ledger':
+            counts = _counts_from_ledger(conn, DB, SCHEMA, base, services, years_from, years_to)
         else:
-            # delete selectivo para la malla solicitada
-            keys = ", ".join([f"('{r.service_type}',{int(r.year)},{int(r.month)})" for r in base.itertuples(index=False)])
-            if keys:
-                cur.execute(f"delete from {fq_audit} where (service_type,year,month) in ({keys})")
-                cur.execute(f"delete from {fq_cov}   where (service_type,year,month) in ({keys})")
-
-        ok1, c1, n1, _ = write_pandas(conn, audit_df, table_name='load_audit', database=DB, schema=SCHEMA, quote_identifiers=False, chunk_size=100_000)
-        ok2, c2, n2, _ = write_pandas(conn, cov_df,   table_name='coverage_matrix', database=DB, schema=SCHEMA, quote_identifiers=False, chunk_size=100_000)
-        print(f"[load_audit] ok={ok1}, rows={n1}, chunks={c1}")
-        print(f"[coverage_matrix] ok={ok2}, rows={n2}, chunks={c2}")
-
-        # 8) (Opcional) Guardar coverage_matrix.csv en el repo
-        if write_csv:
-            out_path = os.path.join(get_repo_path(), 'coverage_matrix.csv')
-            tmp = out_path + ".tmp"
-            cov_df.to_csv(tmp, index=False)
-            os.replace(tmp, out_path)
-            print(f"[coverage_matrix] CSV escrito en {out_path}")
+            cur.execute(_sql_counts(DB, SCHEMA, services, years_from, years_to))
+            counts: pd.DataFrame = cur.fetch_pandas_all()
+            counts.columns = [c.lower() for c in counts.columns]
+        print(f"[load_audit] mode={mode} | particiones a actualizar: {len(counts)}")
+
+        # 4) Construir LOAD_AUDIT y COVERAGE_MATRIX (basado en audit_df)
+        audit_df = _audit_rows(counts)
+        cov_df = _coverage_rows(counts, audit_df, 'from_ledger' if mode == 'ledger' else 'from_raw')
+
+        # 5) Escribir en el warehouse
+        if not audit_df.empty:
+            if write_method == 'merge':
+                _write_merge(conn, DB, SCHEMA, audit_df, cov_df, truncate, warehouse.write_pandas)
+            else:
+                _write_delete_insert(conn, cur, DB, SCHEMA, audit_df, cov_df, truncate, warehouse.write_pandas)
+        else:
+            print("[load_audit] Sin cambios desde la última sincronización")
+
+        # 6) (Opcional) Store de cobertura local + coverage_matrix.csv en el repo
+        if write_csv and not audit_df.empty:
+            _write_store(audit_df, cov_df, kwargs)
 
     finally:
         try: cur.close()
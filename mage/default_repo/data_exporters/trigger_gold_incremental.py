@@ -0,0 +1,56 @@
+# --- guard del template de Mage ---
+if 'data_exporter' not in globals():
+    from mage_ai.data_preparation.decorators import data_exporter
+
+import pandas as pd
+
+GOLD_PIPELINE = 'gold_incremental'
+
+
+def touched_partitions(summary: pd.DataFrame) -> list:
+    """Particiones que copy_into_bronze reemplazó con éxito, como 'servicio-YYYY-MM'."""
+    ok = summary[(summary['status'] == 'OK') & (summary['rows'] > 0)]
+    return [f"{r.service_type}-{int(r.year)}-{int(r.month):02d}"
+            for r in ok[['service_type', 'year', 'month']].drop_duplicates().itertuples(index=False)]
+
+
+@data_exporter
+def export_data(summary: pd.DataFrame, **kwargs) -> None:
+    """
+    Dispara el pipeline `gold_incremental` (dbt run incremental de silver_trips ->
+    fct_trips -> rollups de gold) pasándole como variable `partitions` las
+    particiones que tocó copy_into_bronze ('yellow-2024-01,green-2024-01').
+    silver_trips y fct_trips solo reprocesan esas particiones (fct_trips: delete +
+    MERGE por trip_sk); los rollups toman las que cambiaron en fct_trips por
+    watermark. Sin particiones cargadas no dispara nada.
+    full_refresh=True dispara siempre y corre los tres pasos con `--full-refresh`
+    (variable `dbt_flags`): migración única de un destino con otro esquema, p.ej.
+    trip_sk varchar de antes de la huella (fct_trips tiene on_schema_change='fail').
+    kwargs:
+      - gold_pipeline (str, default 'gold_incremental')
+      - full_refresh  (bool, default False) -> rebuild completo de silver, fct_trips y rollups
+      - wait          (bool, default False) -> espera a que termine el run de dbt
+      - poll_interval (int, default 30) -> segundos entre chequeos con wait=True
+    """
+    parts = touched_partitions(summary)
+    full_refresh = bool(kwargs.get('full_refresh', False))
+    if not parts and not full_refresh:
+        print("[gold] Sin particiones cargadas: no se dispara fct_trips")
+        return
+    from mage_ai.orchestration.triggers.api import trigger_pipeline
+
+    pipeline = kwargs.get('gold_pipeline', GOLD_PIPELINE)
+    wait = bool(kwargs.get('wait', False))
+    if full_refresh:
+        print(f"[gold] Disparando {pipeline} con --full-refresh")
+    else:
+        print(f"[gold] Disparando {pipeline} con {len(parts)} particiones: {', '.join(parts[:12])}"
+              f"{' ...' if len(parts) > 12 else ''}")
+    trigger_pipeline(
+        pipeline,
+        variables={'partitions': ','.join(parts), 'dbt_flags': '--full-refresh' if full_refresh else ''},
+        check_status=wait,
+        error_on_failure=wait,
+        poll_interval=int(kwargs.get('poll_interval', 30)),
+        verbose=True,
+    )
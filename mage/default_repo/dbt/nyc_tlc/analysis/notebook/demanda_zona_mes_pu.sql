@@ -0,0 +1,23 @@
+-- Demanda por zona y mes – Pickup (evidencia/notebook_result/Demanda_por_zona_y_mes.csv)
+with base as (
+  select
+      t.year,
+      t.month,
+      dz.zone_id,
+      dz.borough,
+      dz.zone,
+      count(*) as trips
+  from {{ ref('fct_trips') }} t
+  left join {{ ref('dim_zone') }} dz on dz.zone_sk = t.pu_zone_sk
+  where t.pickup_datetime between '2019-01-01' and '2019-12-31'
+  group by 1,2,3,4,5
+),
+ranked as (
+  select *,
+         row_number() over (partition by year, month order by trips desc, zone_id) as rn
+  from base
+)
+select year, month, zone_id, borough, zone, trips
+from ranked
+where rn <= 10
+order by year, month, trips desc
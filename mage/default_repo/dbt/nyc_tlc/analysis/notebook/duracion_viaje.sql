@@ -0,0 +1,13 @@
+-- Duración del viaje – percentiles (evidencia/notebook_result/Duracion_del_viaje.csv)
+select
+    dz.zone_id as pu_location_id,
+    {{ approx_percentile('t.trip_minutes', 0.5) }} as p50_minutes,
+    {{ approx_percentile('t.trip_minutes', 0.9) }} as p90_minutes,
+    count(*) as trips
+from {{ ref('fct_trips') }} t
+left join {{ ref('dim_zone') }} dz on dz.zone_sk = t.pu_zone_sk
+where t.trip_minutes > 0
+  and t.trip_minutes < 240
+  and t.pickup_datetime between '2019-01-01' and '2019-12-31'
+group by dz.zone_id
+order by trips desc
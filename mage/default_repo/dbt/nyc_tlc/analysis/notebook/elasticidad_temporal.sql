@@ -0,0 +1,9 @@
+-- Elasticidad temporal – distribución por hora/día (evidencia/notebook_result/Elasticidad_temporal.csv)
+select
+    dayofweek(t.pickup_datetime) as dow,     -- 0=Domingo
+    extract(hour from t.pickup_datetime) as hh,
+    count(*) as trips
+from {{ ref('fct_trips') }} t
+where t.pickup_datetime between '2019-01-01' and '2019-12-31'
+group by 1,2
+order by 1,2
@@ -0,0 +1,13 @@
+-- Horas pico (evidencia/notebook_result/Horas_pico.csv)
+with by_hour as (
+  select
+      extract(hour from t.pickup_datetime) as hh,
+      count(*) as trips
+  from {{ ref('fct_trips') }} t
+  where t.pickup_datetime between '2019-01-01' and '2019-12-31'
+  group by 1
+)
+select *
+from by_hour
+order by trips desc
+limit 10
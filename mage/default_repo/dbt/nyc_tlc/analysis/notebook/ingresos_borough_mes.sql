@@ -0,0 +1,11 @@
+-- Ingresos por borough y mes (PU) (evidencia/notebook_result/Ingresos por borough y mes.csv)
+select
+    dz.borough,
+    t.year,
+    t.month,
+    sum(t.total_amount) as revenue_usd
+from {{ ref('fct_trips') }} t
+left join {{ ref('dim_zone') }} dz on dz.zone_sk = t.pu_zone_sk
+where t.pickup_datetime between '2019-01-01' and '2019-12-31'
+group by 1,2,3
+order by 2,3,1
@@ -0,0 +1,16 @@
+-- Ingresos y propinas por borough y mes (evidencia/notebook_result/Ingresos_por_borough_y_mes_TIPS.csv)
+select
+  dz.borough,
+  t.year,
+  t.month,
+  sum(t.total_amount)                                  as revenue_gross_usd,
+  sum(coalesce(t.tip_amount,0))                        as tips_usd,
+  sum(t.total_amount) - sum(coalesce(t.tip_amount,0))  as revenue_net_ex_tip_usd,
+  round(nullif(sum(coalesce(t.tip_amount,0)),0)
+        / nullif(sum(t.total_amount),0) * 100, 2)      as tip_pct
+from {{ ref('fct_trips') }} t
+left join {{ ref('dim_zone') }} dz on dz.zone_sk = t.pu_zone_sk
+where t.pickup_datetime >= '2019-01-01'
+  and t.pickup_datetime <  '2020-01-01'
+group by 1,2,3
+order by 2,3,1
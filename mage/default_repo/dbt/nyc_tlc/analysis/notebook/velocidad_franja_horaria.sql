@@ -0,0 +1,23 @@
+-- Velocidad promedio (mph) por franja horaria (evidencia/notebook_result/Velocidad_promedio_por_franja_horaria.csv)
+with base as (
+  select
+      dz.borough,
+      case
+          when extract(hour from t.pickup_datetime) between 6 and 21 then 'day'
+          else 'night'
+      end as band,
+      sum(t.trip_distance) as sum_miles,
+      sum(t.trip_minutes)  as sum_minutes
+  from {{ ref('fct_trips') }} t
+  left join {{ ref('dim_zone') }} dz on dz.zone_sk = t.pu_zone_sk
+  where t.trip_distance is not null
+    and t.trip_minutes  > 0
+    and t.pickup_datetime between '2019-01-01' and '2019-12-31'
+  group by 1,2
+)
+select
+  borough,
+  band,
+  round(sum_miles / nullif(sum_minutes,0) * 60, 2) as avg_mph
+from base
+order by borough, band
@@ -0,0 +1,25 @@
+-- Demanda por zona y mes – Dropoff, desde agg_trips_do_hourly (= analysis/notebook/demanda_zona_mes_do.sql)
+-- Ventana del notebook: pickup between '2019-01-01' and '2019-12-31' (hasta 2019-12-31 00:00:00);
+-- por horas es pickup_hour < '2019-12-31' (solo difieren pickups exactamente a 2019-12-31 00:00:00).
+with base as (
+  select
+      r.year,
+      r.month,
+      dz.zone_id,
+      dz.borough,
+      dz.zone,
+      sum(r.trips) as trips
+  from {{ ref('agg_trips_do_hourly') }} r
+  left join {{ ref('dim_zone') }} dz on dz.zone_sk = r.do_zone_sk
+  where r.pickup_hour >= '2019-01-01' and r.pickup_hour < '2019-12-31'
+  group by 1,2,3,4,5
+),
+ranked as (
+  select *,
+         row_number() over (partition by year, month order by trips desc, zone_id) as rn
+  from base
+)
+select year, month, zone_id, borough, zone, trips
+from ranked
+where rn <= 10
+order by year, month, trips desc
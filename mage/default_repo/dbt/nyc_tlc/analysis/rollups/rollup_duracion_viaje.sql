@@ -0,0 +1,31 @@
+-- Duración del viaje – percentiles, desde el histograma agg_trip_minutes_daily (= analysis/notebook/duracion_viaje.sql)
+-- Percentil exacto (percentile_disc: primer minuto cuya frecuencia acumulada llega a p)
+-- en lugar de approx_percentile; la ventana por días es pickup_date < '2019-12-31'.
+with hist as (
+  select
+      dz.zone_id,
+      h.trip_minutes,
+      sum(h.trips) as trips
+  from {{ ref('agg_trip_minutes_daily') }} h
+  left join {{ ref('dim_zone') }} dz on dz.zone_sk = h.pu_zone_sk
+  where h.trip_minutes is not null
+    and h.pickup_date >= '2019-01-01' and h.pickup_date < '2019-12-31'
+  group by 1,2
+),
+cum as (
+  select
+      zone_id,
+      trip_minutes,
+      sum(trips) over (partition by zone_id order by trip_minutes
+                       rows between unbounded preceding and current row) as cum_trips,
+      sum(trips) over (partition by zone_id) as total_trips
+  from hist
+)
+select
+    zone_id as pu_location_id,
+    min(case when cum_trips >= 0.5 * total_trips then trip_minutes end) as p50_minutes,
+    min(case when cum_trips >= 0.9 * total_trips then trip_minutes end) as p90_minutes,
+    max(total_trips) as trips
+from cum
+group by zone_id
+order by trips desc
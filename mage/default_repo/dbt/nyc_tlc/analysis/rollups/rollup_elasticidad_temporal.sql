@@ -0,0 +1,9 @@
+-- Elasticidad temporal, desde agg_trips_pu_hourly (= analysis/notebook/elasticidad_temporal.sql)
+select
+    dayofweek(r.pickup_hour) as dow,     -- 0=Domingo
+    extract(hour from r.pickup_hour) as hh,
+    sum(r.trips) as trips
+from {{ ref('agg_trips_pu_hourly') }} r
+where r.pickup_hour >= '2019-01-01' and r.pickup_hour < '2019-12-31'
+group by 1,2
+order by 1,2
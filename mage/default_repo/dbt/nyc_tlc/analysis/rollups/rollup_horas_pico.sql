@@ -0,0 +1,13 @@
+-- Horas pico, desde agg_trips_pu_hourly (= analysis/notebook/horas_pico.sql)
+with by_hour as (
+  select
+      extract(hour from r.pickup_hour) as hh,
+      sum(r.trips) as trips
+  from {{ ref('agg_trips_pu_hourly') }} r
+  where r.pickup_hour >= '2019-01-01' and r.pickup_hour < '2019-12-31'
+  group by 1
+)
+select *
+from by_hour
+order by trips desc
+limit 10
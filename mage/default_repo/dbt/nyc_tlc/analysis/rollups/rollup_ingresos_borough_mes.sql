@@ -0,0 +1,11 @@
+-- Ingresos por borough y mes (PU), desde agg_trips_pu_hourly (= analysis/notebook/ingresos_borough_mes.sql)
+select
+    dz.borough,
+    r.year,
+    r.month,
+    sum(r.total_amount) as revenue_usd
+from {{ ref('agg_trips_pu_hourly') }} r
+left join {{ ref('dim_zone') }} dz on dz.zone_sk = r.pu_zone_sk
+where r.pickup_hour >= '2019-01-01' and r.pickup_hour < '2019-12-31'
+group by 1,2,3
+order by 2,3,1
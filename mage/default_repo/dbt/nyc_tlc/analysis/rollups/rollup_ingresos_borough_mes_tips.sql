@@ -0,0 +1,17 @@
+-- Ingresos y propinas por borough y mes, desde agg_trips_pu_hourly (= analysis/notebook/ingresos_borough_mes_tips.sql)
+-- tip_amount del rollup ya es sum(coalesce(tip_amount, 0))
+select
+  dz.borough,
+  r.year,
+  r.month,
+  sum(r.total_amount)                     as revenue_gross_usd,
+  sum(r.tip_amount)                       as tips_usd,
+  sum(r.total_amount) - sum(r.tip_amount) as revenue_net_ex_tip_usd,
+  round(nullif(sum(r.tip_amount),0)
+        / nullif(sum(r.total_amount),0) * 100, 2) as tip_pct
+from {{ ref('agg_trips_pu_hourly') }} r
+left join {{ ref('dim_zone') }} dz on dz.zone_sk = r.pu_zone_sk
+where r.pickup_hour >= '2019-01-01'
+  and r.pickup_hour <  '2020-01-01'
+group by 1,2,3
+order by 2,3,1
@@ -0,0 +1,23 @@
+-- Velocidad promedio (mph) por franja horaria, desde agg_trips_pu_hourly (= analysis/notebook/velocidad_franja_horaria.sql)
+-- speed_miles / speed_minutes ya tienen el filtro trip_distance is not null and trip_minutes > 0
+with base as (
+  select
+      dz.borough,
+      case
+          when extract(hour from r.pickup_hour) between 6 and 21 then 'day'
+          else 'night'
+      end as band,
+      sum(r.speed_miles)   as sum_miles,
+      sum(r.speed_minutes) as sum_minutes
+  from {{ ref('agg_trips_pu_hourly') }} r
+  left join {{ ref('dim_zone') }} dz on dz.zone_sk = r.pu_zone_sk
+  where r.pickup_hour >= '2019-01-01' and r.pickup_hour < '2019-12-31'
+  group by 1,2
+  having sum(r.speed_minutes) > 0
+)
+select
+  borough,
+  band,
+  round(sum_miles / nullif(sum_minutes,0) * 60, 2) as avg_mph
+from base
+order by borough, band
@@ -0,0 +1,43 @@
+{#- Diferencias de dialecto entre Snowflake (default) y DuckDB (target local de pruebas/benchmarks) -#}
+
+{#- ingest_ts llega como string ISO desde BRONZE; null si no parsea -#}
+{% macro try_timestamp_tz(expr) %}
+  {{- return(adapter.dispatch('try_timestamp_tz')(expr)) -}}
+{% endmacro %}
+
+{% macro default__try_timestamp_tz(expr) -%}
+  try_to_timestamp_tz({{ expr }})
+{%- endmacro %}
+
+{% macro duckdb__try_timestamp_tz(expr) -%}
+  try_cast({{ expr }} as timestamptz)
+{%- endmacro %}
+
+
+
+{#- float de Snowflake es de 64 bits; en DuckDB `float` es de 32 (real): se usa double -#}
+{% macro float_type() %}
+  {{- return(adapter.dispatch('float_type')()) -}}
+{% endmacro %}
+
+{% macro default__float_type() -%}
+  float
+{%- endmacro %}
+
+{% macro duckdb__float_type() -%}
+  double
+{%- endmacro %}
+
+{#- percentil aproximado (notebook): approx_percentile en Snowflake, approx_quantile en DuckDB -#}
+{% macro approx_percentile(expr, fraction) %}
+  {{- return(adapter.dispatch('approx_percentile')(expr, fraction)) -}}
+{% endmacro %}
+
+{% macro default__approx_percentile(expr, fraction) -%}
+  approx_percentile({{ expr }}, {{ fraction }})
+{%- endmacro %}
+
+{% macro duckdb__approx_percentile(expr, fraction) -%}
+  approx_quantile({{ expr }}, {{ fraction }})
+{%- endmacro %}
+
@@ -0,0 +1,136 @@
+{#-
+  Reproceso por partición natural (service_type, year, month) para modelos
+  incrementales (silver_trips, fct_trips). Flujo de una corrida incremental:
+    pre_hook    stage_touched_partitions: tabla <modelo>__touched con las
+                particiones a reprocesar.
+                - var `partitions` (la pasa el trigger de Mage con lo que cargó
+                  copy_into_bronze): 'yellow-2024-01,green-2024-01', una lista
+                  de esos strings, de [servicio, año, mes] o de dicts
+                  {service_type, year, month}.
+                - sin var: watermark por partición; las de la fuente cuyo
+                  max(ingest_ts) es más nuevo que el del destino (o que todavía
+                  no están en él), y las del destino que ya no están en la
+                  fuente (se borró la partición de BRONZE: quedan borradas).
+                  Con la var solo se tocan las particiones listadas; una
+                  partición borrada de BRONZE hay que listarla o correr sin
+                  var (o con --full-refresh).
+                - rows_col (rollups de gold): siempre watermark, y además las
+                  particiones cuyo count(*) en la fuente difiere de
+                  sum(rows_col) en el destino (el MERGE de fct_trips puede mover
+                  un viaje de partición sin cambiar el max(ingest_ts) de la
+                  que lo pierde).
+    pre_hook    stage_affected_keys (solo fct_trips): tabla <modelo>__affected
+                con las huellas que hoy tiene el destino en esas particiones.
+    pre_hook    delete_touched_partitions: borra esas particiones del destino.
+    modelo      silver_trips / rollups: append de las particiones tocadas.
+                fct_trips: relee las particiones tocadas + las filas de otras
+                particiones con las mismas huellas, deduplica por trip_fp y hace
+                MERGE por la clave única.
+    post_hook   drop_incremental_helper('touched' / 'affected').
+-#}
+
+{% macro partitions_var() %}
+  {%- set raw = var('partitions', none) -%}
+  {%- if raw is string -%}
+    {%- set raw = raw.split(',') -%}
+  {%- endif -%}
+  {%- set parts = [] -%}
+  {%- for p in (raw or []) -%}
+    {%- if p is string -%}
+      {%- set bits = p.strip().split('-') -%}
+      {%- if bits | length == 3 and bits[0].isalnum() -%}
+        {%- do parts.append([bits[0] | lower, bits[1] | int, bits[2] | int]) -%}
+      {%- endif -%}
+    {%- elif p is mapping -%}
+      {%- do parts.append([p['service_type'] | lower, p['year'] | int, p['month'] | int]) -%}
+    {%- else -%}
+      {%- do parts.append([p[0] | lower, p[1] | int, p[2] | int]) -%}
+    {%- endif -%}
+  {%- endfor -%}
+  {{ return(parts) }}
+{% endmacro %}
+
+
+{#- stg_<servicio> de los servicios de la var trip_services -#}
+{% macro trip_staging_relations() %}
+  {%- set rels = [] -%}
+  {%- for service in var('trip_services') -%}
+    {%- do rels.append(ref('stg_' ~ service)) -%}
+  {%- endfor -%}
+  {{ return(rels) }}
+{% endmacro %}
+
+
+{% macro helper_relation(suffix) %}
+  {{ return(this.incorporate(path={'identifier': this.identifier ~ '__' ~ suffix})) }}
+{% endmacro %}
+
+
+{#- Predicado sobre la tabla de particiones tocadas -#}
+{% macro in_touched_partitions(alias=none) %}
+  {%- set p = (alias ~ '.') if alias else '' -%}
+  ({{ p }}service_type, {{ p }}year, {{ p }}month) in (
+    select service_type, year, month from {{ helper_relation('touched') }}
+  )
+{%- endmacro %}
+
+
+{#- source_relations: lista de relaciones fuente (p.ej. los stg_<servicio> de silver) -#}
+{% macro stage_touched_partitions(source_relations, rows_col=none) %}
+  {%- if is_incremental() -%}
+    {%- set parts = partitions_var() if rows_col is none else [] -%}
+    create or replace table {{ helper_relation('touched') }} as
+    {% if parts -%}
+    select service_type, year, month
+    from (values
+      {%- for s, y, m in parts %}
+      ('{{ s }}', {{ y }}, {{ m }}){{ ',' if not loop.last }}
+      {%- endfor %}
+    ) as t (service_type, year, month)
+    {%- else -%}
+    select coalesce(s.service_type, t.service_type) as service_type,
+      coalesce(s.year, t.year) as year,
+      coalesce(s.month, t.month) as month
+    from (
+      {%- for rel in source_relations %}
+      {% if not loop.first %}union all
+      {% endif %}select service_type, year, month, max(ingest_ts) as ingest_ts{{ ', count(*) as n' if rows_col }}
+      from {{ rel }}
+      group by 1, 2, 3
+      {%- endfor %}
+    ) s
+    full outer join (
+      select service_type, year, month, max(ingest_ts) as ingest_ts{{ ', sum(' ~ rows_col ~ ') as n' if rows_col }}
+      from {{ this }}
+      group by 1, 2, 3
+    ) t
+      on t.service_type = s.service_type and t.year = s.year and t.month = s.month
+    where s.service_type is null or t.ingest_ts is null or s.ingest_ts > t.ingest_ts{{ ' or s.n <> t.n' if rows_col }}
+    {%- endif -%}
+  {%- endif -%}
+{% endmacro %}
+
+
+{#- key_col del destino (trip_sk), guardada como `as_col` para cruzarla con la fuente (trip_fp) -#}
+{% macro stage_affected_keys(key_col, as_col) %}
+  {%- if is_incremental() -%}
+    create or replace table {{ helper_relation('affected') }} as
+    select distinct {{ key_col }} as {{ as_col }}
+    from {{ this }}
+    where {{ in_touched_partitions() }}
+  {%- endif -%}
+{% endmacro %}
+
+
+{% macro delete_touched_partitions() %}
+  {%- if is_incremental() -%}
+    delete from {{ this }} where {{ in_touched_partitions() }}
+  {%- endif -%}
+{% endmacro %}
+
+
+{% macro drop_incremental_helper(suffix) %}
+  {%- if is_incremental() -%}
+    drop table if exists {{ helper_relation(suffix) }}
+  {%- endif -%}
+{% endmacro %}
@@ -1,15 +1,43 @@
-{{ config(materialized='view') }}
+{{ config(
+    materialized=var('silver_materialization', 'incremental'),
+    incremental_strategy='append',
+    on_schema_change='append_new_columns',
+    cluster_by=['service_type', 'to_date(pickup_datetime)'],
+    pre_hook=[
+      "{{ stage_touched_partitions(trip_staging_relations()) }}",
+      "{{ delete_touched_partitions() }}"
+    ],
+    post_hook="{{ drop_incremental_helper('touched') }}"
+) }}
 
+{#-
+  Tabla incremental: cada corrida reemplaza solo las particiones
+  (service_type, year, month) tocadas en BRONZE (var `partitions` o watermark de
+  ingest_ts de los stg_*; macros/incremental_partitions.sql). Las filas de silver
+  salen 1:1 de staging, así que borrar la partición y volver a insertarla deja
+  lo mismo que el rebuild completo. Una partición borrada de BRONZE se borra de
+  silver en la corrida sin var (el watermark la ve solo en el destino); con la
+  var hay que listarla, o correr con --full-refresh.
+  Clustering por servicio + fecha de pickup (Snowflake `cluster by`; en DuckDB
+  las filas se insertan ordenadas para que los zonemaps poden por fecha).
+  var silver_materialization='view' vuelve a la vista original (benchmarks).
+-#}
+
+{#- servicios a unir: var trip_services (dbt_project.yml), mismos nombres que utils/trip_services.py -#}
 with unioned as (
-  select * from {{ ref('stg_yellow') }}
-  union all
-  select * from {{ ref('stg_green') }}
+  {%- for service in var('trip_services') %}
+  {% if not loop.first %}union all
+  {% endif %}select * from {{ ref('stg_' ~ service) }}
+  {%- endfor %}
 ),
 
 filtered as (
   select *
   from unioned
   where pickup_datetime between '2009-01-01' and '2025-12-31'
+  {%- if is_incremental() %}
+    and {{ in_touched_partitions() }}
+  {%- endif %}
 ),
 
 clean as (
@@ -49,3 +77,6 @@ with_zones as (
 )
 
 select * from with_zones
+{%- if target.type == 'duckdb' %}
+order by service_type, pickup_datetime
+{%- endif %}
@@ -1,15 +1,46 @@
-{{ config(materialized='table') }}
+{{ config(
+    materialized='incremental',
+    incremental_strategy=('merge' if target.type == 'snowflake' else 'delete+insert'),
+    unique_key='trip_sk',
+    on_schema_change='fail',
+    pre_hook=[
+      "{{ stage_touched_partitions([source('silver', 'silver_trips')]) }}",
+      "{{ stage_affected_keys('trip_sk', 'trip_fp') }}",
+      "{{ delete_touched_partitions() }}"
+    ],
+    post_hook=[
+      "{{ drop_incremental_helper('touched') }}",
+      "{{ drop_incremental_helper('affected') }}"
+    ]
+) }}
+
+{#-
+  Incremental por partición natural (service_type, year, month); ver
+  macros/incremental_partitions.sql. Se reprocesan solo las particiones tocadas
+  (var `partitions` del trigger de Mage, o watermark de ingest_ts) más las filas
+  de otras particiones con la misma huella: las que el destino tenía en las
+  particiones tocadas (pre-hook stage_affected_keys) y las de silver en ellas.
+  Así el row_number() compite con todas las copias del viaje y elige el mismo
+  ganador que el rebuild completo; el MERGE por trip_sk lo deja en su partición.
+  Dedup y trip_sk salen de `trip_fp`, la huella binaria que calcula
+  copy_into_bronze (utils/trip_fingerprint).
+  on_schema_change='fail': un destino con otro esquema (p.ej. trip_sk varchar de
+  antes de la huella) no se migra solo; se reconstruye con `dbt run
+  --full-refresh` (trigger_gold_incremental con full_refresh=True). En DuckDB
+  (sin MERGE) se usa delete+insert por trip_sk, que deja el mismo resultado.
+-#}
 
 with src as (
   -- Trae todos los campos necesarios desde SILVER
   select
+      trip_fp,
       vendor_id,
       pickup_datetime,
       dropoff_datetime,
       passenger_count,
       trip_distance_clean  as trip_distance,
       total_amount_clean   as total_amount,
-      try_cast(tip_amount as float) as tip_amount,
+      try_cast(tip_amount as {{ float_type() }}) as tip_amount,
       trip_minutes,
       payment_type,
       ratecode_id,
@@ -21,8 +52,19 @@ with src as (
       run_id,
       ingest_ts
   from {{ source('silver', 'silver_trips') }}
+  {%- if is_incremental() %}
+  -- particiones tocadas + copias del mismo viaje en otras particiones (compiten en el dedup)
+  where {{ in_touched_partitions() }}
+     or trip_fp in (
+          select trip_fp from {{ helper_relation('affected') }}
+          union
+          select trip_fp from {{ source('silver', 'silver_trips') }}
+          where {{ in_touched_partitions() }}
+        )
+  {%- else %}
   -- Filtro opcional por fechas:
   -- where pickup_datetime >= '2019-01-01' and pickup_datetime < '2020-01-01'
+  {%- endif %}
 ),
 
 -- Dimensiones (GOLD)
@@ -39,6 +81,7 @@ rate as (
 -- Mapeo de claves naturales -> SKs de dimensiones
 mapped as (
   select
+    s.trip_fp,
     s.vendor_id,
     s.pickup_datetime,
     s.dropoff_datetime,
@@ -63,31 +106,20 @@ mapped as (
   left join rate  r   on r.ratecode_id  = s.ratecode_id
 ),
 
--- Deduplicación
+-- Deduplicación por huella (la huella incluye el servicio)
 dedup as (
   select
     m.*,
     row_number() over (
-      partition by
-        m.service_type, m.vendor_id,
-        m.pickup_datetime, m.dropoff_datetime,
-        m.pu_zone_sk, m.do_zone_sk,
-        m.payment_type_sk, m.ratecode_sk,
-        m.trip_distance, m.total_amount
+      partition by m.trip_fp
       order by m.ingest_ts desc, m.run_id desc
     ) as rn
   from mapped m
 )
 
 select
-    -- SK consistente
-    {{ dbt_utils.generate_surrogate_key([
-      'service_type','vendor_id',
-      'pickup_datetime','dropoff_datetime',
-      'pu_zone_sk','do_zone_sk',
-      'payment_type_sk','ratecode_sk',
-      'trip_distance','total_amount'
-    ]) }} as trip_sk,
+    -- SK consistente: la huella binaria de BRONZE (16 bytes)
+    trip_fp as trip_sk,
 
     pu_zone_sk,
     do_zone_sk,
@@ -104,6 +136,8 @@ select
     trip_minutes,
     service_type,
     year,
-    month
+    month,
+    run_id,
+    ingest_ts
 from dedup
-qualify rn = 1
+where rn = 1
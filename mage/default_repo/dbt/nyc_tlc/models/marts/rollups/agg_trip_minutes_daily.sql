@@ -0,0 +1,34 @@
+{{ config(
+    materialized='incremental',
+    incremental_strategy='append',
+    pre_hook=[
+      "{{ stage_touched_partitions([ref('fct_trips')], rows_col='trips') }}",
+      "{{ delete_touched_partitions() }}"
+    ],
+    post_hook="{{ drop_incremental_helper('touched') }}"
+) }}
+
+{#-
+  Histograma exacto de duración por día x zona de pickup x servicio: una fila
+  por minuto entero (trip_minutes es datediff en minutos) entre 1 y 239, el
+  rango de percentiles del notebook. Los histogramas se combinan sumando
+  `trips`, así que los percentiles de cualquier ventana de días / conjunto de
+  zonas salen exactos (percentile_disc) sin volver a fct_trips. Las duraciones
+  fuera de rango quedan en la fila trip_minutes = null para que sum(trips)
+  cuadre con fct_trips (watermark por conteo).
+-#}
+
+select
+    cast(pickup_datetime as date) as pickup_date,
+    service_type,
+    year,
+    month,
+    pu_zone_sk,
+    case when trip_minutes > 0 and trip_minutes < 240 then trip_minutes end as trip_minutes,
+    count(*)       as trips,
+    max(ingest_ts) as ingest_ts
+from {{ ref('fct_trips') }}
+{%- if is_incremental() %}
+where {{ in_touched_partitions() }}
+{%- endif %}
+group by 1, 2, 3, 4, 5, 6
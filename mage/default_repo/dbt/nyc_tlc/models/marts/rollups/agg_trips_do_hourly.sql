@@ -0,0 +1,26 @@
+{{ config(
+    materialized='incremental',
+    incremental_strategy='append',
+    pre_hook=[
+      "{{ stage_touched_partitions([ref('fct_trips')], rows_col='trips') }}",
+      "{{ delete_touched_partitions() }}"
+    ],
+    post_hook="{{ drop_incremental_helper('touched') }}"
+) }}
+
+{#- Igual que agg_trips_pu_hourly pero por zona de dropoff (demanda de destino) -#}
+
+select
+    date_trunc('hour', pickup_datetime) as pickup_hour,
+    service_type,
+    year,
+    month,
+    do_zone_sk,
+    payment_type_sk,
+    count(*)       as trips,
+    max(ingest_ts) as ingest_ts
+from {{ ref('fct_trips') }}
+{%- if is_incremental() %}
+where {{ in_touched_partitions() }}
+{%- endif %}
+group by 1, 2, 3, 4, 5, 6
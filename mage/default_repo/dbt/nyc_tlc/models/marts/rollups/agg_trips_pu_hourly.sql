@@ -0,0 +1,37 @@
+{{ config(
+    materialized='incremental',
+    incremental_strategy='append',
+    pre_hook=[
+      "{{ stage_touched_partitions([ref('fct_trips')], rows_col='trips') }}",
+      "{{ delete_touched_partitions() }}"
+    ],
+    post_hook="{{ drop_incremental_helper('touched') }}"
+) }}
+
+{#-
+  Rollup de fct_trips por hora de pickup x zona de pickup x servicio x tipo de
+  pago. Todas las medidas son aditivas: cualquier corte más grueso (mes,
+  borough, día de semana, franja día/noche) es una suma de estas filas
+  (analysis/rollups). Incremental por partición (service_type, year, month) de
+  fct_trips, ver rows_col en macros/incremental_partitions.sql.
+-#}
+
+select
+    date_trunc('hour', pickup_datetime) as pickup_hour,
+    service_type,
+    year,
+    month,
+    pu_zone_sk,
+    payment_type_sk,
+    count(*)                     as trips,
+    sum(total_amount)            as total_amount,
+    sum(coalesce(tip_amount, 0)) as tip_amount,
+    -- velocidad: solo viajes con distancia y duración > 0 (mismo filtro que el notebook)
+    sum(case when trip_distance is not null and trip_minutes > 0 then trip_distance end)                as speed_miles,
+    cast(sum(case when trip_distance is not null and trip_minutes > 0 then trip_minutes end) as bigint) as speed_minutes,
+    max(ingest_ts)               as ingest_ts
+from {{ ref('fct_trips') }}
+{%- if is_incremental() %}
+where {{ in_touched_partitions() }}
+{%- endif %}
+group by 1, 2, 3, 4, 5, 6
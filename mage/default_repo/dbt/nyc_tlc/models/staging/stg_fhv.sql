@@ -0,0 +1,39 @@
+{{ config(materialized='view') }}
+
+/* FHV (bases de despacho): solo trae tiempos, zonas y base; el resto de las
+   columnas del shape común de staging queda en null */
+with src as (
+  select
+    cast(null as integer)                   as vendor_id,
+    cast(pickup_datetime as timestamp)      as pickup_datetime,
+    cast(dropoff_datetime as timestamp)     as dropoff_datetime,
+    cast(null as integer)                   as passenger_count,
+    cast(null as {{ float_type() }})        as trip_distance,
+    cast(null as integer)                   as ratecode_id,
+    cast(null as string)                    as store_and_fwd_flag,
+    cast(pulocationid as integer)           as pu_location_id,
+    cast(dolocationid as integer)           as do_location_id,
+    cast(null as integer)                   as payment_type,
+    cast(null as {{ float_type() }})        as fare_amount,
+    cast(null as {{ float_type() }})        as extra,
+    cast(null as {{ float_type() }})        as mta_tax,
+    cast(null as {{ float_type() }})        as tip_amount,
+    cast(null as {{ float_type() }})        as tolls_amount,
+    cast(null as {{ float_type() }})        as improvement_surcharge,
+    cast(null as {{ float_type() }})        as total_amount,
+    cast(null as {{ float_type() }})        as congestion_surcharge,
+    cast(null as {{ float_type() }})        as airport_fee,
+    cast(null as {{ float_type() }})        as cbd_congestion_fee,
+    cast(null as integer)                   as trip_type,
+    -- huella del viaje (copy_into_bronze; filas viejas: custom/backfill_trip_fp)
+    trip_fp                                 as trip_fp,
+    'fhv'                                   as service_type,
+    cast(year as integer)                   as year,
+    cast(month as integer)                  as month,
+    cast(run_id as string)                  as run_id,
+    {{ try_timestamp_tz('ingest_ts') }}   as ingest_ts,
+    source_url                              as source_url
+  from {{ source('bronze','fhv_trips') }}
+  where year is not null and month is not null
+)
+select * from src
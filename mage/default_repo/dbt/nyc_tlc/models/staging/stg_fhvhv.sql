@@ -0,0 +1,46 @@
+{{ config(materialized='view') }}
+
+/* High-Volume FHV: se mapea al shape común de staging.
+   trip_miles -> trip_distance, base_passenger_fare -> fare_amount,
+   tips -> tip_amount, tolls -> tolls_amount. total_amount = lo que paga el
+   pasajero (tarifa + peajes + BCF + impuesto + recargos + propina). */
+with src as (
+  select
+    cast(null as integer)                   as vendor_id,
+    cast(pickup_datetime as timestamp)      as pickup_datetime,
+    cast(dropoff_datetime as timestamp)     as dropoff_datetime,
+    cast(null as integer)                   as passenger_count,
+    cast(trip_miles as {{ float_type() }})  as trip_distance,
+    cast(null as integer)                   as ratecode_id,
+    cast(null as string)                    as store_and_fwd_flag,
+    cast(pulocationid as integer)           as pu_location_id,
+    cast(dolocationid as integer)           as do_location_id,
+    cast(null as integer)                   as payment_type,
+    cast(base_passenger_fare as {{ float_type() }}) as fare_amount,
+    cast(null as {{ float_type() }})        as extra,
+    cast(null as {{ float_type() }})        as mta_tax,
+    cast(tips as {{ float_type() }})        as tip_amount,
+    cast(tolls as {{ float_type() }})       as tolls_amount,
+    cast(null as {{ float_type() }})        as improvement_surcharge,
+    cast(
+      coalesce(base_passenger_fare, 0) + coalesce(tolls, 0) + coalesce(bcf, 0)
+      + coalesce(sales_tax, 0) + coalesce(congestion_surcharge, 0)
+      + coalesce(airport_fee, 0) + coalesce(cbd_congestion_fee, 0)
+      + coalesce(tips, 0)
+    as {{ float_type() }})                  as total_amount,
+    cast(congestion_surcharge as {{ float_type() }}) as congestion_surcharge,
+    cast(airport_fee as {{ float_type() }}) as airport_fee,
+    cast(cbd_congestion_fee as {{ float_type() }}) as cbd_congestion_fee,
+    cast(null as integer)                   as trip_type,
+    -- huella del viaje (copy_into_bronze; filas viejas: custom/backfill_trip_fp)
+    trip_fp                                 as trip_fp,
+    'fhvhv'                                 as service_type,
+    cast(year as integer)                   as year,
+    cast(month as integer)                  as month,
+    cast(run_id as string)                  as run_id,
+    {{ try_timestamp_tz('ingest_ts') }}   as ingest_ts,
+    source_url                              as source_url
+  from {{ source('bronze','fhvhv_trips') }}
+  where year is not null and month is not null
+)
+select * from src
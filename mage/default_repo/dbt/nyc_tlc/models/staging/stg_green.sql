@@ -6,33 +6,35 @@ with src as (
     cast(lpep_pickup_datetime as timestamp) as pickup_datetime,
     cast(lpep_dropoff_datetime as timestamp)as dropoff_datetime,
     cast(passenger_count as integer)        as passenger_count,
-    cast(trip_distance as float)            as trip_distance,
+    cast(trip_distance as {{ float_type() }}) as trip_distance,
     cast(ratecodeid as integer)             as ratecode_id,
     cast(store_and_fwd_flag as string)      as store_and_fwd_flag,
     cast(pulocationid as integer)           as pu_location_id,
     cast(dolocationid as integer)           as do_location_id,
     cast(payment_type as integer)           as payment_type,
-    cast(fare_amount as float)              as fare_amount,
-    cast(extra as float)                    as extra,
-    cast(mta_tax as float)                  as mta_tax,
-    cast(tip_amount as float)               as tip_amount,
-    cast(tolls_amount as float)             as tolls_amount,
-    cast(improvement_surcharge as float)    as improvement_surcharge,
-    cast(total_amount as float)             as total_amount,
-    cast(congestion_surcharge as float)     as congestion_surcharge,
+    cast(fare_amount as {{ float_type() }}) as fare_amount,
+    cast(extra as {{ float_type() }})       as extra,
+    cast(mta_tax as {{ float_type() }})     as mta_tax,
+    cast(tip_amount as {{ float_type() }})  as tip_amount,
+    cast(tolls_amount as {{ float_type() }}) as tolls_amount,
+    cast(improvement_surcharge as {{ float_type() }}) as improvement_surcharge,
+    cast(total_amount as {{ float_type() }}) as total_amount,
+    cast(congestion_surcharge as {{ float_type() }}) as congestion_surcharge,
 
     /* green NO tiene airport_fee -> forzamos null para alinear con yellow */
-    cast(null as float)                     as airport_fee,
+    cast(null as {{ float_type() }})        as airport_fee,
 
     /* green SÍ puede tener CBD_CONGESTION_FEE: si existe en BRONZE lo casteamos; si no, deja null */
-    try_cast(cbd_congestion_fee as float)   as cbd_congestion_fee,
+    try_cast(cbd_congestion_fee as {{ float_type() }}) as cbd_congestion_fee,
 
     cast(trip_type as integer)              as trip_type,
+    -- huella del viaje (copy_into_bronze; filas viejas: custom/backfill_trip_fp)
+    trip_fp                                 as trip_fp,
     'green'                                 as service_type,
     cast(year as integer)                   as year,
     cast(month as integer)                  as month,
     cast(run_id as string)                  as run_id,
-    try_to_timestamp_tz(ingest_ts)          as ingest_ts,
+    {{ try_timestamp_tz('ingest_ts') }}   as ingest_ts,
     source_url                              as source_url
   from {{ source('bronze','green_trips') }}
   where year is not null and month is not null
@@ -0,0 +1,85 @@
+"""
+Fixtures compartidas de los tests de default_repo.
+
+Se corren desde la raíz del repo con `python -m pytest mage/default_repo/tests`
+(sin Snowflake ni Mage levantado):
+  - `http_stub`: servidor HTTP local (hilos) cuyo comportamiento lo define una
+    función `app(handler, head)` de cada test.
+  - `load_block`: ejecuta un bloque de Mage como lo hace Mage, con los
+    decoradores ya presentes en globals.
+  - `duckdb_path`: archivo DuckDB vacío para el warehouse local (utils/warehouse).
+"""
+import http.server
+import importlib.util
+import os
+import threading
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DECORATORS = ('data_loader', 'transformer', 'data_exporter', 'custom', 'test')
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.server.app(self, True)
+
+    def do_GET(self):
+        self.server.app(self, False)
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body: bytes = b'', headers: dict = None, head: bool = False) -> None:
+        """Respuesta completa; en HEAD solo headers (Content-Length = tamaño del body)."""
+        self.send_response(status)
+        headers = dict(headers or {})
+        headers.setdefault('Content-Length', str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        if not head and body:
+            self.wfile.write(body)
+
+
+@pytest.fixture
+def http_stub():
+    """`start(app) -> base_url`; los servidores se apagan al terminar el test."""
+    servers = []
+
+    def start(app) -> str:
+        srv = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        srv.daemon_threads = True
+        srv.app = app
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return f'http://127.0.0.1:{srv.server_port}'
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+@pytest.fixture
+def load_block():
+    """Carga `<tipo>/<bloque>.py` como módulo; los decoradores de Mage quedan como identidad."""
+    def load(relpath: str):
+        name = 'default_repo.' + relpath[:-3].replace('/', '.')
+        spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_DIR, relpath))
+        module = importlib.util.module_from_spec(spec)
+        for deco in _DECORATORS:
+            setattr(module, deco, lambda fn: fn)
+        spec.loader.exec_module(module)
+        return module
+    return load
+
+
+@pytest.fixture
+def duckdb_path(tmp_path, monkeypatch):
+    """Ruta de un nyc_tlc.duckdb nuevo; caches locales (descargas, coverage) dentro de tmp_path."""
+    pytest.importorskip('duckdb')
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / 'nyc_tlc.duckdb')
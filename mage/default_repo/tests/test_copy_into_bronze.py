@@ -0,0 +1,120 @@
+"""
+copy_into_bronze en modo worker-pool contra el warehouse DuckDB local (stand-in
+de Snowflake): una conexión por worker, DELETE + carga idempotente por partición
+y resumen que junta filas y errores de todos los workers.
+"""
+import threading
+
+import pandas as pd
+import pytest
+
+from default_repo.utils.sample_data import write_sample_trips
+from default_repo.utils.warehouse import get_warehouse
+
+ROWS = {('yellow', 1): 3_000, ('yellow', 2): 2_500, ('green', 1): 1_500, ('green', 2): 1_000}
+
+
+@pytest.fixture
+def block(load_block):
+    return load_block('data_exporters/copy_into_bronze.py')
+
+
+@pytest.fixture
+def partitions(tmp_path) -> pd.DataFrame:
+    rows = []
+    for (service, month), n in ROWS.items():
+        path = write_sample_trips(str(tmp_path / f'{service}_tripdata_2024-{month:02d}.parquet'),
+                                  service, 2024, month, n, seed=month)
+        rows.append({'year': 2024, 'month': month, 'service_type': service, 'url': path, 'has_parquet': True})
+    return pd.DataFrame(rows)
+
+
+def _bronze_counts(path: str) -> dict:
+    wh = get_warehouse({'warehouse': 'duckdb', 'duckdb_path': path})
+    conn = wh.connect()
+    try:
+        cur = conn.cursor()
+        out = {}
+        for service in ('yellow', 'green'):
+            cur.execute(f"select month, count(*), count(distinct run_id) from {service}_trips group by month")
+            out.update({(service, m): (n, runs) for m, n, runs in cur.fetchall()})
+        return out
+    finally:
+        conn.close()
+
+
+def test_worker_pool_loads_each_partition_once(block, partitions, duckdb_path):
+    kwargs = dict(warehouse='duckdb', duckdb_path=duckdb_path, max_workers=2, download_cache=False)
+    summary = block.export_data(partitions, **kwargs)
+
+    assert (summary['status'] == 'OK').all(), summary['errors'].tolist()
+    got = {(r.service_type, r.month): r.rows for r in summary.itertuples()}
+    assert got == ROWS
+    assert summary['worker'].str.startswith('bronze').all()
+    assert {k: v[0] for k, v in _bronze_counts(duckdb_path).items()} == ROWS
+
+    # re-ejecutar reemplaza cada partición (DELETE previo): mismas filas, un solo run_id
+    again = block.export_data(partitions, **kwargs)
+    assert set(again['run_id']).isdisjoint(summary['run_id'])
+    assert _bronze_counts(duckdb_path) == {k: (n, 1) for k, n in ROWS.items()}
+
+
+def test_summary_merges_errors_from_workers(block, partitions, duckdb_path):
+    wh = get_warehouse({'warehouse': 'duckdb', 'duckdb_path': duckdb_path})
+    threads = set()
+
+    def writer(conn, df, table_name, **kw):
+        threads.add(threading.current_thread().name)
+        if table_name.lower() == 'green_trips' and int(df['month'].iloc[0]) == 2:
+            raise RuntimeError('falla simulada')
+        return wh.write_pandas(conn, df, table_name, **kw)
+
+    summary = block.export_data(partitions, warehouse='duckdb', duckdb_path=duckdb_path, max_workers=2,
+                                download_cache=False, writer=writer, conn_factory=wh.factory())
+
+    failed = summary[summary['status'] == 'ERROR']
+    assert list(zip(failed['service_type'], failed['month'])) == [('green', 2)]
+    assert 'falla simulada' in failed['errors'].iloc[0]
+    ok = summary[summary['status'] == 'OK']
+    assert {(r.service_type, r.month): r.rows for r in ok.itertuples()} == {
+        k: v for k, v in ROWS.items() if k != ('green', 2)}
+    assert len(threads) == 2
+
+
+def test_empty_input_returns_empty_summary(block, load_block, partitions, duckdb_path):
+    summary = block.export_data(partitions.assign(has_parquet=False), warehouse='duckdb', duckdb_path=duckdb_path)
+    assert summary.empty and {'service_type', 'year', 'month', 'rows', 'status'} <= set(summary.columns)
+    trigger = load_block('data_exporters/trigger_gold_incremental.py')
+    assert trigger.touched_partitions(summary) == []
+
+
+def test_resume_requires_the_same_pickup_filter(block, partitions, duckdb_path):
+    wh = get_warehouse({'warehouse': 'duckdb', 'duckdb_path': duckdb_path})
+    calls = []
+
+    def writer(conn, df, table_name, **kw):
+        calls.append(len(df))
+        if len(calls) == 3:
+            raise RuntimeError('corte simulado')
+        return wh.write_pandas(conn, df, table_name, **kw)
+
+    yellow_jan = partitions[(partitions['service_type'] == 'yellow') & (partitions['month'] == 1)]
+    kwargs = dict(warehouse='duckdb', duckdb_path=duckdb_path, download_cache=False, adaptive_batches=False,
+                  batch_size_yellow=500, checkpoint=True, conn_factory=wh.factory())
+    first = block.export_data(yellow_jan, writer=writer, pickup_filter='partition', **kwargs)
+    assert first['status'].tolist() == ['ERROR']
+
+    # otro filtro: los offsets del checkpoint no valen -> error sin tocar la partición
+    other = block.export_data(yellow_jan, resume=True, **kwargs)
+    assert other['status'].tolist() == ['ERROR'] and 'pickup_filter' in other['errors'].iloc[0]
+    conn = wh.connect()
+    cur = conn.cursor()
+    cur.execute("select count(*), count(distinct run_id) from yellow_trips")
+    assert cur.fetchone() == (1_000, 1)
+    conn.close()
+
+    # mismo filtro: retoma el run con su run_id
+    same = block.export_data(yellow_jan, resume=True, pickup_filter='partition', **kwargs)
+    assert same['status'].tolist() == ['OK'] and same['run_id'].tolist() == first['run_id'].tolist()
+    fresh = block.export_data(yellow_jan, pickup_filter='partition', **{**kwargs, 'checkpoint': False})
+    assert same['rows'].tolist() == fresh['rows'].tolist()
@@ -0,0 +1,65 @@
+"""
+utils/fingerprint_backfill: las filas de BRONZE sin `trip_fp` reciben la misma
+huella que calcula copy_into_bronze al cargar (warehouse DuckDB).
+"""
+import pandas as pd
+import pytest
+
+from default_repo.utils.fingerprint_backfill import backfill_fingerprints
+from default_repo.utils.sample_data import write_sample_trips
+from default_repo.utils.warehouse import get_warehouse
+
+SERVICES = ('yellow', 'fhvhv')
+
+
+@pytest.fixture
+def loaded(load_block, tmp_path, duckdb_path):
+    rows = []
+    for service in SERVICES:
+        for month in (1, 2):
+            path = write_sample_trips(str(tmp_path / f'{service}_tripdata_2024-{month:02d}.parquet'),
+                                      service, 2024, month, 2_000, seed=month)
+            rows.append({'year': 2024, 'month': month, 'service_type': service, 'url': path, 'has_parquet': True})
+    block = load_block('data_exporters/copy_into_bronze.py')
+    summary = block.export_data(pd.DataFrame(rows), warehouse='duckdb', duckdb_path=duckdb_path, download_cache=False)
+    assert (summary['status'] == 'OK').all(), summary['errors'].tolist()
+    wh = get_warehouse({'warehouse': 'duckdb', 'duckdb_path': duckdb_path})
+    conn = wh.connect()
+    yield wh, conn
+    conn.close()
+
+
+def _fps(cur, table):
+    cur.execute(f"select trip_fp, count(*) from {table} group by 1")
+    return dict(cur.fetchall())
+
+
+def test_backfill_matches_load_fingerprint(loaded):
+    wh, conn = loaded
+    cur = conn.cursor()
+    before = {s: _fps(cur, f'{s}_trips') for s in SERVICES}
+    # filas "viejas": la huella se pierde en enero de cada servicio
+    for s in SERVICES:
+        cur.execute(f"update {s}_trips set trip_fp = null where month = 1")
+
+    out = backfill_fingerprints(conn, wh.database, 'BRONZE', services=list(SERVICES), writer=wh.write_pandas)
+
+    assert sorted(zip(out['service_type'], out['month'])) == [(s, 1) for s in sorted(SERVICES)]
+    assert out['rows'].sum() == len(SERVICES) * 2_000
+    assert {s: _fps(cur, f'{s}_trips') for s in SERVICES} == before
+    # idempotente: sin huellas nulas no hay nada que hacer
+    assert backfill_fingerprints(conn, wh.database, 'BRONZE', services=list(SERVICES), writer=wh.write_pandas).empty
+
+
+def test_block_adds_the_column_to_old_tables(loaded, load_block, duckdb_path):
+    wh, conn = loaded
+    cur = conn.cursor()
+    before = _fps(cur, 'yellow_trips')
+    # tabla de antes de la huella: sin la columna trip_fp
+    cur.execute("alter table yellow_trips drop column trip_fp")
+
+    block = load_block('custom/backfill_trip_fp.py')
+    out = block.backfill_trip_fp(warehouse='duckdb', duckdb_path=duckdb_path, services=['yellow'])
+
+    assert out['rows'].sum() == 2 * 2_000
+    assert _fps(cur, 'yellow_trips') == before
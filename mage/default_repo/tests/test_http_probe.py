@@ -0,0 +1,150 @@
+"""
+utils/http_probe contra un stub HTTP local: 200 / 403 / 404 / 5xx, reintentos
+con backoff, límite de concurrencia y rate limit del token bucket.
+"""
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+import pytest
+
+from default_repo.utils.http_probe import TokenBucket, probe_urls, probe_urls_detailed
+
+BASE_SLEEP = 0.05
+
+
+class ProbeApp:
+    """
+    `/<status>[-<status>...]/<nombre>`: cada HEAD a la ruta responde el siguiente
+    status de la lista (el último se repite). Registra tiempos y concurrencia.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.hits = defaultdict(list)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, handler, head):
+        with self._lock:
+            self.hits[handler.path].append(time.monotonic())
+            attempt = len(self.hits[handler.path])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            statuses = [int(s) for s in handler.path.split('/')[1].split('-')]
+            status = statuses[min(attempt, len(statuses)) - 1]
+            body = b'x' * 1234 if status == 200 else b''
+            handler.reply(status, body, {'ETag': '"abc"'} if status == 200 else None, head=head)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def app():
+    return ProbeApp()
+
+
+@pytest.fixture
+def base(http_stub, app):
+    return http_stub(app)
+
+
+def test_status_classes(base, app):
+    urls = [f'{base}/200/ok', f'{base}/404/missing', f'{base}/403/forbidden', f'{base}/503/down']
+    out = probe_urls(urls, max_attempts=3, base_sleep=BASE_SLEEP)
+
+    assert out == [
+        (True, 200, 1234, None),
+        (False, 404, 0, 'missing'),
+        (False, 403, 0, 'forbidden'),
+        (False, 503, 0, 'unexpected_status_503'),
+    ]
+    # 404 es definitivo; 403 y 5xx se reintentan hasta max_attempts
+    assert {p.split('/')[1]: len(t) for p, t in app.hits.items()} == {'200': 1, '404': 1, '403': 3, '503': 3}
+
+
+def test_detailed_result_carries_validators(base):
+    r, = probe_urls_detailed([f'{base}/200/ok'])
+    assert r['etag'] == '"abc"' and r['source'] == 'network' and r['has_parquet']
+
+
+def test_transient_errors_recover_with_backoff(base, app):
+    urls = [f'{base}/503-500-200/flaky', f'{base}/403-200/throttled']
+    out = probe_urls(urls, max_attempts=3, base_sleep=BASE_SLEEP)
+
+    assert [o[:2] for o in out] == [(True, 200), (True, 200)]
+    flaky = app.hits['/503-500-200/flaky']
+    assert len(flaky) == 3
+    # backoff exponencial: base_sleep * 2^(intento-1) (+ jitter)
+    gaps = [b - a for a, b in zip(flaky, flaky[1:])]
+    assert gaps[0] >= BASE_SLEEP and gaps[1] >= 2 * BASE_SLEEP
+
+
+def test_connection_errors_are_retried_then_reported():
+    # puerto sin servidor: error de transporte en cada intento
+    out = probe_urls(['http://127.0.0.1:9/200/x'], max_attempts=2, base_sleep=BASE_SLEEP, timeout=(0.5, 0.5))
+    assert out[0][:2] == (False, None)
+    assert out[0][3].startswith('error:')
+
+
+def test_concurrency_limit(http_stub):
+    app = ProbeApp(delay=0.05)
+    base = http_stub(app)
+    probe_urls([f'{base}/200/{i}' for i in range(24)], max_concurrency=4, rate_per_s=0)
+    assert 1 < app.max_in_flight <= 4
+
+
+def test_rate_limit_applies_to_every_attempt(base, app):
+    rate, burst = 20.0, 2
+    urls = [f'{base}/200/{i}' for i in range(10)] + [f'{base}/503-200/r{i}' for i in range(5)]
+    t0 = time.monotonic()
+    out = probe_urls(urls, max_concurrency=8, rate_per_s=rate, burst=burst, base_sleep=0.01)
+    elapsed = time.monotonic() - t0
+
+    assert all(o[0] for o in out)
+    attempts = sum(len(t) for t in app.hits.values())
+    assert attempts == 20
+    # la ráfaga inicial sale sin esperar; el resto a `rate` por segundo
+    assert elapsed >= (attempts - burst) / rate * 0.9
+    stamps = sorted(t for ts in app.hits.values() for t in ts)
+    window = max(sum(1 for t in stamps if s <= t < s + 0.25) for s in stamps)
+    assert window <= burst + rate * 0.25 + 1
+
+
+def test_token_bucket_disabled_with_zero_rate():
+    bucket = TokenBucket(0)
+    t0 = time.monotonic()
+    for _ in range(1000):
+        bucket.acquire()
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_fetch_and_stage_parquet_against_stub(http_stub, load_block):
+    statuses = {'yellow_tripdata_2024-01.parquet': 200, 'yellow_tripdata_2024-02.parquet': 404,
+                'green_tripdata_2024-01.parquet': 403, 'green_tripdata_2024-02.parquet': 503}
+
+    hits = defaultdict(int)
+
+    def app(handler, head):
+        hits[handler.path.rsplit('/', 1)[-1]] += 1
+        status = statuses[handler.path.rsplit('/', 1)[-1]]
+        handler.reply(status, b'x' * 10 if status == 200 else b'', head=head)
+
+    base = http_stub(app)
+    block = load_block('transformers/fetch_and_stage_parquet.py')
+    months = pd.DataFrame([{'year': 2024, 'month': m, 'service_type': s}
+                           for s in ('yellow', 'green') for m in (1, 2)])
+    out = block.transform(months, base_url=f'{base}/trip-data', use_cache=False, max_attempts=2)
+
+    block.test_output(out)
+    out = out.astype(object).where(out.notna(), None)
+    got = {(r.service_type, r.month): (r.has_parquet, r.http_status, r.notes) for r in out.itertuples()}
+    assert got == {('yellow', 1): (True, 200, None), ('yellow', 2): (False, 404, 'missing'),
+                   ('green', 1): (False, 403, 'missing'), ('green', 2): (False, 503, 'unexpected_status_503')}
+    # como el HEAD original del bloque, un 403 no se reintenta
+    assert hits['green_tripdata_2024-01.parquet'] == 1 and hits['green_tripdata_2024-02.parquet'] == 2
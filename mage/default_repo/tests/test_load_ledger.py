@@ -0,0 +1,89 @@
+"""
+utils/load_ledger: upsert transaccional de LOAD_LEDGER (warehouse DuckDB),
+decisiones del planificador incremental y conteos por partición.
+"""
+import pandas as pd
+import pytest
+
+from default_repo.utils.load_ledger import ensure_ledger, partition_counts, plan_partitions, read_ledger, record_load
+from default_repo.utils.sample_data import write_sample_trips
+from default_repo.utils.warehouse import get_warehouse
+
+KEY = {'service_type': 'yellow', 'year': 2024, 'month': 1}
+
+
+@pytest.fixture
+def ledger_conn(duckdb_path):
+    wh = get_warehouse({'warehouse': 'duckdb', 'duckdb_path': duckdb_path})
+    conn = wh.connect()
+    ensure_ledger(conn, wh.database, 'BRONZE', registry=wh.registry(wh.database, 'BRONZE'))
+    yield conn, wh.database
+    conn.close()
+
+
+def test_record_load_replaces_the_partition_row(ledger_conn):
+    conn, db = ledger_conn
+    record_load(conn, db, 'BRONZE', {**KEY, 'etag': '"a"', 'row_count': 10, 'run_id': 'r1', 'status': 'OK'})
+    record_load(conn, db, 'BRONZE', {**KEY, 'etag': '"b"', 'row_count': 12, 'run_id': 'r2', 'status': 'OK'})
+    led = read_ledger(conn, db, 'BRONZE')
+    assert led[['etag', 'row_count', 'run_id']].values.tolist() == [['"b"', 12, 'r2']]
+
+
+def test_failed_record_load_keeps_the_previous_row(ledger_conn):
+    conn, db = ledger_conn
+    record_load(conn, db, 'BRONZE', {**KEY, 'etag': '"a"', 'row_count': 10, 'run_id': 'r1', 'status': 'OK'})
+    with pytest.raises(Exception):
+        # el INSERT falla después del DELETE: rollback de ambos
+        record_load(conn, db, 'BRONZE', {**KEY, 'row_count': 'no-es-un-numero', 'run_id': 'r2', 'status': 'OK'})
+    led = read_ledger(conn, db, 'BRONZE')
+    assert led['run_id'].tolist() == ['r1']
+
+
+def test_plan_reasons():
+    remote = pd.DataFrame([
+        {'service_type': 'yellow', 'year': 2024, 'month': m, 'url': f'u{m}', 'has_parquet': m != 9,
+         'content_length': 100, 'etag': '"a"'}
+        for m in range(1, 10)
+    ])
+    ledger = pd.DataFrame([
+        {'service_type': 'yellow', 'year': 2024, 'month': m, 'content_length': cl, 'etag': etag, 'status': st}
+        for m, cl, etag, st in [(1, 100, '"a"', 'OK'), (2, 100, '"b"', 'OK'), (3, 90, None, 'OK'), (4, 100, '"a"', 'ERROR')]
+    ])
+    audit = pd.DataFrame([
+        {'service_type': 'yellow', 'year': 2024, 'month': m, 'row_count': rows, 'audit_content_length': cl}
+        for m, rows, cl in [(5, 7, 100), (6, 7, 80), (7, 0, None)]
+    ])
+    plan = plan_partitions(remote, ledger, audit)
+    assert dict(zip(plan['month'], zip(plan['action'], plan['reason']))) == {
+        1: ('skip', 'unchanged'), 2: ('load', 'etag_changed'), 3: ('load', 'size_changed'),
+        4: ('load', 'previous_error'), 5: ('skip', 'loaded_no_ledger'), 6: ('load', 'size_changed'),
+        7: ('load', 'new'), 8: ('load', 'new'), 9: ('skip', 'no_remote_file'),
+    }
+    untrusted = plan_partitions(remote, ledger, audit, trust_audit=False)
+    assert untrusted.loc[untrusted['month'] == 5, 'reason'].item() == 'unverified'
+    forced = plan_partitions(remote, ledger, audit, force=True)
+    assert set(forced['reason']) == {'forced', 'no_remote_file'}
+
+
+def test_partition_counts_scans_only_keys_missing_from_ledger(load_block, tmp_path, duckdb_path):
+    rows = []
+    for month, n in ((1, 1_000), (2, 1_500)):
+        path = write_sample_trips(str(tmp_path / f'yellow_tripdata_2024-{month:02d}.parquet'), 'yellow', 2024, month, n)
+        rows.append({'year': 2024, 'month': month, 'service_type': 'yellow', 'url': path, 'has_parquet': True})
+    block = load_block('data_exporters/copy_into_bronze.py')
+    block.export_data(pd.DataFrame(rows), warehouse='duckdb', duckdb_path=duckdb_path, download_cache=False)
+    wh = get_warehouse({'warehouse': 'duckdb', 'duckdb_path': duckdb_path})
+    conn = wh.connect()
+    try:
+        cur = conn.cursor()
+        # enero: el ledger manda (no se recuenta); febrero: cargado antes del ledger
+        cur.execute("update load_ledger set row_count = 999 where month = 1")
+        cur.execute("delete from load_ledger where month = 2")
+        keys = pd.DataFrame([{'service_type': 'yellow', 'year': 2024, 'month': m} for m in (1, 2, 3)])
+
+        got = partition_counts(conn, wh.database, 'BRONZE', keys)
+        assert dict(zip(got['month'], got['row_count'])) == {1: 999, 2: 1_500}
+        got = partition_counts(conn, wh.database, 'BRONZE', keys, source='scan')
+        assert dict(zip(got['month'], got['row_count'])) == {1: 1_000, 2: 1_500}
+    finally:
+        conn.close()
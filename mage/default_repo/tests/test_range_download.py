@@ -0,0 +1,165 @@
+"""
+utils/range_download contra un servidor HTTP local que respeta Range: segmentos
+en paralelo, conexiones cortadas a mitad de segmento (reintento y reanudación
+entre llamadas), servidor que ignora Range (fallback a un stream) y tamaño
+distinto del Content-Length.
+"""
+import json
+import os
+import re
+import threading
+
+import pytest
+
+from default_repo.utils.range_download import download_file
+
+SIZE = 1_000_003
+BODY = os.urandom(SIZE)
+_RANGE = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class RangeApp:
+    """
+    Sirve `body` en /file. `drop_after`: los primeros `drops` GET se cortan
+    después de enviar esa cantidad de bytes; `honor_range=False` responde 200
+    con el archivo completo aunque el HEAD anuncie Accept-Ranges.
+    """
+
+    def __init__(self, body: bytes = BODY, honor_range: bool = True, drop_after: int = None, drops: int = 0,
+                 head_size: int = None):
+        self.body = body
+        self.honor_range = honor_range
+        self.drop_after = drop_after
+        self.drops = drops
+        self.head_size = head_size
+        self.ranges = []
+        self._lock = threading.Lock()
+
+    def __call__(self, handler, head):
+        headers = {'Accept-Ranges': 'bytes', 'ETag': '"v1"',
+                   'Content-Length': str(self.head_size if self.head_size is not None else len(self.body))}
+        if head:
+            return handler.reply(200, headers=headers, head=True)
+        m = _RANGE.match(handler.headers.get('Range', ''))
+        status, start, end = 200, 0, len(self.body) - 1
+        if m and self.honor_range:
+            status, start = 206, int(m.group(1))
+            end = min(int(m.group(2) or end), end)
+            headers['Content-Range'] = f'bytes {start}-{end}/{len(self.body)}'
+        with self._lock:
+            self.ranges.append((start, end, status))
+            drop = self.drops > 0 and self.drop_after is not None
+            self.drops -= drop
+        chunk = self.body[start:end + 1]
+        headers['Content-Length'] = str(len(chunk))
+        if drop:
+            # headers con el largo completo pero la conexión se cierra a mitad del body
+            handler.send_response(status)
+            for k, v in headers.items():
+                handler.send_header(k, v)
+            handler.end_headers()
+            handler.wfile.write(chunk[:self.drop_after])
+            handler.wfile.flush()
+            handler.close_connection = True
+            return
+        handler.reply(status, chunk, headers)
+
+
+def _download(base, dest, **kwargs):
+    opts = dict(segments=4, min_segment_bytes=64 * 1024, chunk_size=16 * 1024, base_sleep=0.01, timeout=(2, 5))
+    opts.update(kwargs)
+    return download_file(f'{base}/file', str(dest), **opts)
+
+
+def _read(path) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_parallel_segments(http_stub, tmp_path):
+    app = RangeApp()
+    stats = _download(http_stub(app), tmp_path / 'out.parquet')
+
+    assert _read(tmp_path / 'out.parquet') == BODY
+    assert stats['bytes'] == SIZE and stats['segments'] == 4 and stats['resumed_bytes'] == 0
+    assert all(status == 206 for _, _, status in app.ranges)
+    assert not os.path.exists(tmp_path / 'out.parquet.part')
+    assert not os.path.exists(tmp_path / 'out.parquet.part.json')
+
+
+def test_dropped_connections_retry_from_offset(http_stub, tmp_path):
+    app = RangeApp(drop_after=100_000, drops=4)
+    stats = _download(http_stub(app), tmp_path / 'out.parquet', max_attempts=3)
+
+    assert _read(tmp_path / 'out.parquet') == BODY
+    assert stats['segments'] == 4
+    # cada segmento cortado se pide de nuevo desde donde quedó, no desde su inicio
+    starts = {start for start, _, _ in app.ranges[:4]}
+    retries = [start for start, _, _ in app.ranges[4:]]
+    assert len(retries) == 4 and not starts & set(retries)
+
+
+def test_resume_after_interrupted_call(http_stub, tmp_path):
+    dest = tmp_path / 'out.parquet'
+    app = RangeApp(drop_after=50_000, drops=4)
+    base = http_stub(app)
+    with pytest.raises(Exception):
+        _download(base, dest, max_attempts=1)
+    assert not dest.exists()
+    state = json.loads(_read(str(dest) + '.part.json'))
+    done = sum(s['done'] for s in state['segments'])
+    assert 0 < done < SIZE
+
+    # misma URL / tamaño / ETag: retoma desde el sidecar y solo pide lo que falta.
+    # Los cortes que la primera llamada no llegó a usar no deben afectar a esta.
+    app.ranges.clear()
+    app.drops = 0
+    stats = _download(base, dest)
+
+    assert _read(dest) == BODY
+    assert stats['resumed_bytes'] == done
+    assert sum(end - start + 1 for start, end, _ in app.ranges) == SIZE - done
+
+
+def test_changed_etag_restarts_download(http_stub, tmp_path):
+    dest = tmp_path / 'out.parquet'
+    app = RangeApp(drop_after=50_000, drops=4)
+    base = http_stub(app)
+    with pytest.raises(Exception):
+        _download(base, dest, max_attempts=1)
+    app.drops = 0
+    stats = _download(base, dest, etag='"v2"')
+    assert _read(dest) == BODY and stats['resumed_bytes'] == 0
+
+
+def test_fallback_when_get_ignores_range(http_stub, tmp_path):
+    app = RangeApp(honor_range=False)
+    stats = _download(http_stub(app), tmp_path / 'out.parquet')
+
+    assert _read(tmp_path / 'out.parquet') == BODY
+    assert stats['segments'] == 1 and stats['resumed_bytes'] == 0
+    assert app.ranges[-1] == (0, SIZE - 1, 200)
+
+
+def test_fallback_after_partial_ranged_progress(http_stub, tmp_path):
+    # cortes a mitad de segmento y después el servidor deja de respetar Range
+    dest = tmp_path / 'out.parquet'
+    app = RangeApp(drop_after=50_000, drops=4)
+    base = http_stub(app)
+    with pytest.raises(Exception):
+        _download(base, dest, max_attempts=1)
+    app.honor_range = False
+    app.drops = 0
+    stats = _download(base, dest)
+
+    assert _read(dest) == BODY
+    assert stats['segments'] == 1 and stats['resumed_bytes'] == 0
+
+
+def test_size_mismatch_fails_without_publishing(http_stub, tmp_path):
+    # el HEAD anuncia más bytes de los que el servidor tiene
+    dest = tmp_path / 'out.parquet'
+    with pytest.raises(IOError):
+        _download(http_stub(RangeApp(head_size=SIZE + 10)), dest, max_attempts=2, keep_partial=False)
+    assert not dest.exists()
+    assert not os.path.exists(str(dest) + '.part')
@@ -0,0 +1,102 @@
+"""
+Carga de punta a punta de fhv / fhvhv (utils/trip_services) con Parquet de
+muestra (utils/sample_data) y el warehouse DuckDB: copy_into_bronze con los dos
+normalizadores y workers en paralelo; se validan filas por partición, tipos de
+las columnas en BRONZE y los timestamps contra el Parquet de origen.
+El tamaño se sube con TLC_SAMPLE_ROWS (p.ej. 2000000 para un mes realista de fhvhv).
+"""
+import os
+
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+from default_repo.utils.sample_data import write_sample_trips
+from default_repo.utils.trip_services import get_service, resolve_services
+from default_repo.utils.warehouse import get_warehouse
+
+ROWS = int(os.environ.get('TLC_SAMPLE_ROWS', 100_000))
+MONTHS = (1, 2)
+
+
+def _duck_type(ddl_type: str) -> str:
+    t = ddl_type.lower()
+    if t.startswith('timestamp'):
+        return 'TIMESTAMP'
+    return {'string': 'VARCHAR', 'binary': 'BLOB', 'int': 'INTEGER', 'integer': 'INTEGER',
+            'float': 'DOUBLE'}[t]
+
+
+@pytest.fixture(scope='module')
+def samples(tmp_path_factory):
+    base = tmp_path_factory.mktemp('tlc')
+    rows = []
+    for service, factor in (('fhv', 1.0), ('fhvhv', 1.5)):
+        for month in MONTHS:
+            n = int(ROWS * factor) + month
+            path = write_sample_trips(str(base / f'{service}_tripdata_2023-{month:02d}.parquet'),
+                                      service, 2023, month, n, seed=month, row_group_size=max(1, n // 3))
+            rows.append({'year': 2023, 'month': month, 'service_type': service, 'url': path,
+                         'has_parquet': True, 'rows': n})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('normalize', ['arrow', 'pandas'])
+def test_fhv_and_fhvhv_load(load_block, samples, duckdb_path, normalize):
+    block = load_block('data_exporters/copy_into_bronze.py')
+    summary = block.export_data(samples.drop(columns='rows'), warehouse='duckdb', duckdb_path=duckdb_path,
+                                max_workers=2, normalize=normalize, download_cache=False)
+
+    assert (summary['status'] == 'OK').all(), summary['errors'].tolist()
+    expected = samples.set_index(['service_type', 'month'])['rows']
+    assert summary.set_index(['service_type', 'month'])['rows'].sort_index().equals(expected.sort_index())
+
+    conn = get_warehouse({'warehouse': 'duckdb', 'duckdb_path': duckdb_path}).connect()
+    try:
+        cur = conn.cursor()
+        for service in ('fhv', 'fhvhv'):
+            svc = get_service(service)
+            cur.execute("select lower(column_name), data_type from information_schema.columns "
+                        "where table_schema = 'BRONZE' and table_name = %s", (svc.table,))
+            types = dict(cur.fetchall())
+            assert types == {c: _duck_type(t) for c, t in svc.column_types.items()}
+
+            cur.execute(f"select month, count(*) from {svc.table} group by month")
+            assert dict(cur.fetchall()) == {m: int(expected[(service, m)]) for m in MONTHS}
+
+            # timestamps: mismos no nulos y mismo rango que el Parquet (incluidos los mal fechados)
+            src = pq.read_table(samples.loc[(samples['service_type'] == service) & (samples['month'] == 1), 'url'].item())
+            parquet_names = {c.lower(): c for c in src.column_names}
+            for col in svc.timestamp_cols:
+                values = src[parquet_names[col]]
+                cur.execute(f"select count({col}), min({col}), max({col}) from {svc.table} where month = 1")
+                n, lo, hi = cur.fetchone()
+                assert n == len(values) - values.null_count
+                # a segundos: el normalizador pandas escribe 'YYYY-MM-DD HH:MM:SS'
+                got = [pd.Timestamp(v).floor('s') for v in (lo, hi)]
+                assert got == [pd.Timestamp(v.as_py()).floor('s') for v in (pc.min(values), pc.max(values))]
+
+            cur.execute(f"select count(distinct trip_fp) = count(*), count(trip_fp) = count(*) from {svc.table}")
+            assert cur.fetchone() == (True, True)
+
+        # PUlocationID llega como double en fhv: se guarda entero sin perder valores
+        src = pq.read_table(samples.loc[(samples['service_type'] == 'fhv') & (samples['month'] == 1), 'url'].item())
+        cur.execute("select sum(pulocationid), count(pulocationid) from fhv_trips where month = 1")
+        total, n = cur.fetchone()
+        assert (total, n) == (int(pc.sum(src['PUlocationID']).as_py()), len(src) - src['PUlocationID'].null_count)
+    finally:
+        conn.close()
+
+
+def test_unknown_services_are_listed(load_block):
+    with pytest.raises(ValueError, match='taxi, bus'):
+        resolve_services(['yellow', 'taxi', 'bus'])
+    block = load_block('data_exporters/sync_coverage_to_audit_py.py')
+    with pytest.raises(ValueError, match='Taxi'):
+        block.export_data(warehouse='duckdb', services=['green', 'Taxi'])
+
+
+def test_column_types_are_parsed_once():
+    svc = get_service('fhvhv')
+    assert svc.column_types is svc.column_types and svc.columns is svc.columns
@@ -0,0 +1,20 @@
+"""
+utils/warehouse.to_duckdb_sql: traducción de la DDL de Snowflake a tipos de DuckDB.
+"""
+from default_repo.utils.warehouse import to_duckdb_sql
+
+
+def test_ddl_types():
+    sql = to_duckdb_sql("create table if not exists DB.BRONZE.t (a float, b FLOAT, c number(38,0), "
+                        "d number(10,2), e timestamp_ntz, f_float string)")
+    assert sql == ("create table if not exists DB.BRONZE.t (a double, b double, c bigint, "
+                   "d decimal(10,2), e timestamp, f_float string)")
+
+
+def test_add_columns_are_split_and_translated():
+    sql = to_duckdb_sql("alter table DB.BRONZE.t add column x float, y number(12,3)")
+    assert sql == "alter table DB.BRONZE.t add column x double; alter table DB.BRONZE.t add column y decimal(12,3)"
+
+
+def test_dml_is_left_alone():
+    assert to_duckdb_sql("select cast(a as float) from t where b = %s") == "select cast(a as float) from t where b = ?"
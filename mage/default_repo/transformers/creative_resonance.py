@@ -2,23 +2,17 @@ if 'transformer' not in globals():
     from mage_ai.data_preparation.decorators import transformer
 
 from mage_ai.data_preparation.shared.secrets import get_secret_value
-import snowflake.connector
+
+from default_repo.utils.snowflake_pool import get_pool
 
 @transformer
 def transform(*args, **kwargs):
     """
-    Prueba conexión a Snowflake con Mage Secrets.
-    Retorna información básica de la sesión actual.
+    Prueba conexión a Snowflake con Mage Secrets (vía el pool compartido).
+    Retorna información básica de la sesión actual y las métricas del pool.
     """
-    conn = snowflake.connector.connect(
-        account=get_secret_value('SNOWFLAKE_ACCOUNT'),
-        user=get_secret_value('SNOWFLAKE_USER'),
-        password=get_secret_value('SNOWFLAKE_PASSWORD'),
-        role=get_secret_value('SNOWFLAKE_ROLE'),
-        warehouse=get_secret_value('SNOWFLAKE_WAREHOUSE'),
-        database=get_secret_value('SNOWFLAKE_DATABASE'),
-        schema=get_secret_value('SNOWFLAKE_SCHEMA_RAW'),
-    )
+    pool = get_pool()
+    conn = pool.acquire(get_secret_value('SNOWFLAKE_SCHEMA_RAW'))
     cs = conn.cursor()
     try:
         cs.execute("""
@@ -32,12 +26,14 @@ def transform(*args, **kwargs):
         print("Warehouse:", row[2])
         print("Database:", row[3])
         print("Schema:", row[4])
+        pool.log_stats()
         return {
             'user': row[0],
             'role': row[1],
             'warehouse': row[2],
             'database': row[3],
             'schema': row[4],
+            'pool': pool.stats(),
         }
     finally:
         cs.close()
@@ -4,20 +4,21 @@ if 'test' not in globals():
     from mage_ai.data_preparation.decorators import test
 
 import pandas as pd
-import requests
 from datetime import datetime
 
-BASE_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data"
-
-def _build_url(service: str, year: int, month: int) -> str:
-    # Formato oficial: yellow_tripdata_YYYY-MM.parquet / green_tripdata_YYYY-MM.parquet
-    return f"{BASE_URL}/{service}_tripdata_{year}-{month:02d}.parquet"
+from default_repo.utils.coverage_frame import BASE_URL, build_urls, local_path
+from default_repo.utils.http_probe import probe_urls_detailed
+from default_repo.utils.probe_cache import cache_from_kwargs
 
 @transformer
 def transform(data: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
     """
     Verifica si existe el archivo Parquet para cada (year, month, service_type).
-    NO descarga; usa peticiones HEAD para ahorrar tiempo/ancho de banda.
+    NO descarga; usa peticiones HEAD concurrentes (pool de sesiones + rate limit)
+    con reintentos/backoff en 5xx/errores transitorios. 403 y 404 no se reintentan
+    y salen como notes='missing', igual que el HEAD simple original. Los resultados se
+    guardan en un cache persistente (ETag/Last-Modified); en re-ejecuciones los
+    meses históricos salen del cache y el resto se revalida con HEAD condicional.
 
     Input:
         data: DataFrame del bloque generate_months con columnas:
@@ -26,7 +27,16 @@ def transform(data: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
     Output:
         DataFrame con columnas:
           ['year','month','service_type','url','has_parquet','http_status',
-           'content_length','checked_at','notes']
+           'content_length','checked_at','notes','etag','last_modified',
+           'probe_source']
+
+    kwargs:
+        max_concurrency (int, default 16), rate_per_s (float, default 20),
+        max_attempts (int, default 3), base_url (str, default CDN de TLC; un directorio local
+        -> las URLs son rutas a Parquet en disco, verificadas con os.stat),
+        years / months / services (list, opcional: filtra la entrada),
+        use_cache (bool, default True), force_refresh (bool, default False),
+        cache_ttl_s / cache_historical_ttl_s / cache_negative_ttl_s (float, TTLs del cache)
     """
     rows_out = []
     now_iso = datetime.utcnow().isoformat(timespec='seconds') + 'Z'
@@ -37,60 +47,52 @@ def transform(data: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
     if missing:
         raise ValueError(f"Faltan columnas en la entrada del bloque: {missing}")
 
-    # FILTRO años completos
-    #data = data.copy()
-    #Query de prueba para año
-    data = data.query("year == 2025").copy()
-    #Query año y servicio
-    #data = data.query("year == 2019 and service_type == 'green' and month == 12").copy()
-
-
-
-
-    for _, r in data.iterrows():
-        year = int(r['year'])
-        month = int(r['month'])
-        service = str(r['service_type']).lower().strip()
-
-        url = _build_url(service, year, month)
-        http_status = None
-        has_parquet = False
-        content_length = None
-        notes = None
-
-        try:
-            resp = requests.head(url, allow_redirects=True, timeout=10)
-            http_status = resp.status_code
-            # Algunos endpoints devuelven Content-Length:
-            if 'Content-Length' in resp.headers:
-                try:
-                    content_length = int(resp.headers['Content-Length'])
-                except Exception:
-                    content_length = None
-
-            if resp.status_code == 200:
-                has_parquet = True
-            elif resp.status_code in (403, 404):
-                has_parquet = False
-                notes = 'missing'
-            else:
-                has_parquet = False
-                notes = f'unexpected_status_{resp.status_code}'
-        except Exception as e:
-            http_status = None
-            has_parquet = False
-            notes = f'error:{type(e).__name__}'
+    data = data.copy()
+    data['year'] = data['year'].astype(int)
+    data['month'] = data['month'].astype(int)
+    data['service_type'] = data['service_type'].astype(str).str.lower().str.strip()
 
+    # Selección opcional de meses (por defecto todo lo que genera generate_months;
+    # el planificador incremental decide luego qué cargar)
+    for col, key in (('year', 'years'), ('month', 'months'), ('service_type', 'services')):
+        if kwargs.get(key):
+            data = data[data[col].isin(list(kwargs[key]))]
+
+    base_url = kwargs.get('base_url', BASE_URL)
+    # Formato oficial: yellow_tripdata_YYYY-MM.parquet / green_tripdata_YYYY-MM.parquet
+    urls = build_urls(data['service_type'], data['year'], data['month'], base_url).tolist()
+    cache = cache_from_kwargs(kwargs)
+    try:
+        results = probe_urls_detailed(
+            urls,
+            max_concurrency=int(kwargs.get('max_concurrency', 16)),
+            rate_per_s=float(kwargs.get('rate_per_s', 20)),
+            max_attempts=int(kwargs.get('max_attempts', 3)),
+            cache=cache,
+            force_refresh=bool(kwargs.get('force_refresh', False)),
+            retry_forbidden=False,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+
+    for (year, month, service), url, r in zip(
+        zip(data['year'], data['month'], data['service_type']), urls, results
+    ):
         rows_out.append({
-            'year': year,
-            'month': month,
+            'year': int(year),
+            'month': int(month),
             'service_type': service,
             'url': url,
-            'has_parquet': has_parquet,
-            'http_status': http_status,
-            'content_length': content_length,
+            'has_parquet': bool(r['has_parquet']),
+            'http_status': r['http_status'],
+            'content_length': r['content_length'],
             'checked_at': now_iso,
-            'notes': notes,
+            # el cache es compartido con build_coverage_matrix, que anota 403 como 'forbidden'
+            'notes': 'missing' if r['notes'] == 'forbidden' else r['notes'],
+            'etag': r['etag'],
+            'last_modified': r['last_modified'],
+            'probe_source': r['source'],
         })
 
     return pd.DataFrame(rows_out)
@@ -116,4 +118,5 @@ def test_output(output: pd.DataFrame, *args) -> None:
     assert output['year'].dtype.kind in 'iu', 'year debe ser entero'
     assert output['month'].dtype.kind in 'iu', 'month debe ser entero'
     assert output['service_type'].dtype.kind in 'OSU', 'service_type debe ser texto'
-    assert output['url'].str.contains('http').all(), 'Hay URLs inválidas'
+    remote = output['url'].str.contains('http')
+    assert (remote | output['url'].map(local_path).notna()).all(), 'Hay URLs inválidas'
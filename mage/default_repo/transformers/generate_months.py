@@ -3,25 +3,24 @@ if 'transformer' not in globals():
 if 'test' not in globals():
     from mage_ai.data_preparation.decorators import test
 
-import pandas as pd
+from default_repo.utils.coverage_frame import grid
+from default_repo.utils.trip_services import resolve_services
 
 @transformer
 def transform(*args, **kwargs):
     """
     Genera la matriz de (year, month, service_type) para 2015–2025.
     Esto servirá como entrada para los siguientes bloques de ingesta.
+    kwargs:
+      - services (list[str], default ['yellow','green']) -> cualquiera del registro
+                 utils/trip_services (p.ej. ['yellow','green','fhv','fhvhv'])
     """
-    years = range(2015, 2026)  # 2015–2025 inclusive
-    services = ['yellow', 'green']
-    rows = []
+    services = resolve_services(kwargs.get('services') or ['yellow', 'green'])
+    months = grid(services, '2015-01', '2025-12')  # 2015–2025 inclusive
 
-    for y in years:
-        for m in range(1, 13):
-            for s in services:
-                rows.append({'year': y, 'month': m, 'service_type': s})
-
-    # Devolvemos un DataFrame para que Mage lo pueda manejar abajo
-    return pd.DataFrame(rows)
+    # Devolvemos un DataFrame para que Mage lo pueda manejar abajo (mismo orden: año, mes, servicio)
+    months = months.sort_values(['year', 'month'], kind='stable').reset_index(drop=True)
+    return months[['year', 'month', 'service_type']]
 
 
 @test
@@ -29,8 +28,9 @@ def test_output(output, *args) -> None:
     """
     Verifica que el bloque produjo datos válidos.
     """
-    # Debe haber 11 años * 12 meses * 2 servicios = 264 filas
-    assert len(output) == 264, f'Esperaba 264 filas, encontré {len(output)}'
+    # Debe haber 11 años * 12 meses * servicios filas (264 con yellow + green)
+    expected = 11 * 12 * output['service_type'].nunique()
+    assert len(output) == expected, f'Esperaba {expected} filas, encontré {len(output)}'
 
     # Validar que contiene las columnas esperadas
     for col in ['year', 'month', 'service_type']:
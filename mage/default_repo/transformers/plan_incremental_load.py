@@ -0,0 +1,71 @@
+if 'transformer' not in globals():
+    from mage_ai.data_preparation.decorators import transformer
+if 'test' not in globals():
+    from mage_ai.data_preparation.decorators import test
+
+import pandas as pd
+
+from default_repo.utils.load_ledger import plan_partitions, read_audit, read_ledger
+from default_repo.utils.warehouse import get_warehouse
+
+@transformer
+def transform(data: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
+    """
+    Planificador incremental entre fetch_and_stage_parquet y copy_into_bronze.
+    Compara los metadatos remotos (content_length / ETag del HEAD) con lo que
+    dicen LOAD_LEDGER y LOAD_AUDIT/COVERAGE_MATRIX y marca cada partición:
+      - action='load': nueva (new), cambió (etag_changed / size_changed),
+                       falló antes (previous_error) o forzada (forced)
+      - action='skip': sin cambios (unchanged), cargada antes del ledger
+                       (loaded_no_ledger) o sin Parquet (no_remote_file)
+    copy_into_bronze solo procesa las filas con action='load'.
+
+    kwargs:
+      - dry_run     (bool, default False) -> imprime el plan y marca 'would_load' (no se carga nada)
+      - force       (bool, default False) -> recarga todas las particiones con Parquet
+      - trust_audit (bool, default True)  -> particiones con filas en LOAD_AUDIT pero sin ledger se omiten
+      - warehouse / duckdb_path -> backend (utils/warehouse; default Snowflake)
+      - database / schema (str, default: los del warehouse; en Snowflake los secretos
+                           SNOWFLAKE_DATABASE / SNOWFLAKE_SCHEMA_RAW)
+      - conn_factory (callable, default: conexiones del warehouse)
+    """
+    if data is None or data.empty:
+        raise ValueError("No llegó data desde fetch_and_stage_parquet.")
+
+    warehouse = get_warehouse(kwargs)
+    DB = kwargs.get('database') or warehouse.database
+    SCHEMA_RAW = kwargs.get('schema') or warehouse.schema('raw')
+    dry_run = bool(kwargs.get('dry_run', False))
+    force = bool(kwargs.get('force', False))
+    trust_audit = bool(kwargs.get('trust_audit', True))
+
+    conn = (kwargs.get('conn_factory') or warehouse.factory(SCHEMA_RAW))()
+    try:
+        ledger = read_ledger(conn, DB, SCHEMA_RAW)
+        audit = read_audit(conn, DB, SCHEMA_RAW)
+    finally:
+        conn.close()
+
+    plan = plan_partitions(data, ledger, audit, force=force, trust_audit=trust_audit)
+
+    n_load = int((plan['action'] == 'load').sum())
+    by_reason = plan.groupby(['action', 'reason']).size()
+    print(f"[planner] particiones={len(plan)} | a cargar={n_load} | omitidas={len(plan) - n_load}"
+          + (" | DRY-RUN" if dry_run else ""))
+    for (action, reason), n in by_reason.items():
+        print(f"[planner]   {action:4s} {reason:16s} {n}")
+
+    if dry_run:
+        for r in plan[plan['action'] == 'load'].sort_values(['service_type', 'year', 'month']).itertuples(index=False):
+            print(f"[planner] cargaría {r.service_type} {r.year}-{r.month:02d} ({r.reason})")
+        plan.loc[plan['action'] == 'load', 'action'] = 'would_load'
+
+    return plan
+
+
+@test
+def test_output(output: pd.DataFrame, *args) -> None:
+    assert output is not None, 'El output es None'
+    for c in ['year', 'month', 'service_type', 'url', 'has_parquet', 'action', 'reason']:
+        assert c in output.columns, f'Falta columna {c}'
+    assert output['action'].isin(['load', 'skip', 'would_load']).all(), 'action inválida'
@@ -3,66 +3,30 @@ if 'transformer' not in globals():
 if 'test' not in globals():
     from mage_ai.data_preparation.decorators import test
 
-import os
 import pandas as pd
 from datetime import datetime
 
-import snowflake.connector
 from mage_ai.data_preparation.shared.secrets import get_secret_value
 
-COVERAGE_PATH = "/home/src/docs/coverage_matrix.csv"
-
-def _conn():
-    return snowflake.connector.connect(
-        account=get_secret_value('SNOWFLAKE_ACCOUNT'),
-        user=get_secret_value('SNOWFLAKE_USER'),
-        password=get_secret_value('SNOWFLAKE_PASSWORD'),
-        role=get_secret_value('SNOWFLAKE_ROLE'),
-        warehouse=get_secret_value('SNOWFLAKE_WAREHOUSE'),
-        database=get_secret_value('SNOWFLAKE_DATABASE'),
-        schema=get_secret_value('SNOWFLAKE_SCHEMA_RAW'),
-        client_session_keep_alive=False,
-    )
+from default_repo.utils.coverage_frame import load_status
+from default_repo.utils.coverage_store import open_store
+from default_repo.utils.load_ledger import partition_counts
+from default_repo.utils.snowflake_pool import get_pool
+
+OUTPUT_COLUMNS = ['year','month','service_type','has_parquet','load_status','row_count','notes','updated_at']
 
-def _read_existing_csv():
-    if os.path.exists(COVERAGE_PATH):
-        try:
-            return pd.read_csv(COVERAGE_PATH)
-        except Exception:
-            pass
-    return pd.DataFrame(columns=[
-        'year','month','service_type','has_parquet','load_status',
-        'row_count','notes','updated_at'
-    ])
-
-def _counts_from_snowflake():
+def _counts_from_snowflake(keys: pd.DataFrame, source='ledger'):
+    """
+    source='ledger' -> conteos registrados por copy_into_bronze (ledger/auditoría); las
+                       particiones que no registró (p.ej. cargadas antes del ledger) se cuentan en BRONZE.
+    source='scan'   -> count(*) en BRONZE de las particiones de availability_df.
+    """
     db = get_secret_value('SNOWFLAKE_DATABASE')
     sch = get_secret_value('SNOWFLAKE_SCHEMA_RAW')
 
-    conn = _conn()
+    conn = get_pool().acquire(sch)
     try:
-        q = f"""
-        with y as (
-          select 'yellow' as service_type, year, month, count(*) as row_count
-          from {db}.{sch}.yellow_trips
-          group by 1,2,3
-        ),
-        g as (
-          select 'green' as service_type, year, month, count(*) as row_count
-          from {db}.{sch}.green_trips
-          group by 1,2,3
-        )
-        select * from y
-        union all
-        select * from g
-        """
-        df = pd.read_sql(q, conn)
-        # asegurar tipos
-        if not df.empty:
-            df['year'] = df['year'].astype(int)
-            df['month'] = df['month'].astype(int)
-            df['service_type'] = df['service_type'].astype(str)
-        return df
+        return partition_counts(conn, db, sch, keys, source=source)
     except Exception as e:
         print("Error consultando conteos en Snowflake:", e)
         return pd.DataFrame(columns=['service_type','year','month','row_count'])
@@ -75,8 +39,17 @@ def transform(availability_df: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
     availability_df: output del bloque 2 con columnas:
       ['year','month','service_type','url','has_parquet','http_status','content_length','checked_at','notes']
 
+    kwargs:
+      - counts_source: 'ledger' (default) | 'scan'
+                       ledger -> row_count desde LOAD_LEDGER / LOAD_AUDIT; solo las particiones
+                                 que no registraron se cuentan en BRONZE
+                       scan   -> count(*) sobre BRONZE de las particiones de availability_df
+      - coverage_store_path / coverage_csv_path: rutas del store y del CSV (default en el repo)
+      - write_csv: bool (default True) -> regenera coverage_matrix.csv desde el store
+
     Efecto:
-      - Escribe/actualiza docs/coverage_matrix.csv
+      - Upsert de (has_parquet, load_status, row_count, notes, updated_at) en el store de
+        cobertura (utils/coverage_store) y export atómico de coverage_matrix.csv
     Retorna:
       - El DataFrame completo de cobertura actualizado (útil para inspección en UI).
     """
@@ -90,7 +63,7 @@ def transform(availability_df: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
     avail['service_type'] = avail['service_type'].astype(str)
 
     # Conteos actuales en BRONZE
-    counts = _counts_from_snowflake()
+    counts = _counts_from_snowflake(avail, source=str(kwargs.get('counts_source', 'ledger')))
 
     # Merge availability + counts
     cov = avail.merge(
@@ -100,36 +73,19 @@ def transform(availability_df: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
     )
     cov['row_count'] = cov['row_count'].fillna(0).astype(int)
 
-    # Determinar load_status
-    def decide_status(row):
-        if pd.notnull(row.get('notes')) and str(row['notes']).startswith('error'):
-            return 'error'
-        if not row['has_parquet']:
-            return 'missing'
-        # has_parquet True:
-        return 'ok' if row['row_count'] > 0 else 'pending'
-
-    cov['load_status'] = cov.apply(decide_status, axis=1)
+    # Determinar load_status: error > missing > ok (con filas) > pending
+    cov['load_status'] = load_status(cov['has_parquet'], cov['row_count'], cov['notes'])
     cov['updated_at'] = datetime.utcnow().isoformat(timespec='seconds') + 'Z'
 
-    # Cargar cobertura previa y hacer upsert por clave (y,m,service)
-    prev = _read_existing_csv()
-    key_cols = ['year','month','service_type']
-    if not prev.empty:
-        # drop duplicados en prev y cov, priorizando los nuevos
-        prev = prev.drop_duplicates(subset=key_cols, keep='last')
-        cov = cov.drop_duplicates(subset=key_cols, keep='last')
-        merged = pd.concat([prev, cov], ignore_index=True)
-        merged = merged.sort_values('updated_at').drop_duplicates(subset=key_cols, keep='last')
-    else:
-        merged = cov
-
-    # Guardar CSV
-    os.makedirs(os.path.dirname(COVERAGE_PATH), exist_ok=True)
-    merged = merged[['year','month','service_type','has_parquet','load_status','row_count','notes','updated_at']]
-    merged.to_csv(COVERAGE_PATH, index=False)
-
-    print(f"Cobertura actualizada: {COVERAGE_PATH} ({len(merged)} filas)")
+    # Upsert por clave (service, y, m) en el store: lo que escribieron otros bloques se conserva
+    cov = cov.drop_duplicates(subset=['service_type','year','month'], keep='last')
+    with open_store(kwargs) as store:
+        store.upsert(cov[OUTPUT_COLUMNS])
+        merged = store.read()[OUTPUT_COLUMNS]
+        if kwargs.get('write_csv', True):
+            out_path = store.export_csv(kwargs.get('coverage_csv_path'))
+            print(f"Cobertura actualizada: {out_path} ({len(merged)} filas)")
+
     return merged
 
 @test
@@ -0,0 +1,137 @@
+"""
+Tamaño de batch adaptativo para la subida con write_pandas.
+
+El decode reagrupa row groups (que cambian mucho de tamaño según el año) en
+batches de `rows_for()` filas, calculadas a partir de un presupuesto en bytes
+(`target_mb`) y del ancho medio de fila observado (EMA de `tbl.nbytes / filas`).
+Tras cada subida, `observe(filas, segundos)` ajusta el presupuesto:
+- RSS del proceso por encima de `max_rss_mb` -> se reduce a la mitad.
+- Hill climbing sobre filas/s: con cada `window` batches medidos al mismo
+  tamaño se compara el throughput con el del tamaño anterior; si mejora se sigue
+  en la misma dirección (x`step` o /`step`), si empeora se invierte y si la
+  diferencia es menor a `tolerance` se mantiene.
+Los batches de cola (fin de archivo, < 50% del objetivo) no cuentan como muestra.
+Con `fixed_rows` el tamaño es fijo (modo no adaptativo) y `observe` no ajusta nada.
+Un batcher es thread-safe y se comparte entre las particiones de un servicio.
+"""
+import os
+import threading
+from typing import Optional
+
+MB = 1024 * 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """RSS actual del proceso en MB (None si no se puede medir)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # fallback: pico de RSS (KB en Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except Exception:
+        return None
+
+
+class AdaptiveBatcher:
+    def __init__(self, name: str = '', target_mb: float = 128, min_mb: float = 16, max_mb: float = 1024,
+                 min_rows: int = 10_000, max_rows: int = 2_000_000, max_rss_mb: Optional[float] = 4096,
+                 fixed_rows: Optional[int] = None, step: float = 1.5, window: int = 2,
+                 tolerance: float = 0.05):
+        self.name = name
+        self.target_bytes = float(target_mb) * MB
+        self.min_bytes = float(min_mb) * MB
+        self.max_bytes = float(max_mb) * MB
+        self.min_rows = int(min_rows)
+        self.max_rows = int(max_rows)
+        self.max_rss_mb = float(max_rss_mb) if max_rss_mb else None
+        self.fixed_rows = int(fixed_rows) if fixed_rows else None
+        self.step = float(step)
+        self.window = max(1, int(window))
+        self.tolerance = float(tolerance)
+        self.bytes_per_row: Optional[float] = None
+        self._direction = 1
+        self._last_rate: Optional[float] = None
+        self._samples = []  # (filas, segundos) al tamaño actual
+        self._lock = threading.Lock()
+
+    @property
+    def adaptive(self) -> bool:
+        return self.fixed_rows is None
+
+    # ---------- tamaño ----------
+    def observe_width(self, nbytes: int, num_rows: int) -> None:
+        """Actualiza el ancho medio de fila con un row group recién decodificado."""
+        if num_rows <= 0:
+            return
+        width = nbytes / num_rows
+        with self._lock:
+            self.bytes_per_row = width if self.bytes_per_row is None else 0.7 * self.bytes_per_row + 0.3 * width
+
+    def rows_for(self) -> int:
+        if self.fixed_rows is not None:
+            return self.fixed_rows
+        with self._lock:
+            return self._rows_locked()
+
+    def _rows_locked(self) -> int:
+        if not self.bytes_per_row:
+            return self.min_rows
+        return int(min(self.max_rows, max(self.min_rows, self.target_bytes / self.bytes_per_row)))
+
+    def describe(self) -> str:
+        if self.fixed_rows is not None:
+            return f"fijo {self.fixed_rows} filas"
+        with self._lock:
+            rows = f" (~{self._rows_locked()} filas)" if self.bytes_per_row else ''
+            return f"target {self.target_bytes / MB:.0f} MB{rows}"
+
+    # ---------- ajuste ----------
+    def observe(self, rows: int, seconds: float) -> None:
+        """Registra una subida de `rows` filas en `seconds` y ajusta el tamaño."""
+        if self.fixed_rows is not None or rows <= 0:
+            return
+        rss = current_rss_mb()
+        with self._lock:
+            if self.max_rss_mb is not None and rss is not None and rss > self.max_rss_mb:
+                if self.target_bytes > self.min_bytes:
+                    self._direction = -1
+                    self._last_rate = None
+                    self._resize(self.target_bytes / 2, 'rss', None, rss)
+                return
+            if rows < 0.5 * self._rows_locked():
+                return  # batch de cola: no es representativo
+            self._samples.append((rows, max(seconds, 1e-6)))
+            if len(self._samples) < self.window:
+                return
+            rate = sum(r for r, _ in self._samples) / sum(s for _, s in self._samples)
+            self._samples = []
+            if self._last_rate is None:
+                reason = 'probe'
+            elif rate > self._last_rate * (1 + self.tolerance):
+                reason = 'faster'
+            elif rate < self._last_rate * (1 - self.tolerance):
+                self._direction = -self._direction
+                reason = 'slower'
+            else:
+                self._last_rate = rate
+                return  # estable: se mantiene el tamaño
+            self._last_rate = rate
+            factor = self.step if self._direction > 0 else 1 / self.step
+            self._resize(self.target_bytes * factor, reason, rate, rss)
+
+    def _resize(self, target: float, reason: str, rate: Optional[float], rss: Optional[float]) -> None:
+        clamped = min(self.max_bytes, max(self.min_bytes, target))
+        if clamped != target:
+            self._direction = -self._direction  # en el borde: la próxima prueba va hacia el otro lado
+        if clamped == self.target_bytes:
+            return
+        self.target_bytes = clamped
+        self._samples = []
+        rate_s = f"{rate:,.0f} filas/s" if rate is not None else '-'
+        rss_s = f"{rss:.0f} MB" if rss is not None else '-'
+        print(f"[batch] {self.name} target={clamped / MB:.0f} MB (~{self._rows_locked()} filas) | "
+              f"{reason} | {rate_s} | rss {rss_s}")
@@ -0,0 +1,115 @@
+"""
+Normalización de lotes de viajes en Arrow (sin pasar por pandas).
+
+Recibe un `pa.Table` tal como viene del Parquet de TLC (nombres con mayúsculas,
+tipos variables según el año) y devuelve una tabla con exactamente las columnas
+base de la DDL BRONZE, casteadas a sus tipos, más la huella del viaje
+(`trip_fp`, utils/trip_fingerprint) y las columnas de metadatos.
+"""
+import re
+from typing import Dict, Sequence
+
+import pyarrow as pa
+
+from default_repo.utils.trip_fingerprint import FINGERPRINT_COL, trip_fingerprint
+
+# Tipos de la DDL BRONZE -> tipos Arrow
+ARROW_TYPES = {
+    'integer': pa.int64(),
+    'int': pa.int64(),
+    'float': pa.float64(),
+    'timestamp': pa.timestamp('us'),
+    'string': pa.string(),
+    'boolean': pa.bool_(),
+    'binary': pa.binary(),
+}
+
+META_TYPES = {
+    'run_id': 'string',
+    'ingest_ts': 'string',
+    'year': 'int',
+    'month': 'int',
+    'service_type': 'string',
+    'source_url': 'string',
+}
+
+_DDL_COL_RE = re.compile(r'^\s*([a-z_][a-z0-9_]*)\s+([a-z_]+)\b', re.IGNORECASE)
+
+
+def ddl_column_types(ddl: str) -> Dict[str, str]:
+    """Extrae {columna: tipo} (en orden) de una DDL `create table ... ( ... )`."""
+    body = ddl[ddl.index('(') + 1: ddl.rindex(')')]
+    types = {}
+    for line in body.splitlines():
+        line = line.split('--', 1)[0]
+        m = _DDL_COL_RE.match(line)
+        if m:
+            types[m.group(1).lower()] = m.group(2).lower()
+    return types
+
+
+def ddl_type_for(arrow_type: pa.DataType) -> str:
+    """Tipo DDL para una columna nueva del Parquet de origen (schema drift)."""
+    if pa.types.is_integer(arrow_type):
+        return 'integer'
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return 'float'
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return 'timestamp'
+    if pa.types.is_boolean(arrow_type):
+        return 'boolean'
+    return 'string'
+
+
+def _constant(value, typ: pa.DataType, n: int) -> pa.Array:
+    """Columna constante barata: dictionary-encoded para strings, repeat para números."""
+    if pa.types.is_string(typ):
+        indices = pa.repeat(pa.scalar(0, type=pa.int32()), n)
+        return pa.DictionaryArray.from_arrays(indices, pa.array([value], type=typ))
+    return pa.repeat(pa.scalar(value, type=typ), n)
+
+
+def _cast_column(tbl: pa.Table, col: str, ddl_type: str):
+    typ = ARROW_TYPES[ddl_type]
+    if col not in tbl.column_names:
+        return pa.nulls(tbl.num_rows, typ)
+    arr = tbl.column(col)
+    # sin chequeo de overflow, igual que el path pandas
+    return arr if arr.type.equals(typ) else arr.cast(typ, safe=False)
+
+
+def fingerprint_column(tbl: pa.Table, column_types: Dict[str, str], key_cols: Sequence[str],
+                       service: str) -> pa.Array:
+    """`trip_fp` de un lote sin normalizar (path pandas): castea solo las key_cols."""
+    tbl = tbl.rename_columns([str(c).lower() for c in tbl.column_names])
+    return trip_fingerprint({c: _cast_column(tbl, c, column_types[c]) for c in key_cols}, key_cols, service)
+
+
+def normalize_table(tbl: pa.Table, column_types: Dict[str, str], meta: Dict[str, object],
+                    key_cols: Sequence[str] = ()) -> pa.Table:
+    """
+    - nombres a minúsculas
+    - columnas faltantes como nulls tipados
+    - cast a los tipos de la DDL (sin chequeo de overflow, igual que el path pandas)
+    - `trip_fp` (si la DDL la declara) sobre las `key_cols` ya casteadas
+    - metadatos como columnas constantes (dictionary-encoded)
+    Columnas de salida: column_types (en orden) + META_TYPES.
+    """
+    tbl = tbl.rename_columns([str(c).lower() for c in tbl.column_names])
+    n = tbl.num_rows
+    arrays, names = [], []
+    for col, ddl_type in column_types.items():
+        if col in META_TYPES or col == FINGERPRINT_COL:
+            continue
+        arrays.append(_cast_column(tbl, col, ddl_type))
+        names.append(col)
+    if FINGERPRINT_COL in column_types:
+        if not key_cols:
+            raise ValueError(f"{FINGERPRINT_COL} sin key_cols ({meta.get('service_type')})")
+        cast = dict(zip(names, arrays))
+        arrays.append(trip_fingerprint({c: cast[c] for c in key_cols}, key_cols, meta['service_type']))
+        names.append(FINGERPRINT_COL)
+    for col, ddl_type in META_TYPES.items():
+        arrays.append(_constant(meta[col], ARROW_TYPES[ddl_type], n))
+        names.append(col)
+    return pa.Table.from_arrays(arrays, names=names)
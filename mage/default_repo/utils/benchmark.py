@@ -0,0 +1,47 @@
+"""
+Utilidades mínimas de benchmark para los bloques `custom/bench_*`.
+
+`measure()` ejecuta una función ('modulo:funcion') en un proceso nuevo para que
+el RSS pico de cada variante no se contamine con las anteriores. La función
+debe devolver el número de filas procesadas.
+"""
+import importlib
+import multiprocessing as mp
+import resource
+import sys
+import time
+from typing import Any, Dict
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _child(target: str, args: tuple, kwargs: dict) -> Dict[str, Any]:
+    module, func = target.split(':')
+    fn = getattr(importlib.import_module(module), func)
+    base_rss = _max_rss_mb()
+    t0 = time.perf_counter()
+    rows = fn(*args, **kwargs)
+    seconds = time.perf_counter() - t0
+    return {
+        'rows': int(rows or 0),
+        'seconds': round(seconds, 3),
+        'rows_per_s': round((rows or 0) / seconds) if seconds > 0 else None,
+        'peak_rss_mb': round(_max_rss_mb(), 1),
+        'peak_rss_delta_mb': round(_max_rss_mb() - base_rss, 1),
+    }
+
+
+def measure(target: str, *args, repeat: int = 1, **kwargs) -> Dict[str, Any]:
+    """Mide `target` `repeat` veces (un proceso por repetición) y devuelve la mejor corrida."""
+    ctx = mp.get_context('spawn')
+    runs = []
+    for _ in range(max(1, int(repeat))):
+        with ctx.Pool(1) as pool:
+            runs.append(pool.apply(_child, (target, args, kwargs)))
+    best = min(runs, key=lambda r: r['seconds'])
+    best['target'] = target
+    return best
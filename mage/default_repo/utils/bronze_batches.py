@@ -0,0 +1,162 @@
+"""
+Batches de BRONZE a partir de un ParquetSource (etapa decode de copy_into_bronze).
+
+`produce_batches()` normaliza los row groups que deja el pushdown y emite los
+items que consume el sink (utils/bronze_sink):
+  - {'url', 'drift': {columna: tipo}}  columnas nuevas del origen, antes del primer batch
+  - {'url', 'rg', 'num_groups', 'b', 'num_batches', 'ingest_ts', 'row_offset', 'pdf' | 'tbl'}
+  - {'url', 'done': True, 'skipped': {...}}  fin del archivo + contadores del pushdown
+write_pandas: batches de `batcher.rows_for()` filas que cruzan límites de row group,
+normalizados en Arrow o con el path pandas original. copy_into: una tabla Arrow
+normalizada por row group.
+"""
+from typing import Callable, Dict, Iterator
+
+import pandas as pd
+import pyarrow as pa
+
+from default_repo.utils.adaptive_batch import AdaptiveBatcher
+from default_repo.utils.arrow_normalize import fingerprint_column, normalize_table
+from default_repo.utils.parquet_source import ParquetSource
+from default_repo.utils.trip_fingerprint import FINGERPRINT_COL
+from default_repo.utils.trip_services import get_service
+
+META_COLS = ['run_id', 'ingest_ts', 'year', 'month', 'service_type', 'source_url']
+
+
+def utc_now_iso() -> str:
+    # con microsegundos: identifica cada batch dentro de un run_id (checkpoints)
+    return pd.Timestamp.now(tz='UTC').tz_localize(None).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def normalize_trip_datetimes(pdf: pd.DataFrame, service: str) -> None:
+    """
+    Convierte los timestamps del servicio (pickup/dropoff, request/on_scene en fhvhv) a
+    'YYYY-MM-DD HH:MM:SS' como string (Snowflake TIMESTAMP_NTZ friendly).
+    """
+    for c in get_service(service).timestamp_cols:
+        dt = pd.to_datetime(pdf[c], errors='coerce', utc=False)
+        iso = dt.dt.strftime('%Y-%m-%d %H:%M:%S')
+        pdf[c] = iso
+        pdf.loc[dt.isna(), c] = None
+
+
+def normalize_batch_pandas(slice_tbl: pa.Table, service: str, meta: dict, extra_cols=()) -> pd.DataFrame:
+    """Arrow slice -> DataFrame con columnas base (+ drift) + trip_fp + metadatos, listo para write_pandas."""
+    svc = get_service(service)
+    # huella sobre los valores casteados a la DDL: la misma que en el path Arrow
+    trip_fp = fingerprint_column(slice_tbl, svc.column_types, svc.key_cols, service)
+    pdf = slice_tbl.to_pandas(split_blocks=True, self_destruct=True)
+
+    # normalizar columnas
+    pdf.columns = [str(c).lower() for c in pdf.columns]
+    base_cols = svc.columns + list(extra_cols)
+    for c in base_cols:
+        if c not in pdf.columns:
+            pdf[c] = pd.NA
+
+    pdf[FINGERPRINT_COL] = trip_fp.to_pandas()
+
+    # metadatos (ingest_ts ISO string)
+    pdf['run_id'] = meta['run_id']
+    pdf['ingest_ts'] = meta.get('ingest_ts') or utc_now_iso()
+    pdf['year'] = meta['year']
+    pdf['month'] = meta['month']
+    pdf['service_type'] = meta['service_type']
+    pdf['source_url'] = meta['source_url']
+
+    # normalizar fechas pickup/dropoff a ISO
+    normalize_trip_datetimes(pdf, service)
+
+    # orden final
+    return pdf[base_cols + [FINGERPRINT_COL] + META_COLS]
+
+
+def normalize_batch_arrow(slice_tbl: pa.Table, column_types: dict, meta: dict) -> pd.DataFrame:
+    """
+    Normalización en pyarrow.compute (rename, nulls, casts de la DDL, trip_fp,
+    metadatos dictionary-encoded). El DataFrame resultante es arrow-backed (zero-copy):
+    write_pandas lo vuelve a escribir a Parquet sin pasar por objetos Python.
+    """
+    key_cols = get_service(meta['service_type']).key_cols
+    return normalize_table(slice_tbl, column_types, meta, key_cols).to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def produce_batches(source: ParquetSource, meta: dict, *, batcher: AdaptiveBatcher = None,
+                    normalize: str = 'arrow', copy_mode: bool = False, accept_drift: bool = False,
+                    window=None, resume_at: int = 0, cancelled: Callable[[], bool] = lambda: False,
+                    tag: str = '') -> Iterator[Dict]:
+    """
+    Items del archivo `source` para la partición de `meta` (run_id, year, month,
+    service_type). Con `accept_drift` las columnas nuevas se anuncian y se cargan;
+    sin él se ignoran. Libera `source` al terminar.
+    """
+    service = meta['service_type']
+    svc = get_service(service)
+    url = source.url
+    meta = {**meta, 'source_url': url}
+    try:
+        num_groups = source.num_row_groups
+        print(f"{tag} Row groups: {num_groups}")
+        drift = source.drift(svc.column_types)
+        file_types = svc.column_types
+        if drift and accept_drift:
+            # el sink (hilo dueño de la conexión) hace el ALTER antes del primer batch
+            yield {'url': url, 'drift': drift}
+            file_types = {**svc.column_types, **drift}
+        elif drift:
+            print(f"{tag} Columnas nuevas en el origen (ignoradas): {', '.join(drift)}")
+        extra_cols = [c for c in file_types if c not in svc.column_types]
+
+        def _batch(parts, rg, b, row_offset):
+            slice_tbl = pa.concat_tables(parts) if len(parts) > 1 else parts[0]
+            ingest_ts = utc_now_iso()
+            if normalize == 'arrow':
+                pdf = normalize_batch_arrow(slice_tbl, file_types, {**meta, 'ingest_ts': ingest_ts})
+            else:
+                pdf = normalize_batch_pandas(slice_tbl, service, {**meta, 'ingest_ts': ingest_ts}, extra_cols)
+            return {
+                'url': url, 'rg': rg, 'num_groups': num_groups, 'b': b, 'num_batches': None,
+                'pdf': pdf, 'ingest_ts': ingest_ts, 'row_offset': row_offset,
+            }
+
+        groups = source.row_groups(file_types, window, svc.pickup_col, resume_at=resume_at, cancelled=cancelled)
+        if copy_mode:
+            # Un row group de salida por row group de entrada
+            for rg, tbl in groups:
+                ingest_ts = utc_now_iso()
+                yield {
+                    'url': url, 'rg': rg, 'num_groups': num_groups, 'b': 0, 'num_batches': 1,
+                    'tbl': normalize_table(tbl, file_types, {**meta, 'ingest_ts': ingest_ts}, svc.key_cols),
+                    'ingest_ts': ingest_ts,
+                }
+                del tbl
+        else:
+            emit_offset = resume_at  # offset de la primera fila pendiente de emitir
+            pending, pending_rows, b = [], 0, 0
+            for rg, tbl in groups:
+                batcher.observe_width(tbl.nbytes, tbl.num_rows)
+                pending.append(tbl)
+                pending_rows += tbl.num_rows
+                del tbl
+                # batches de `rows_for()` filas, cruzando límites de row group
+                target = batcher.rows_for()
+                while pending_rows >= target:
+                    buf = pa.concat_tables(pending) if len(pending) > 1 else pending[0]
+                    yield _batch([buf.slice(0, target)], rg, b, emit_offset)
+                    rest = buf.slice(target)
+                    pending, pending_rows = ([rest] if rest.num_rows else []), rest.num_rows
+                    emit_offset += target
+                    b += 1
+                    del buf
+                    target = batcher.rows_for()
+            if cancelled():
+                return
+            if pending_rows:
+                yield _batch(pending, num_groups - 1, b, emit_offset)
+                pending = []
+        if cancelled():
+            return
+        yield {'url': url, 'done': True, 'skipped': dict(source.skipped)}
+    finally:
+        source.release()
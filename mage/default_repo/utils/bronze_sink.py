@@ -0,0 +1,206 @@
+"""
+Destino de los batches de una partición BRONZE (utils/bronze_batches).
+
+  - WritePandasSink: DELETE de la partición al empezar y un write_pandas por batch.
+                     Con checkpoint cada batch confirmado queda en LOAD_CHECKPOINT y
+                     `resume` retoma un run incompleto con su run_id (utils/checkpoint).
+  - CopyIntoSink:    junta las tablas normalizadas en un único Parquet, lo sube al
+                     stage y hace DELETE + COPY INTO en una transacción (utils/bulk_load).
+Ambos exponen start() -> run_id, add_columns(), write(item) -> filas, file_done(url),
+finish() y close(); `rows` / `batches` / `latest_ingest_ts` alimentan el resumen.
+"""
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+from default_repo.utils.adaptive_batch import AdaptiveBatcher
+from default_repo.utils.bulk_load import StageBackend, write_partition_file
+from default_repo.utils.checkpoint import PartitionCheckpoint, window_key
+from default_repo.utils.schema_registry import SchemaRegistry
+from default_repo.utils.trip_services import get_service
+
+
+class BronzeSink:
+    """Partición natural (service, year, month) de `<db>.<schema>.<service>_trips`."""
+
+    def __init__(self, conn, db: str, schema: str, service: str, year: int, month: int, tag: str = ''):
+        self.conn = conn
+        self.db, self.schema = db, schema
+        self.service, self.year, self.month = service, year, month
+        self.table = get_service(service).table
+        self.fq_table = f'{db}.{schema}.{self.table}'
+        self.column_types = dict(get_service(service).column_types)  # + columnas nuevas del origen
+        self.tag = tag
+        self.run_id = None
+        self.rows = 0
+        self.batches = 0
+        self.latest_ingest_ts = None  # último ingest_ts confirmado (ledger/auditoría)
+        self.done_urls = set()        # archivos completos de un run previo (resume)
+
+    def _delete(self, cur) -> None:
+        # Idempotencia por lote (replace de partición natural)
+        cur.execute(f"delete from {self.fq_table} where year = %s and month = %s and service_type = %s",
+                    (self.year, self.month, self.service))
+
+    def start(self) -> str:
+        raise NotImplementedError
+
+    def resume_offset(self, url: str) -> int:
+        """Primera fila no confirmada de `url` en un run reanudado."""
+        return 0
+
+    def add_columns(self, registry: SchemaRegistry, drift: Dict[str, str]) -> List[str]:
+        """Schema drift: agrega a la tabla las columnas nuevas; devuelve las que faltaban."""
+        added = registry.extend(self.conn, self.table, drift)
+        self.column_types.update(drift)
+        return added
+
+    def write(self, item: dict) -> int:
+        raise NotImplementedError
+
+    def file_done(self, url: str) -> None:
+        """Marca `url` como cargado completo."""
+
+    def finish(self, ok: bool) -> None:
+        """Cierra la partición; `ok` = sin errores en los archivos."""
+
+    def close(self) -> None:
+        """Libera recursos locales (siempre, aun con error)."""
+
+    def _seen(self, item: dict) -> None:
+        self.latest_ingest_ts = max(self.latest_ingest_ts or '', item['ingest_ts'])
+
+
+class WritePandasSink(BronzeSink):
+    """Un write_pandas por batch, con checkpoint opcional por batch confirmado."""
+
+    def __init__(self, conn, db: str, schema: str, service: str, year: int, month: int, *,
+                 writer, batcher: AdaptiveBatcher, arrow: bool = True, checkpoint: bool = False,
+                 resume: bool = False, window=None, tag: str = ''):
+        super().__init__(conn, db, schema, service, year, month, tag)
+        self.writer = writer
+        self.batcher = batcher
+        # timestamps como datetime (no string) -> Snowflake necesita use_logical_type
+        self.writer_kwargs = {'use_logical_type': True} if arrow else {}
+        # los offsets del checkpoint valen solo para la misma ventana de pickup_filter
+        self.ckpt = (PartitionCheckpoint(conn, db, schema, service, year, month, pickup_window=window_key(window))
+                     if checkpoint else None)
+        self.resume = resume
+        self.resuming = False
+        self.resumed_rows = 0
+
+    def start(self) -> str:
+        ckpt = self.ckpt
+        self.resuming = bool(ckpt is not None and self.resume and ckpt.load())
+        if self.resuming:
+            self.run_id = ckpt.run_id
+            purged = ckpt.purge_uncommitted(self.fq_table)
+            print(f"{self.tag} Reanudando run {self.run_id}: {ckpt.batches} batches confirmados "
+                  f"({ckpt.rows} filas), {len(ckpt.done_urls)} archivos completos, purgadas {purged} filas")
+            self.rows = self.resumed_rows = ckpt.rows
+            self.latest_ingest_ts = ckpt.latest_ingest_ts
+            self.done_urls = set(ckpt.done_urls)
+            return self.run_id
+        self.run_id = str(uuid.uuid4())
+        cur = self.conn.cursor()
+        try:
+            self._delete(cur)
+        finally:
+            cur.close()
+        if ckpt is not None:
+            ckpt.clear()
+        return self.run_id
+
+    def resume_offset(self, url: str) -> int:
+        return self.ckpt.resume_offset(url) if self.resuming else 0
+
+    def write(self, item: dict) -> int:
+        t0 = time.time()
+        ok, nchunks, nrows, _ = self.writer(
+            self.conn, item['pdf'],
+            table_name=self.table,
+            database=self.db,
+            schema=self.schema,
+            quote_identifiers=False,
+            chunk_size=100_000,
+            **self.writer_kwargs,
+        )
+        self.rows += nrows
+        self.batches += 1
+        self.batcher.observe(nrows, time.time() - t0)
+        if self.ckpt is not None:
+            self.ckpt.commit_batch(self.run_id, item['url'], item['rg'], item['b'], item['row_offset'], nrows,
+                                   len(item['pdf']), item['ingest_ts'])
+        self._seen(item)
+        return nrows
+
+    def file_done(self, url: str) -> None:
+        if self.ckpt is not None:
+            self.ckpt.commit_file(self.run_id, url)
+
+    def finish(self, ok: bool) -> None:
+        if self.ckpt is not None and ok:
+            self.ckpt.clear()
+
+
+class CopyIntoSink(BronzeSink):
+    """Parquet único por partición -> stage -> DELETE + COPY INTO atómico."""
+
+    def __init__(self, conn, db: str, schema: str, service: str, year: int, month: int, *,
+                 stage_backend: StageBackend, tag: str = ''):
+        super().__init__(conn, db, schema, service, year, month, tag)
+        self.stage_backend = stage_backend
+        self.stage_dir = None
+        self.stage_path = None
+        self.pq_writer = None
+        self.staged_rows = 0
+
+    def start(self) -> str:
+        self.run_id = str(uuid.uuid4())
+        self.stage_dir = tempfile.mkdtemp(prefix='bronze_')
+        self.stage_path = os.path.join(self.stage_dir, f'{self.run_id}.parquet')
+        return self.run_id
+
+    def write(self, item: dict) -> int:
+        tbl = item['tbl']
+        if self.pq_writer is None:
+            self.pq_writer = write_partition_file(self.stage_path, tbl.schema)
+        self.pq_writer.write_table(tbl)
+        self.staged_rows += tbl.num_rows
+        self._seen(item)
+        return tbl.num_rows
+
+    def finish(self, ok: bool) -> None:
+        """PUT + DELETE/COPY en una transacción; si falla se hace rollback y se borra del stage."""
+        if self.pq_writer is None:
+            return
+        self.pq_writer.close(); self.pq_writer = None
+        t0 = time.time()
+        ref = self.stage_backend.put(self.stage_path, f'{self.service}/{self.year}/{self.month:02d}')
+        print(f"{self.tag} Stage PUT: {self.staged_rows} filas ({round(time.time()-t0,1)}s)")
+        cur = self.conn.cursor()
+        try:
+            # Replace atómico de la partición: DELETE + COPY en la misma transacción
+            cur.execute("begin")
+            self._delete(cur)
+            self.rows = self.stage_backend.copy_into(self.fq_table, ref, self.column_types)
+            cur.execute("commit")
+            print(f"{self.tag} COPY INTO {self.fq_table}: rows={self.rows} ({round(time.time()-t0,1)}s)")
+        except Exception:
+            try: cur.execute("rollback")
+            except Exception: pass
+            self.stage_backend.remove(ref)
+            raise
+        finally:
+            cur.close()
+
+    def close(self) -> None:
+        if self.pq_writer is not None:
+            try: self.pq_writer.close()
+            except Exception: pass
+            self.pq_writer = None
+        if self.stage_dir is not None:
+            shutil.rmtree(self.stage_dir, ignore_errors=True)
@@ -0,0 +1,138 @@
+"""
+Carga masiva "stage once": un Parquet normalizado por partición -> stage -> COPY INTO.
+
+`StageBackend` abstrae el par PUT/COPY para poder sustituir Snowflake por un
+backend local en pruebas:
+  - SnowflakeStageBackend: PUT a un stage interno + COPY INTO con mapeo de columnas.
+  - LocalStageBackend:     copia a un directorio; si recibe una conexión DuckDB
+                           inserta con read_parquet, si no deja el archivo en
+                           `<stage_dir>/_loaded/<tabla>/` (tabla "en disco").
+"""
+import os
+import shutil
+from typing import Dict
+
+import pyarrow.parquet as pq
+
+
+class StageBackend:
+    """Interfaz mínima del stage: subir un archivo y copiarlo a una tabla."""
+
+    def ensure(self) -> None:
+        """Prepara el stage (idempotente)."""
+
+    def put(self, local_path: str, prefix: str) -> str:
+        """Sube `local_path` bajo `prefix`; devuelve la referencia del archivo en el stage."""
+        raise NotImplementedError
+
+    def copy_into(self, fq_table: str, ref: str, column_types: Dict[str, str]) -> int:
+        """Carga el archivo `ref` en `fq_table` mapeando `column_types`; devuelve filas cargadas."""
+        raise NotImplementedError
+
+    def remove(self, ref: str) -> None:
+        """Borra el archivo del stage (no falla si ya no existe)."""
+        raise NotImplementedError
+
+
+# ===================== Snowflake =====================
+class SnowflakeStageBackend(StageBackend):
+    def __init__(self, conn, db: str, schema: str, stage: str = 'bronze_stage', put_parallel: int = 8):
+        self.conn = conn
+        self.stage = f'{db}.{schema}.{stage}'
+        self.put_parallel = int(put_parallel)
+
+    def ensure(self) -> None:
+        """Crea el stage interno si no existe (una vez por corrida)."""
+        cs = self.conn.cursor()
+        try:
+            cs.execute(f"create stage if not exists {self.stage} file_format = (type = parquet)")
+        finally:
+            cs.close()
+
+    def put(self, local_path: str, prefix: str) -> str:
+        path = os.path.abspath(local_path).replace('\\', '/')
+        cs = self.conn.cursor()
+        try:
+            cs.execute(
+                f"put 'file://{path}' @{self.stage}/{prefix} "
+                f"auto_compress = false overwrite = true parallel = {self.put_parallel}"
+            )
+        finally:
+            cs.close()
+        return f"{prefix}/{os.path.basename(path)}"
+
+    def copy_into(self, fq_table: str, ref: str, column_types: Dict[str, str]) -> int:
+        prefix, fname = ref.rsplit('/', 1)
+        cols = list(column_types)
+        select = ",\n  ".join(f'$1:"{c}"::{t}' for c, t in column_types.items())
+        sql = (
+            f"copy into {fq_table} ({', '.join(cols)})\n"
+            f"from (select\n  {select}\nfrom @{self.stage}/{prefix}/)\n"
+            f"files = ('{fname}')\n"
+            f"file_format = (type = parquet)\n"
+            f"on_error = abort_statement\n"
+            f"purge = true"
+        )
+        cs = self.conn.cursor()
+        try:
+            cs.execute(sql)
+            # Una fila por archivo: (file, status, rows_parsed, rows_loaded, ...)
+            return sum(int(r[3] or 0) for r in cs.fetchall() if len(r) > 3)
+        finally:
+            cs.close()
+
+    def remove(self, ref: str) -> None:
+        cs = self.conn.cursor()
+        try:
+            cs.execute(f"remove @{self.stage}/{ref}")
+        except Exception:
+            pass
+        finally:
+            cs.close()
+
+
+# ===================== Local (pruebas) =====================
+class LocalStageBackend(StageBackend):
+    def __init__(self, stage_dir: str, conn=None):
+        self.stage_dir = stage_dir
+        self.conn = conn  # conexión DuckDB opcional
+        os.makedirs(stage_dir, exist_ok=True)
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.stage_dir, *ref.split('/'))
+
+    def put(self, local_path: str, prefix: str) -> str:
+        ref = f"{prefix}/{os.path.basename(local_path)}"
+        dst = self._path(ref)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copyfile(local_path, dst + '.tmp')
+        os.replace(dst + '.tmp', dst)
+        return ref
+
+    def copy_into(self, fq_table: str, ref: str, column_types: Dict[str, str]) -> int:
+        src = self._path(ref)
+        if self.conn is not None:
+            cols = ', '.join(column_types)
+            # DuckDB devuelve el número de filas insertadas
+            loaded = self.conn.execute(
+                f"insert into {fq_table} ({cols}) select {cols} from read_parquet(?)", [src]
+            ).fetchone()[0]
+        else:
+            loaded = pq.ParquetFile(src).metadata.num_rows
+            table_dir = os.path.join(self.stage_dir, '_loaded', fq_table)
+            os.makedirs(table_dir, exist_ok=True)
+            shutil.copyfile(src, os.path.join(table_dir, ref.replace('/', '__')))
+        self.remove(ref)  # equivalente a purge = true
+        return int(loaded)
+
+    def remove(self, ref: str) -> None:
+        try:
+            os.remove(self._path(ref))
+        except OSError:
+            pass
+
+
+def write_partition_file(path: str, schema):
+    """Writer Parquet para el archivo único de la partición (snappy, timestamps en us)."""
+    return pq.ParquetWriter(path, schema, compression='snappy', coerce_timestamps='us',
+                            allow_truncated_timestamps=True)
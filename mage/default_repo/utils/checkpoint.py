@@ -0,0 +1,159 @@
+"""
+Checkpoints por batch para cargas reanudables de BRONZE (modo write_pandas).
+
+Cada batch subido con éxito deja una fila en `load_checkpoint` con
+(run_id, url, row_group, batch, row_offset, row_count, batch_size, ingest_ts).
+`ingest_ts` (con microsegundos) identifica el batch dentro de las filas del
+run_id, así que al reanudar un run caído se borran solo las filas de batches
+que no llegaron a registrarse y cada archivo se retoma desde la primera fila no
+confirmada (`resume_offset`), aunque el tamaño de batch haya cambiado.
+Una fila con row_group = -1 marca el archivo como completo.
+Los offsets dependen de la ventana de pickup_filter (las filas descartadas no
+se cuentan), así que cada fila guarda `pickup_window` y un run solo se reanuda
+con la misma ventana.
+Al terminar la partición sin errores se limpian sus checkpoints.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from default_repo.utils.arrow_normalize import ddl_column_types
+from default_repo.utils.schema_registry import get_registry
+
+CHECKPOINT_DDL = """
+create table if not exists {db}.{schema}.load_checkpoint (
+    service_type string,
+    year int,
+    month int,
+    run_id string,
+    url string,
+    row_group int,        -- -1 = archivo completo
+    batch int,
+    row_offset number,    -- offset global de la primera fila del batch dentro del archivo
+    row_count number,
+    batch_size number,
+    ingest_ts string,
+    committed_at timestamp_ntz,
+    pickup_window string  -- ventana de pickup_filter del run ('' = sin filtro)
+);
+"""
+
+FILE_DONE = -1
+
+
+class PartitionCheckpoint:
+    """Estado de checkpoint de una partición natural (service, year, month)."""
+
+    def __init__(self, conn, db: str, schema: str, service: str, year: int, month: int,
+                 pickup_window: str = ''):
+        self.conn = conn
+        self.fq = f"{db}.{schema}.load_checkpoint"
+        self.key = (service, int(year), int(month))
+        self.pickup_window = pickup_window
+        self.run_id: Optional[str] = None
+        self.committed = {}  # url -> [(row_offset, row_count)]
+        self.done_urls = set()
+        self.rows = 0  # filas ya confirmadas del run a reanudar
+        self.latest_ingest_ts: Optional[str] = None
+
+    # ---------- lectura ----------
+    def load(self) -> bool:
+        """
+        Carga el último run incompleto de la partición. True si hay algo que reanudar;
+        ValueError si ese run se escribió con otra ventana de pickup_filter.
+        """
+        cur = self.conn.cursor()
+        try:
+            cur.execute(
+                f"select run_id, url, row_group, row_offset, row_count, ingest_ts, pickup_window from {self.fq} "
+                "where service_type = %s and year = %s and month = %s order by committed_at",
+                self.key,
+            )
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+        if not rows:
+            return False
+        # si hubiera restos de varios runs, se reanuda el último
+        self.run_id = rows[-1][0]
+        run_window = rows[-1][6] or ''
+        if run_window != self.pickup_window:
+            raise ValueError(f"El run {self.run_id} se checkpointeó con pickup_filter [{run_window or 'sin filtro'}] "
+                             f"y esta corrida usa [{self.pickup_window or 'sin filtro'}]: reanudar con el mismo "
+                             f"filtro o con resume=False")
+        for run_id, url, rg, offset, n, ts, _ in rows:
+            if run_id != self.run_id:
+                continue
+            if rg == FILE_DONE:
+                self.done_urls.add(url)
+                continue
+            self.committed.setdefault(url, []).append((int(offset), int(n or 0)))
+            self.rows += int(n or 0)
+            if ts and (self.latest_ingest_ts is None or ts > self.latest_ingest_ts):
+                self.latest_ingest_ts = ts
+        return True
+
+    @property
+    def batches(self) -> int:
+        return sum(len(v) for v in self.committed.values())
+
+    def resume_offset(self, url: str) -> int:
+        """Primera fila del archivo no cubierta por batches confirmados contiguos desde 0."""
+        pos = 0
+        for offset, n in sorted(self.committed.get(url, [])):
+            if offset > pos:
+                break
+            pos = max(pos, offset + n)
+        return pos
+
+    # ---------- escritura ----------
+    def commit_batch(self, run_id: str, url: str, rg: int, b: int, row_offset: int, rows: int,
+                     batch_size: int, ingest_ts: Optional[str]) -> None:
+        cur = self.conn.cursor()
+        try:
+            cur.execute(
+                f"insert into {self.fq} (service_type, year, month, run_id, url, row_group, batch, "
+                "row_offset, row_count, batch_size, ingest_ts, committed_at, pickup_window) "
+                "values (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (*self.key, run_id, url, int(rg), int(b), int(row_offset), int(rows), int(batch_size),
+                 ingest_ts, datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f'), self.pickup_window),
+            )
+        finally:
+            cur.close()
+
+    def commit_file(self, run_id: str, url: str) -> None:
+        self.commit_batch(run_id, url, FILE_DONE, 0, 0, 0, 0, None)
+
+    def purge_uncommitted(self, fq_table: str) -> int:
+        """
+        Borra de la partición todo lo que no sea un batch registrado del run a
+        reanudar (batches a medio subir del crash y restos de otros runs).
+        """
+        service, year, month = self.key
+        cur = self.conn.cursor()
+        try:
+            cur.execute(
+                f"delete from {fq_table} where year = %s and month = %s and service_type = %s "
+                f"and (run_id <> %s or run_id is null or ingest_ts not in ("
+                f"  select ingest_ts from {self.fq} where run_id = %s and ingest_ts is not null))",
+                (year, month, service, self.run_id, self.run_id),
+            )
+            return cur.rowcount or 0
+        finally:
+            cur.close()
+
+    def clear(self) -> None:
+        cur = self.conn.cursor()
+        try:
+            cur.execute(f"delete from {self.fq} where service_type = %s and year = %s and month = %s", self.key)
+        finally:
+            cur.close()
+
+
+def ensure_checkpoint(conn, db: str, schema: str, registry=None) -> None:
+    # vía registro de esquemas: tablas creadas antes de pickup_window reciben la columna
+    (registry or get_registry(db, schema)).ensure(conn, 'load_checkpoint', ddl_column_types(CHECKPOINT_DDL))
+
+
+def window_key(window) -> str:
+    """Ventana (lo, hi) de pickup_window como texto para el checkpoint; '' sin filtro."""
+    return '' if window is None else f"{window[0].isoformat()}/{window[1].isoformat()}"
@@ -0,0 +1,116 @@
+"""
+Construcción vectorizada de frames de cobertura (malla de particiones, URLs, estados).
+
+Reemplaza los loops anidados y los `apply(axis=1)` de generate_months,
+sync_coverage_to_audit_py y update_coverage:
+- `grid(services, start, end, freq)`: producto servicios x períodos con
+  `pd.date_range` + `np.repeat`/`np.tile`. `freq='MS'` es la malla mensual de
+  siempre; con 'D', 'h' o 'min' se agregan `day`/`hour`/`minute` y `period_start`.
+- `build_urls`: URL del Parquet de TLC (`<service>_tripdata_YYYY-MM.parquet`)
+  con operaciones de strings por columna; sirve para cualquier servicio
+  (yellow, green, fhv, fhvhv). Con `base_url` local (un directorio) las "URLs"
+  son rutas en disco; `local_path` las distingue de las HTTP(S).
+- `audit_status`, `http_status`, `load_status`: estados con `np.select`.
+"""
+import os
+from typing import Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+BASE_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data"
+KEY_COLUMNS = ['service_type', 'year', 'month']
+
+_FINE_FIELDS = {  # freq -> columnas extra además de year/month
+    'MS': [],
+    'D': ['day'],
+    'h': ['day', 'hour'],
+    'min': ['day', 'hour', 'minute'],
+}
+
+
+def grid(services: Sequence[str], start: Union[str, pd.Timestamp] = '2015-01',
+         end: Union[str, pd.Timestamp] = '2025-12', freq: str = 'MS') -> pd.DataFrame:
+    """
+    Malla servicios x períodos entre `start` y `end` (inclusive), ordenada por servicio.
+    Con freq='MS' `end` incluye su mes completo; con el resto es el último instante
+    (p.ej. '2024-12-31 23:59'). Con freq='MS' devuelve ['service_type','year','month']; con frecuencias más
+    finas agrega las columnas de `_FINE_FIELDS[freq]` y `period_start`.
+    """
+    if freq not in _FINE_FIELDS:
+        raise ValueError(f"freq inválida: {freq} (usar {', '.join(_FINE_FIELDS)})")
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end)
+    if freq == 'MS':
+        end = end + pd.offsets.MonthEnd(0)  # '2025-12' incluye diciembre
+    periods = pd.date_range(start, end, freq=freq)
+    services = [str(s) for s in services]
+    n = len(periods)
+
+    out = {'service_type': np.repeat(np.asarray(services, dtype=object), n)}
+    out['year'] = np.tile(periods.year.to_numpy(dtype=np.int64), len(services))
+    out['month'] = np.tile(periods.month.to_numpy(dtype=np.int64), len(services))
+    for field in _FINE_FIELDS[freq]:
+        out[field] = np.tile(getattr(periods, field).to_numpy(dtype=np.int64), len(services))
+    if freq != 'MS':
+        out['period_start'] = np.tile(periods.to_numpy(), len(services))
+    return pd.DataFrame(out)
+
+
+def year_grid(services: Sequence[str], years_from: int, years_to: int) -> pd.DataFrame:
+    """Malla mensual completa de `years_from` a `years_to` (atajo de `grid`)."""
+    return grid(services, f'{int(years_from)}-01', f'{int(years_to)}-12')
+
+
+def build_urls(service: Iterable, year: Iterable, month: Iterable, base_url: str = BASE_URL) -> pd.Series:
+    """URLs `<base_url>/<service>_tripdata_YYYY-MM.parquet` en bloque."""
+    service = pd.Series(service, dtype=object).reset_index(drop=True).astype(str)
+    year = pd.Series(year).reset_index(drop=True).astype(np.int64).astype(str)
+    month = pd.Series(month).reset_index(drop=True).astype(np.int64).astype(str).str.zfill(2)
+    return f"{base_url}/" + service + "_tripdata_" + year + "-" + month + ".parquet"
+
+
+def fill_urls(urls: Optional[Iterable], service, year, month, base_url: str = BASE_URL) -> pd.Series:
+    """Usa `urls` donde vienen informadas y construye el resto."""
+    built = build_urls(service, year, month, base_url)
+    if urls is None:
+        return built
+    urls = pd.Series(urls, dtype=object).reset_index(drop=True)
+    known = urls.notna() & (urls.astype(str) != '')
+    return urls.where(known, built)
+
+
+def local_path(url: str) -> Optional[str]:
+    """Ruta en disco de `url` si es local (`file://...` o una ruta); None si es HTTP(S)."""
+    url = str(url)
+    if url.startswith('file://'):
+        return url[len('file://'):]
+    if '://' in url:
+        return None
+    return os.path.abspath(url)
+
+
+def audit_status(row_count, ledger_status=None) -> np.ndarray:
+    """OK si hay filas, MISSING si no; ERROR si el ledger registró un error."""
+    rows = pd.Series(row_count).fillna(0).to_numpy()
+    status = np.where(rows > 0, 'OK', 'MISSING').astype(object)
+    if ledger_status is not None:
+        status[pd.Series(ledger_status).to_numpy() == 'ERROR'] = 'ERROR'
+    return status
+
+
+def http_status(has_parquet) -> pd.Series:
+    """200 donde hay Parquet, nulo donde no (Int64)."""
+    has = pd.Series(has_parquet).fillna(False).astype(bool)
+    return pd.Series(np.where(has, 200, 0), index=has.index, dtype='Int64').where(has)
+
+
+def load_status(has_parquet, row_count, notes=None) -> np.ndarray:
+    """error (notes 'error...') > missing (sin Parquet) > ok (con filas) > pending."""
+    has = pd.Series(has_parquet).fillna(False).astype(bool).to_numpy()
+    rows = pd.Series(row_count).fillna(0).to_numpy()
+    if notes is None:
+        err = np.zeros(len(has), dtype=bool)
+    else:
+        err = pd.Series(notes, dtype=object).astype('string').str.startswith('error').fillna(False).to_numpy(dtype=bool)
+    return np.select([err, ~has, rows > 0], ['error', 'missing', 'ok'], default='pending').astype(object)
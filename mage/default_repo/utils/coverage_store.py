@@ -0,0 +1,186 @@
+"""
+Store de cobertura (SQLite) compartido por build_coverage_matrix, update_coverage
+y sync_coverage_to_audit_py.
+
+Reemplaza el read-modify-write de `coverage_matrix.csv` (leer todo, `update` /
+`concat` / `drop_duplicates` en pandas y reescribir):
+  - Tabla `coverage` con clave primaria (service_type, year, month) y columnas
+    tipadas; cada bloque hace upsert solo de las columnas que conoce
+    (`insert ... on conflict do update set <esas columnas>`), así que lo que
+    escribió otro bloque para la misma partición se conserva.
+  - Concurrencia: cada upsert es una transacción `begin immediate` (lock de
+    escritura del archivo SQLite, WAL para lectores) con `timeout` de espera;
+    dos bloques corriendo a la vez se serializan en vez de pisarse.
+  - `export_csv()` vuelca la tabla completa a `coverage_matrix.csv` con
+    escritura atómica (tmp + os.replace), para documentación / evidencia.
+Rutas por defecto: `<repo>/coverage_store.sqlite` y `<repo>/coverage_matrix.csv`.
+"""
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+import pandas as pd
+
+# columna -> (tipo SQLite, dtype pandas)
+COLUMNS = {
+    'service_type':   ('text not null', 'string'),
+    'year':           ('integer not null', 'int64'),
+    'month':          ('integer not null', 'int64'),
+    'url':            ('text', 'string'),
+    'has_parquet':    ('integer', 'boolean'),
+    'http_status':    ('integer', 'Int64'),
+    'content_length': ('integer', 'Int64'),
+    'etag':           ('text', 'string'),
+    'last_modified':  ('text', 'string'),
+    'checked_at':     ('text', 'string'),
+    'row_count':      ('integer', 'Int64'),
+    'load_status':    ('text', 'string'),
+    'notes':          ('text', 'string'),
+    'updated_at':     ('text', 'string'),
+}
+KEY_COLUMNS = ['service_type', 'year', 'month']
+
+_DDL = (
+    "create table if not exists coverage (\n    "
+    + ",\n    ".join(f"{c} {t}" for c, (t, _) in COLUMNS.items())
+    + ",\n    primary key (service_type, year, month)\n)"
+)
+
+
+def _repo_path() -> str:
+    try:
+        from mage_ai.settings.repo import get_repo_path
+        return get_repo_path()
+    except Exception:
+        return os.getcwd()
+
+
+def default_store_path() -> str:
+    return os.path.join(_repo_path(), 'coverage_store.sqlite')
+
+
+def default_csv_path() -> str:
+    return os.path.join(_repo_path(), 'coverage_matrix.csv')
+
+
+def _py(v):
+    # sqlite3 no bindea escalares numpy ni pd.NA
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.strftime('%Y-%m-%d %H:%M:%S')
+    if hasattr(v, 'item'):
+        return v.item()
+    return v
+
+
+class CoverageStore:
+    def __init__(self, path: Optional[str] = None, timeout: float = 60):
+        self.path = path or default_store_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # isolation_level=None: las transacciones se abren explícitamente (begin immediate)
+        self._db = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute('pragma journal_mode=wal')
+        self._db.execute(_DDL)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- escritura ----------
+    def upsert(self, df: pd.DataFrame) -> int:
+        """Upsert por clave de las columnas de `df` que son del store. Devuelve filas escritas."""
+        missing = [k for k in KEY_COLUMNS if k not in df.columns]
+        if missing:
+            raise ValueError(f"Faltan columnas clave: {missing}")
+        cols = [c for c in COLUMNS if c in df.columns]
+        if df.empty:
+            return 0
+        updates = [c for c in cols if c not in KEY_COLUMNS]
+        on_conflict = ("do update set " + ", ".join(f"{c}=excluded.{c}" for c in updates)) if updates else "do nothing"
+        sql = (f"insert into coverage ({', '.join(cols)}) values ({', '.join('?' * len(cols))}) "
+               f"on conflict(service_type, year, month) {on_conflict}")
+        frame = df[cols].copy()
+        frame['service_type'] = frame['service_type'].astype(str)
+        if 'has_parquet' in frame.columns:
+            frame['has_parquet'] = frame['has_parquet'].astype('boolean').astype('Int64')
+        rows = [tuple(_py(v) for v in row) for row in frame.itertuples(index=False, name=None)]
+        with self._lock:
+            self._db.execute('begin immediate')
+            try:
+                self._db.executemany(sql, rows)
+                self._db.execute('commit')
+            except Exception:
+                self._db.execute('rollback')
+                raise
+        return len(rows)
+
+    # ---------- lectura ----------
+    def read(self, services: Optional[Iterable[str]] = None, years: Optional[Iterable[int]] = None) -> pd.DataFrame:
+        where, params = [], []
+        if services:
+            services = list(services)
+            where.append(f"service_type in ({', '.join('?' * len(services))})")
+            params += services
+        if years:
+            years = [int(y) for y in years]
+            where.append("year between ? and ?")
+            params += [min(years), max(years)]
+        sql = f"select {', '.join(COLUMNS)} from coverage"
+        if where:
+            sql += " where " + " and ".join(where)
+        with self._lock:
+            rows = self._db.execute(sql + " order by service_type, year, month", params).fetchall()
+        df = pd.DataFrame(rows, columns=list(COLUMNS))
+        return df.astype({c: dtype for c, (_, dtype) in COLUMNS.items()})
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._db.execute("select 1 from coverage limit 1").fetchone() is None
+
+    def seed_from_csv(self, path: str) -> int:
+        """Importa un coverage_matrix.csv previo (solo las columnas que existen en el store)."""
+        df = pd.read_csv(path)
+        if df.empty:
+            return 0
+        df['year'] = df['year'].astype(int)
+        df['month'] = df['month'].astype(int)
+        return self.upsert(df)
+
+    def export_csv(self, path: Optional[str] = None, columns: Optional[Iterable[str]] = None) -> str:
+        """Vuelca la tabla completa a CSV con escritura atómica."""
+        path = path or default_csv_path()
+        df = self.read()
+        if columns:
+            df = df[list(columns)]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+        return path
+
+
+def open_store(kwargs: Optional[dict] = None) -> CoverageStore:
+    """
+    Store a partir de los kwargs de un bloque: coverage_store_path (default
+    <repo>/coverage_store.sqlite). Si el store está vacío y existe un
+    coverage_matrix.csv previo, se importa una vez.
+    """
+    kwargs = kwargs or {}
+    store = CoverageStore(kwargs.get('coverage_store_path'))
+    csv_path = kwargs.get('coverage_csv_path') or default_csv_path()
+    if store.is_empty() and os.path.exists(csv_path):
+        try:
+            n = store.seed_from_csv(csv_path)
+            print(f"[coverage_store] {n} filas importadas de {csv_path}")
+        except Exception as e:
+            print(f"[coverage_store][warning] No pude importar {csv_path}: {e}")
+    return store
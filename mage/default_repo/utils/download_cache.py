@@ -0,0 +1,218 @@
+"""
+Cache local de Parquet descargados (content-addressed, con LRU acotado por tamaño).
+
+- Clave lógica: URL + ETag + tamaño (si cambia el archivo remoto, cambia la clave).
+- Almacenamiento por contenido: `objects/<sha[:2]>/<sha256>.parquet`; dos claves
+  con el mismo contenido comparten archivo.
+- Escritura atómica (tmp + os.replace) y sha256 calculado al escribir; en cada hit
+  se verifica tamaño y, con `verify_checksum=True`, el sha256.
+- Eviction LRU por `accessed_at` hasta `max_bytes`; los archivos en uso
+  (acquire/release) no se borran.
+- Métricas: hits, misses, bytes descargados/servidos, evictions, fallos de verificación.
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+_DDL = """
+create table if not exists entries (
+    key         text primary key,
+    url         text,
+    etag        text,
+    size        integer,
+    sha256      text,
+    created_at  real,
+    accessed_at real,
+    hits        integer default 0
+)
+"""
+
+
+def default_cache_dir() -> str:
+    try:
+        from mage_ai.settings.repo import get_repo_path
+        base = get_repo_path()
+    except Exception:
+        base = os.getcwd()
+    return os.path.join(base, '.cache', 'parquet')
+
+
+def _sha256(path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _key(url: str, etag: Optional[str], size: Optional[int]) -> str:
+    return hashlib.sha256(f"{url}|{etag or ''}|{size or ''}".encode()).hexdigest()
+
+
+class DownloadCache:
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 10 * 1024 ** 3,
+                 verify_checksum: bool = True):
+        self.root = root or default_cache_dir()
+        self.max_bytes = int(max_bytes)
+        self.verify_checksum = bool(verify_checksum)
+        os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(self.root, 'tmp'), exist_ok=True)
+        self._purge_stale_tmp()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._in_use: Dict[str, int] = {}  # sha256 -> referencias abiertas
+        self._db = sqlite3.connect(os.path.join(self.root, 'index.sqlite'), timeout=30, check_same_thread=False)
+        self._db.execute('pragma journal_mode=wal')
+        self._db.execute(_DDL)
+        self._db.commit()
+        self.metrics = {'hits': 0, 'misses': 0, 'bytes_downloaded': 0, 'bytes_served': 0,
+                        'evictions': 0, 'verify_failures': 0}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ---------- helpers ----------
+    def _purge_stale_tmp(self, max_age_s: float = 7 * 24 * 3600) -> None:
+        tmp_dir = os.path.join(self.root, 'tmp')
+        for name in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, name)
+            try:
+                if time.time() - os.path.getmtime(path) > max_age_s:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _object_path(self, sha: str) -> str:
+        return os.path.join(self.root, 'objects', sha[:2], f'{sha}.parquet')
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.metrics[name] += n
+
+    def _lookup(self, key: str):
+        with self._lock:
+            return self._db.execute('select sha256, size from entries where key = ?', (key,)).fetchone()
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            self._db.execute('delete from entries where key = ?', (key,))
+            self._db.commit()
+
+    # ---------- API ----------
+    def acquire(self, url: str, fetch: Callable[[str], None], etag: Optional[str] = None,
+                size: Optional[int] = None) -> str:
+        """
+        Devuelve la ruta local del archivo, descargándolo con `fetch(dest_path)`
+        si no está (o no pasa la verificación). El archivo queda "en uso" hasta
+        `release(path)`.
+        """
+        key = _key(url, etag, size)
+        with self._key_lock(key):
+            row = self._lookup(key)
+            if row is not None:
+                sha, stored_size = row
+                path = self._object_path(sha)
+                ok = os.path.exists(path) and os.path.getsize(path) == stored_size
+                if ok and self.verify_checksum:
+                    ok = _sha256(path) == sha
+                if ok:
+                    with self._lock:
+                        self._in_use[sha] = self._in_use.get(sha, 0) + 1
+                        self._db.execute('update entries set accessed_at = ?, hits = hits + 1 where key = ?',
+                                         (time.time(), key))
+                        self._db.commit()
+                        self.metrics['hits'] += 1
+                        self.metrics['bytes_served'] += stored_size
+                    return path
+                self._count('verify_failures')
+                self._forget(key)
+
+            self._count('misses')
+            # nombre estable: si `fetch` deja un parcial reanudable, el próximo intento lo retoma
+            tmp = os.path.join(self.root, 'tmp', f'{key}.download')
+            try:
+                fetch(tmp)
+                got = os.path.getsize(tmp)
+                if size is not None and int(size) > 0 and got != int(size):
+                    raise IOError(f"tamaño descargado {got} != esperado {size}")
+                sha = _sha256(tmp)
+                path = self._object_path(sha)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp, path)
+            finally:
+                try: os.remove(tmp)
+                except OSError: pass
+            now = time.time()
+            with self._lock:
+                self._in_use[sha] = self._in_use.get(sha, 0) + 1
+                self._db.execute(
+                    'insert into entries (key, url, etag, size, sha256, created_at, accessed_at, hits) '
+                    'values (?, ?, ?, ?, ?, ?, ?, 0) on conflict(key) do update set '
+                    'sha256=excluded.sha256, size=excluded.size, accessed_at=excluded.accessed_at',
+                    (key, url, etag, got, sha, now, now),
+                )
+                self._db.commit()
+                self.metrics['bytes_downloaded'] += got
+                self.metrics['bytes_served'] += got
+        self.evict()
+        return path
+
+    def release(self, path: str) -> None:
+        sha = os.path.basename(path).split('.')[0]
+        with self._lock:
+            n = self._in_use.get(sha, 0) - 1
+            if n > 0:
+                self._in_use[sha] = n
+            else:
+                self._in_use.pop(sha, None)
+        # lo que no se pudo desalojar por estar en uso se desaloja al liberarlo
+        self.evict()
+
+    def evict(self) -> int:
+        """LRU: borra objetos (no en uso) hasta quedar bajo `max_bytes`."""
+        removed = 0
+        with self._lock:
+            objs = self._db.execute(
+                'select sha256, max(size), max(accessed_at) from entries group by sha256 order by 3 asc'
+            ).fetchall()
+            total = sum(o[1] or 0 for o in objs)
+            for sha, size, _ in objs:
+                if total <= self.max_bytes:
+                    break
+                if self._in_use.get(sha):
+                    continue
+                try: os.remove(self._object_path(sha))
+                except OSError: pass
+                self._db.execute('delete from entries where sha256 = ?', (sha,))
+                total -= size or 0
+                removed += 1
+            self._db.commit()
+            self.metrics['evictions'] += removed
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute('delete from entries')
+            self._db.commit()
+        shutil.rmtree(os.path.join(self.root, 'objects'), ignore_errors=True)
+        os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.metrics)
+            n, used = self._db.execute(
+                'select count(*), coalesce(sum(s), 0) from (select max(size) s from entries group by sha256)'
+            ).fetchone()
+        lookups = out['hits'] + out['misses']
+        out.update({'objects': n, 'bytes_cached': used,
+                    'hit_ratio': round(out['hits'] / lookups, 3) if lookups else None})
+        return out
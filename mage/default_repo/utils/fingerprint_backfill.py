@@ -0,0 +1,95 @@
+"""
+Backfill de `trip_fp` en BRONZE para las filas cargadas antes de que
+copy_into_bronze calculara la huella (columna null).
+
+La huella sale de la misma función que la carga (utils/trip_fingerprint) sobre
+los valores guardados, que ya tienen los tipos de la DDL: una recarga posterior
+de la partición produce los mismos bytes y fct_trips deduplica ambas copias
+juntas. Por partición (service_type, year, month) con huellas nulas:
+  1. select distinct de las key_cols de las filas sin huella
+  2. huella en numpy + write_pandas a `<tabla>__fp_stage` (temporal)
+  3. update ... from stage con igualdad null-safe sobre las key_cols, en una transacción
+"""
+from typing import List, Tuple
+
+import pandas as pd
+import pyarrow as pa
+from snowflake.connector.pandas_tools import write_pandas
+
+from default_repo.utils.arrow_normalize import ARROW_TYPES
+from default_repo.utils.trip_fingerprint import FINGERPRINT_COL, trip_fingerprint
+from default_repo.utils.trip_services import get_service, resolve_services
+
+
+def partitions_missing_fp(conn, db: str, schema: str, service: str) -> List[Tuple[int, int]]:
+    """(year, month) de `service` con al menos una fila sin huella."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"select distinct year, month from {db}.{schema}.{get_service(service).table} "
+                    f"where {FINGERPRINT_COL} is null and service_type = %s order by 1, 2", (service,))
+        return [(int(y), int(m)) for y, m in cur.fetchall()]
+    finally:
+        cur.close()
+
+
+def _missing_fp(alias: str = '') -> str:
+    """Filas sin huella de una partición (parámetros: service_type, year, month)."""
+    return (f"{alias}{FINGERPRINT_COL} is null and {alias}service_type = %s "
+            f"and {alias}year = %s and {alias}month = %s")
+
+
+def _fingerprints(keys: pd.DataFrame, service: str) -> pd.Series:
+    svc = get_service(service)
+    columns = {c: pa.array(keys[c], from_pandas=True).cast(ARROW_TYPES[svc.column_types[c]], safe=False)
+               for c in svc.key_cols}
+    return pd.Series(trip_fingerprint(columns, svc.key_cols, service).to_pylist(), index=keys.index)
+
+
+def backfill_partition(conn, db: str, schema: str, service: str, year: int, month: int,
+                       writer=write_pandas) -> int:
+    """Completa `trip_fp` de una partición; devuelve las filas actualizadas."""
+    svc = get_service(service)
+    fq_table = f'{db}.{schema}.{svc.table}'
+    stage = f'{svc.table}__fp_stage'
+    fq_stage = f'{db}.{schema}.{stage}'
+    params = (service, int(year), int(month))
+    cur = conn.cursor()
+    try:
+        cur.execute(f"select distinct {', '.join(svc.key_cols)} from {fq_table} where {_missing_fp()}", params)
+        keys = cur.fetch_pandas_all()
+        keys.columns = [str(c).lower() for c in keys.columns]
+        if keys.empty:
+            return 0
+        keys[FINGERPRINT_COL] = _fingerprints(keys, service)
+        types = {c: svc.column_types[c] for c in [*svc.key_cols, FINGERPRINT_COL]}
+        cur.execute(f"create or replace temporary table {fq_stage} ("
+                    + ', '.join(f'{c} {t}' for c, t in types.items()) + ")")
+        writer(conn, keys[list(types)], table_name=stage, database=db, schema=schema,
+               quote_identifiers=False, chunk_size=100_000)
+        on = ' and '.join(f't.{c} is not distinct from s.{c}' for c in svc.key_cols)
+        cur.execute("begin")
+        try:
+            cur.execute(f"update {fq_table} t set {FINGERPRINT_COL} = s.{FINGERPRINT_COL} from {fq_stage} s "
+                        f"where {_missing_fp('t.')} and {on}", params)
+            updated = cur.rowcount
+            cur.execute("commit")
+        except Exception:
+            try: cur.execute("rollback")
+            except Exception: pass
+            raise
+        return updated
+    finally:
+        try: cur.execute(f"drop table if exists {fq_stage}")
+        except Exception: pass
+        cur.close()
+
+
+def backfill_fingerprints(conn, db: str, schema: str, services=None, writer=write_pandas) -> pd.DataFrame:
+    """Backfill de todas las particiones con huellas nulas; resumen por partición."""
+    rows = []
+    for service in resolve_services(services):
+        for year, month in partitions_missing_fp(conn, db, schema, service):
+            n = backfill_partition(conn, db, schema, service, year, month, writer=writer)
+            print(f"[trip_fp] {service} {year}-{month:02d}: {n} filas")
+            rows.append({'service_type': service, 'year': year, 'month': month, 'rows': n})
+    return pd.DataFrame(rows, columns=['service_type', 'year', 'month', 'rows'])
@@ -0,0 +1,132 @@
+"""
+Archivo HTTP de solo lectura y con seek, respaldado por Range requests.
+
+Permite abrir un Parquet remoto con `pq.ParquetFile(HttpRangeFile(url))` sin
+copiarlo a disco: pyarrow lee el footer (pocas lecturas pequeñas al final del
+archivo) y luego solo los column chunks de cada row group que se pida.
+- Lecturas chicas (footer, índices) se sirven desde bloques alineados de
+  `block_size` que se cachean (LRU de `max_blocks`).
+- Lecturas grandes (column chunks) van directo con un Range exacto.
+- Cada Range reintenta con backoff; `stats` cuenta requests y bytes traídos.
+"""
+import io
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import requests
+
+from default_repo.utils.http_probe import _backoff, make_session
+
+
+class HttpRangeFile(io.RawIOBase):
+    def __init__(self, url: str, session: Optional[requests.Session] = None, size: Optional[int] = None,
+                 block_size: int = 1024 * 1024, max_blocks: int = 8, timeout=(8, 90),
+                 max_attempts: int = 4, base_sleep: float = 0.5):
+        super().__init__()
+        self.url = url
+        self._own_session = session is None
+        self.session = session or make_session(4)
+        self.block_size = int(block_size)
+        self.max_blocks = int(max_blocks)
+        self.timeout = timeout
+        self.max_attempts = int(max_attempts)
+        self.base_sleep = float(base_sleep)
+        self._blocks: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._pos = 0
+        self.stats = {'requests': 0, 'bytes_fetched': 0}
+        if size is None:
+            r = self.session.head(url, allow_redirects=True, timeout=timeout)
+            r.raise_for_status()
+            if r.headers.get('Accept-Ranges', '').lower() != 'bytes':
+                raise IOError(f"{url} no acepta Range requests")
+            size = int(r.headers['Content-Length'])
+        self.size = int(size)
+
+    # ---------- io.RawIOBase ----------
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"whence inválido: {whence}")
+        if pos < 0:
+            raise ValueError("seek antes del inicio del archivo")
+        self._pos = pos
+        return pos
+
+    def readinto(self, b) -> int:
+        n = min(len(b), max(0, self.size - self._pos))
+        if n == 0:
+            return 0
+        data = self._read(self._pos, n)
+        b[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def readall(self) -> bytes:
+        return self.read(self.size - self._pos)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._blocks.clear()
+            if self._own_session:
+                self.session.close()
+        super().close()
+
+    # ---------- lectura por rangos ----------
+    def _get_range(self, start: int, end: int) -> bytes:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                r = self.session.get(self.url, headers={'Range': f'bytes={start}-{end}'}, timeout=self.timeout)
+                if r.status_code != 206:
+                    raise IOError(f"status {r.status_code} a un Range request")
+                data = r.content
+                if len(data) != end - start + 1:
+                    raise IOError(f"Range incompleto: {len(data)} de {end - start + 1} bytes")
+                self.stats['requests'] += 1
+                self.stats['bytes_fetched'] += len(data)
+                return data
+            except Exception:
+                if attempt >= self.max_attempts:
+                    raise
+                time.sleep(_backoff(attempt, self.base_sleep))
+
+    def _block(self, idx: int) -> bytes:
+        if idx in self._blocks:
+            self._blocks.move_to_end(idx)
+            return self._blocks[idx]
+        start = idx * self.block_size
+        data = self._get_range(start, min(self.size, start + self.block_size) - 1)
+        self._blocks[idx] = data
+        if len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return data
+
+    def _read(self, start: int, n: int) -> bytes:
+        if n >= self.block_size:
+            return self._get_range(start, start + n - 1)
+        out = bytearray()
+        pos = start
+        while len(out) < n:
+            idx, off = divmod(pos, self.block_size)
+            chunk = self._block(idx)[off:off + n - len(out)]
+            if not chunk:
+                break
+            out += chunk
+            pos += len(chunk)
+        return bytes(out)
@@ -0,0 +1,241 @@
+"""
+Verificación concurrente de disponibilidad de archivos (HEAD) para la CDN de TLC.
+
+- Una `requests.Session` compartida con pool de conexiones (keep-alive).
+- Concurrencia limitada con un ThreadPoolExecutor (`max_concurrency`).
+- Rate limit global con token bucket (`rate_per_s`, ráfaga `burst`); cada intento
+  (incluidos los reintentos) consume un token.
+- Mismos reintentos/backoff que `_check_parquet_with_retries`: reintenta 403,
+  5xx y errores transitorios con backoff exponencial + jitter. Con
+  `retry_forbidden=False` un 403 es definitivo (HEAD simple de fetch_and_stage_parquet).
+- Opcionalmente lee/escribe un `ProbeCache` (ETag/Last-Modified/Content-Length)
+  y revalida con HEAD condicional en vez de repetir todo desde cero.
+`probe_urls` devuelve tuplas (has_parquet, http_status, content_length, notes)
+y `probe_urls_detailed` dicts con validadores, en el orden de entrada.
+Las URLs locales (rutas o file://, p.ej. un directorio de Parquet para el warehouse
+DuckDB) se resuelven con `os.stat`, sin red ni cache: ETag = tamaño + mtime.
+"""
+import os
+import random
+import threading
+import time
+from email.utils import formatdate
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from default_repo.utils.coverage_frame import local_path
+
+DEFAULT_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/116.0 Safari/537.36'
+    )
+}
+
+ProbeResult = Tuple[bool, Optional[int], Optional[int], Optional[str]]
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` tokens/s, capacidad `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size: int = 16) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def _backoff(attempt: int, base_sleep: float) -> float:
+    return base_sleep * (2 ** (attempt - 1)) + random.random() * 0.5
+
+
+def _result(has_parquet, status, content_length, notes, headers=None) -> dict:
+    headers = headers or {}
+    return {
+        'has_parquet': bool(has_parquet), 'http_status': status, 'content_length': content_length,
+        'notes': notes, 'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified'),
+    }
+
+
+def probe_url_detailed(session: requests.Session, url: str, max_attempts: int = 3, timeout=(4, 15),
+                       base_sleep: float = 0.5, bucket: Optional[TokenBucket] = None,
+                       cached: Optional[dict] = None, retry_forbidden: bool = True) -> dict:
+    """
+    HEAD con reintentos/backoff. Devuelve dict con has_parquet, http_status,
+    content_length, notes, etag, last_modified y source ('network'|'revalidated').
+    Si `cached` trae validadores se hace un HEAD condicional; un 304 reutiliza
+    la entrada cacheada.
+    """
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    attempt = 0
+    while attempt < max_attempts:
+        attempt += 1
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            r = session.head(url, allow_redirects=True, timeout=timeout, headers=headers)
+            status = r.status_code
+            if status == 304 and cached:
+                out = {k: cached.get(k) for k in ('http_status', 'content_length', 'notes', 'etag', 'last_modified')}
+                out['has_parquet'] = bool(cached.get('has_parquet'))
+                out['source'] = 'revalidated'
+                return out
+
+            content_length = None
+            if 'Content-Length' in r.headers:
+                try:
+                    content_length = int(r.headers.get('Content-Length') or 0)
+                except Exception:
+                    content_length = None
+
+            if status == 200 and (content_length is None or content_length > 0):
+                return {**_result(True, status, content_length, None, r.headers), 'source': 'network'}
+
+            if status in (403, 404):
+                notes = 'missing' if status == 404 else 'forbidden'
+                if status == 403 and retry_forbidden and attempt < max_attempts:
+                    time.sleep(_backoff(attempt, base_sleep))
+                    continue
+                return {**_result(False, status, content_length, notes), 'source': 'network'}
+
+            # 5xx u otros
+            notes = f'unexpected_status_{status}'
+            if 500 <= status < 600 and attempt < max_attempts:
+                time.sleep(_backoff(attempt, base_sleep))
+                continue
+            return {**_result(False, status, content_length, notes), 'source': 'network'}
+
+        except Exception as e:
+            if attempt < max_attempts:
+                time.sleep(_backoff(attempt, base_sleep))
+                continue
+            return {**_result(False, None, None, f'error:{type(e).__name__}'), 'source': 'network'}
+    return {**_result(False, None, None, 'error:max_attempts'), 'source': 'network'}
+
+
+def probe_url(session: requests.Session, url: str, max_attempts: int = 3, timeout=(4, 15),
+              base_sleep: float = 0.5, bucket: Optional[TokenBucket] = None) -> ProbeResult:
+    """HEAD con reintentos/backoff. Devuelve (has_parquet, status, content_length, notes)."""
+    r = probe_url_detailed(session, url, max_attempts=max_attempts, timeout=timeout,
+                           base_sleep=base_sleep, bucket=bucket)
+    return r['has_parquet'], r['http_status'], r['content_length'], r['notes']
+
+
+def probe_local(path: str) -> dict:
+    """Equivalente a un HEAD para un archivo en disco (200 si existe, 404 si no)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {**_result(False, 404, None, 'not_found'), 'source': 'local'}
+    headers = {'ETag': f'"{st.st_size:x}-{st.st_mtime_ns:x}"', 'Last-Modified': formatdate(st.st_mtime, usegmt=True)}
+    return {**_result(True, 200, st.st_size, None, headers), 'source': 'local'}
+
+
+def probe_urls_detailed(urls: Iterable[str], max_concurrency: int = 16, rate_per_s: float = 20.0,
+                        burst: Optional[int] = None, max_attempts: int = 3, timeout=(4, 15),
+                        base_sleep: float = 0.5, session: Optional[requests.Session] = None,
+                        cache=None, force_refresh: bool = False, retry_forbidden: bool = True) -> List[dict]:
+    """
+    Como `probe_urls` pero devuelve dicts con validadores. Con `cache` (ProbeCache)
+    las entradas frescas no generan request, las vencidas se revalidan con HEAD
+    condicional y los resultados exitosos se persisten al final.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    cached = cache.get_many(urls) if cache is not None else {}
+    now = time.time()
+    results: List[Optional[dict]] = [None] * len(urls)
+    pending = []  # (idx, url, entrada para revalidar o None)
+    for i, url in enumerate(urls):
+        path = local_path(url)
+        if path is not None:
+            results[i] = probe_local(path)
+            continue
+        entry = cached.get(url)
+        decision = 'miss' if (cache is None or force_refresh) else cache.decide(entry, now)
+        if decision == 'fresh':
+            results[i] = {**{k: entry.get(k) for k in ('http_status', 'content_length', 'notes', 'etag', 'last_modified')},
+                          'has_parquet': bool(entry.get('has_parquet')), 'source': 'cache'}
+        else:
+            pending.append((i, url, entry if decision == 'revalidate' else None))
+
+    if pending:
+        workers = max(1, min(int(max_concurrency), len(pending)))
+        bucket = TokenBucket(rate_per_s, burst if burst is not None else workers)
+        own_session = session is None
+        session = session or make_session(workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='probe') as ex:
+                probed = list(ex.map(
+                    lambda p: probe_url_detailed(session, p[1], max_attempts=max_attempts, timeout=timeout,
+                                                 base_sleep=base_sleep, bucket=bucket, cached=p[2],
+                                                 retry_forbidden=retry_forbidden),
+                    pending,
+                ))
+        finally:
+            if own_session:
+                session.close()
+        for (i, _, _), r in zip(pending, probed):
+            results[i] = r
+
+    if cache is not None:
+        # Solo se persisten respuestas definitivas (no errores de red/5xx)
+        to_store = [
+            {**r, 'url': u, 'checked_at': now}
+            for u, r in zip(urls, results)
+            if r['source'] not in ('cache', 'local') and (r['has_parquet'] or r['http_status'] in (403, 404))
+        ]
+        if to_store:
+            cache.put_many(to_store)
+        cache.evict()
+        counts = {}
+        for r in results:
+            counts[r['source']] = counts.get(r['source'], 0) + 1
+        print(f"[probe] urls={len(urls)} | " + " | ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    return results
+
+
+def probe_urls(urls: Iterable[str], max_concurrency: int = 16, rate_per_s: float = 20.0,
+               burst: Optional[int] = None, max_attempts: int = 3, timeout=(4, 15),
+               base_sleep: float = 0.5, session: Optional[requests.Session] = None) -> List[ProbeResult]:
+    """Verifica todas las URLs en paralelo respetando concurrencia y rate limit."""
+    return [
+        (r['has_parquet'], r['http_status'], r['content_length'], r['notes'])
+        for r in probe_urls_detailed(urls, max_concurrency=max_concurrency, rate_per_s=rate_per_s,
+                                     burst=burst, max_attempts=max_attempts, timeout=timeout,
+                                     base_sleep=base_sleep, session=session)
+    ]
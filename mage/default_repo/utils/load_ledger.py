@@ -0,0 +1,253 @@
+"""
+Ledger de cargas a BRONZE + planificador incremental.
+
+`load_ledger` guarda, por partición natural (service_type, year, month), con qué
+metadatos remotos (content_length / ETag / Last-Modified) se cargó por última vez
+y con qué resultado (filas y último ingest_ts confirmados). El planificador
+compara esos metadatos con los del HEAD actual (fetch_and_stage_parquet) y con
+`load_audit` para decidir qué particiones son nuevas o cambiaron; el resto se
+omite. `read_unsynced` devuelve las particiones cuyo run todavía no llegó a
+`load_audit`, para que la auditoría se actualice sin escanear BRONZE, y
+`partition_counts` las filas por partición (ledger/auditoría, recuento en BRONZE
+solo para lo que ninguno registró).
+"""
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from default_repo.utils.arrow_normalize import ddl_column_types
+from default_repo.utils.schema_registry import get_registry
+from default_repo.utils.trip_services import get_service
+
+KEYS = ['service_type', 'year', 'month']
+
+LEDGER_DDL = """
+create table if not exists {db}.{schema}.load_ledger (
+    service_type string,
+    year int,
+    month int,
+    source_url string,
+    content_length number(38,0),
+    etag string,
+    last_modified string,
+    row_count number,
+    latest_ingest_ts timestamp_ntz,
+    run_id string,
+    status string,        -- OK | ERROR
+    loaded_at timestamp_ntz
+);
+"""
+
+LEDGER_COLS = ['service_type', 'year', 'month', 'source_url', 'content_length', 'etag', 'last_modified',
+               'row_count', 'latest_ingest_ts', 'run_id', 'status', 'loaded_at']
+
+
+def ensure_ledger(conn, db: str, schema: str, registry=None) -> None:
+    # vía registro de esquemas: ledgers creados antes de latest_ingest_ts reciben la columna
+    (registry or get_registry(db, schema)).ensure(conn, 'load_ledger', ddl_column_types(LEDGER_DDL))
+
+
+def _py(v):
+    # el conector no sabe bindear escalares numpy ni pd.NA
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    return v.item() if hasattr(v, 'item') else v
+
+
+def record_load(conn, db: str, schema: str, entry: dict) -> None:
+    """
+    Reemplaza la fila del ledger de una partición (una fila por partición).
+    DELETE + INSERT en una transacción: un planificador concurrente ve la fila
+    anterior o la nueva, nunca la partición sin fila.
+    """
+    fq = f"{db}.{schema}.load_ledger"
+    row = {c: _py(entry.get(c)) for c in LEDGER_COLS}
+    row['loaded_at'] = row['loaded_at'] or datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    cur = conn.cursor()
+    try:
+        cur.execute("begin")
+        try:
+            cur.execute(f"delete from {fq} where service_type = %s and year = %s and month = %s",
+                        (row['service_type'], row['year'], row['month']))
+            cur.execute(
+                f"insert into {fq} ({', '.join(LEDGER_COLS)}) values ({', '.join(['%s'] * len(LEDGER_COLS))})",
+                tuple(row[c] for c in LEDGER_COLS),
+            )
+            cur.execute("commit")
+        except Exception:
+            try: cur.execute("rollback")
+            except Exception: pass
+            raise
+    finally:
+        cur.close()
+
+
+def _fetch_df(conn, sql: str) -> pd.DataFrame:
+    cur = conn.cursor()
+    try:
+        cur.execute(sql)
+        df = cur.fetch_pandas_all()
+    finally:
+        cur.close()
+    df.columns = [c.lower() for c in df.columns]
+    return df
+
+
+def read_ledger(conn, db: str, schema: str) -> pd.DataFrame:
+    try:
+        return _fetch_df(conn, f"select {', '.join(LEDGER_COLS)} from {db}.{schema}.load_ledger")
+    except Exception as e:
+        print(f"[planner][warning] Sin load_ledger ({type(e).__name__}); se asume vacío")
+        return pd.DataFrame(columns=LEDGER_COLS)
+
+
+def read_audit(conn, db: str, schema: str) -> pd.DataFrame:
+    """load_audit + content_length de coverage_matrix (si existe) por partición."""
+    cols = ['service_type', 'year', 'month', 'row_count', 'audit_content_length']
+    try:
+        return _fetch_df(conn, f"""
+            select a.service_type, a.year, a.month, a.row_count,
+                   c.content_length as audit_content_length
+            from {db}.{schema}.load_audit a
+            left join {db}.{schema}.coverage_matrix c
+              on a.service_type = c.service_type and a.year = c.year and a.month = c.month
+        """)
+    except Exception as e:
+        print(f"[planner][warning] Sin load_audit ({type(e).__name__}); se asume vacío")
+        return pd.DataFrame(columns=cols)
+
+
+def read_unsynced(conn, db: str, schema: str, services: Optional[Iterable[str]] = None,
+                  years: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """
+    Particiones del ledger cuyo run_id no es el que figura en load_audit (cargadas
+    o recargadas desde la última sincronización). Solo lee ledger + auditoría.
+    """
+    where = ["(a.run_id is null or a.run_id <> l.run_id)"]
+    if services:
+        where.append("l.service_type in (" + ", ".join(f"'{s}'" for s in services) + ")")
+    if years:
+        years = [int(y) for y in years]
+        where.append(f"l.year between {min(years)} and {max(years)}")
+    cols = ', '.join(f'l.{c}' for c in LEDGER_COLS)
+    try:
+        return _fetch_df(conn, f"""
+            select {cols}
+            from {db}.{schema}.load_ledger l
+            left join {db}.{schema}.load_audit a
+              on a.service_type = l.service_type and a.year = l.year and a.month = l.month
+            where {' and '.join(where)}
+        """)
+    except Exception as e:
+        print(f"[audit][warning] Sin load_ledger ({type(e).__name__}); nada que sincronizar")
+        return pd.DataFrame(columns=LEDGER_COLS)
+
+
+
+def scan_counts(conn, db: str, schema: str, keys: pd.DataFrame) -> pd.DataFrame:
+    """count(*) en BRONZE de las particiones `keys` (service_type, year, month) y nada más."""
+    parts = []
+    for service, grp in keys.groupby('service_type', sort=True):
+        months = grp.groupby('year')['month'].agg(lambda m: ', '.join(str(int(v)) for v in sorted(set(m))))
+        where = ' or '.join(f"(year = {int(y)} and month in ({ms}))" for y, ms in months.items())
+        parts.append(f"select '{service}' as service_type, year, month, count(*) as row_count "
+                     f"from {db}.{schema}.{get_service(service).table} where {where} group by 1, 2, 3")
+    if not parts:
+        return pd.DataFrame(columns=KEYS + ['row_count'])
+    return _fetch_df(conn, '\nunion all\n'.join(parts))
+
+
+def partition_counts(conn, db: str, schema: str, keys: pd.DataFrame, source: str = 'ledger') -> pd.DataFrame:
+    """
+    row_count de cada partición de `keys` con filas en BRONZE.
+    source='ledger': LOAD_AUDIT (con filas) pisado por LOAD_LEDGER (OK); las claves
+                     que ninguno registró (cargas previas al ledger) se cuentan en BRONZE.
+    source='scan':   todas las claves se cuentan en BRONZE.
+    """
+    keys = keys[KEYS].astype({'year': int, 'month': int}).drop_duplicates()
+    counts = pd.DataFrame(columns=KEYS + ['row_count'])
+    if source == 'ledger':
+        audit = read_audit(conn, db, schema)
+        ledger = read_ledger(conn, db, schema)
+        counts = pd.concat([audit[audit['row_count'].fillna(0) > 0][KEYS + ['row_count']],
+                            ledger[ledger['status'] == 'OK'][KEYS + ['row_count']]], ignore_index=True)
+        counts = counts.astype({'year': int, 'month': int}).drop_duplicates(subset=KEYS, keep='last')
+        counts = keys.merge(counts, on=KEYS)
+    missing = keys.merge(counts[KEYS], on=KEYS, how='left', indicator=True)
+    missing = missing[missing['_merge'] == 'left_only'][KEYS]
+    if len(missing):
+        scanned = scan_counts(conn, db, schema, missing)
+        print(f"[coverage] {len(missing)} particiones sin ledger/auditoría: recuento en BRONZE")
+        counts = pd.concat([counts, scanned], ignore_index=True)
+    return counts.astype({'service_type': str, 'year': int, 'month': int, 'row_count': int}).reset_index(drop=True)
+
+def _known(s: pd.Series) -> pd.Series:
+    return s.notna() & s.astype(str).ne('')
+
+
+def _differs(a: pd.Series, b: pd.Series, numeric: bool = False) -> pd.Series:
+    """Ambos valores conocidos y distintos (como enteros si `numeric`)."""
+    both = _known(a) & _known(b)
+    if numeric:
+        a, b = pd.to_numeric(a, errors='coerce'), pd.to_numeric(b, errors='coerce')
+    return both & a.ne(b)
+
+
+def _decide(plan: pd.DataFrame, force: bool, trust_audit: bool):
+    """Acción y motivo de todas las particiones a la vez: gana la primera regla que se cumple."""
+    in_ledger = _known(plan['ledger_status'])
+    # sin ledger: particiones cargadas antes de existir el ledger
+    audited = ~in_ledger & pd.to_numeric(plan['row_count'], errors='coerce').gt(0)
+    rules = [
+        (~plan['has_parquet'].fillna(False).astype(bool), 'skip', 'no_remote_file'),
+        (np.full(len(plan), force), 'load', 'forced'),
+        (in_ledger & plan['ledger_status'].ne('OK'), 'load', 'previous_error'),
+        (in_ledger & _differs(plan['etag'], plan['ledger_etag']), 'load', 'etag_changed'),
+        (in_ledger & _differs(plan['content_length'], plan['ledger_content_length'], numeric=True),
+         'load', 'size_changed'),
+        (in_ledger, 'skip', 'unchanged'),
+        (audited & _differs(plan['content_length'], plan['audit_content_length'], numeric=True),
+         'load', 'size_changed'),
+        (audited & trust_audit, 'skip', 'loaded_no_ledger'),
+        (audited, 'load', 'unverified'),
+    ]
+    masks = [m for m, _, _ in rules]
+    action = np.select(masks, [a for _, a, _ in rules], default='load')
+    reason = np.select(masks, [r for _, _, r in rules], default='new')
+    return action, reason
+
+
+def plan_partitions(remote: pd.DataFrame, ledger: Optional[pd.DataFrame] = None,
+                    audit: Optional[pd.DataFrame] = None, force: bool = False,
+                    trust_audit: bool = True) -> pd.DataFrame:
+    """
+    remote: salida de fetch_and_stage_parquet (year, month, service_type, url,
+            has_parquet, content_length, etag, ...).
+    Devuelve `remote` + columnas `action` ('load' | 'skip') y `reason`.
+    """
+    plan = remote.copy()
+    for c in ('content_length', 'etag'):
+        if c not in plan.columns:
+            plan[c] = None
+    plan['year'] = plan['year'].astype(int)
+    plan['month'] = plan['month'].astype(int)
+
+    if ledger is not None and not ledger.empty:
+        led = ledger[KEYS + ['content_length', 'etag', 'status']].rename(columns={
+            'content_length': 'ledger_content_length', 'etag': 'ledger_etag', 'status': 'ledger_status',
+        }).astype({'year': int, 'month': int})
+        plan = plan.merge(led.drop_duplicates(KEYS, keep='last'), on=KEYS, how='left')
+    else:
+        plan['ledger_content_length'] = plan['ledger_etag'] = plan['ledger_status'] = None
+
+    if audit is not None and not audit.empty:
+        aud = audit[KEYS + ['row_count', 'audit_content_length']].astype({'year': int, 'month': int})
+        plan = plan.merge(aud.drop_duplicates(KEYS, keep='last'), on=KEYS, how='left')
+    else:
+        plan['row_count'] = plan['audit_content_length'] = None
+
+    plan['action'], plan['reason'] = _decide(plan, force, trust_audit)
+    return plan.drop(columns=['ledger_content_length', 'ledger_etag', 'ledger_status',
+                              'row_count', 'audit_content_length'])
@@ -0,0 +1,84 @@
+"""
+Warehouse local (DuckDB) para benchmarks de la capa dbt.
+
+- `seed_bronze()` crea `nyc_tlc.duckdb` con BRONZE.<servicio>_trips generado por
+  utils/sample_data (normalizado igual que copy_into_bronze) y un
+  BRONZE.taxi_zones sintético de 265 zonas.
+- `load_sample_partition()` reemplaza una partición (service_type, year, month)
+  con un ingest_ts nuevo, como una recarga real.
+- `run_dbt()` corre el CLI de dbt contra los targets `duckdb` / `duckdb_gold` de
+  profiles.yml (el archivo va por la env DBT_DUCKDB_PATH) y devuelve los segundos.
+Requiere duckdb y dbt-duckdb (no están en requirements.txt: solo benchmarks).
+"""
+import os
+import subprocess
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+
+from default_repo.utils.arrow_normalize import normalize_table
+from default_repo.utils.sample_data import sample_trips_table
+from default_repo.utils.trip_services import get_service
+
+DBT_PROJECT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dbt', 'nyc_tlc')
+DB_FILE = 'nyc_tlc.duckdb'  # las sources apuntan a la base NYC_TLC
+
+
+def load_sample_partition(con, service: str, year: int, month: int, rows: int, seed: Optional[int] = 0) -> int:
+    """Reemplaza la partición en BRONZE con `rows` filas de muestra. Devuelve filas cargadas."""
+    svc = get_service(service)
+    meta = {'run_id': str(uuid.uuid4()), 'ingest_ts': pd.Timestamp.now(tz='UTC').isoformat(), 'year': year,
+            'month': month, 'service_type': service,
+            'source_url': f'sample://{service}_tripdata_{year}-{month:02d}.parquet'}
+    batch = normalize_table(sample_trips_table(service, year, month, rows, seed=seed), svc.column_types, meta,
+                            svc.key_cols)
+    con.register('batch', batch)
+    try:
+        con.execute(f"create table if not exists BRONZE.{svc.table} as select * from batch limit 0")
+        con.execute(f"delete from BRONZE.{svc.table} where year = ? and month = ? and service_type = ?",
+                    [year, month, service])
+        con.execute(f"insert into BRONZE.{svc.table} by name select * from batch")
+    finally:
+        con.unregister('batch')
+    return batch.num_rows
+
+
+def seed_bronze(path: str, services: Iterable[str], year: int, months: Iterable[int],
+                rows: Union[int, Dict[str, int]]) -> int:
+    """
+    Crea el archivo DuckDB con BRONZE de muestra (servicios x meses). `rows` son
+    las filas por partición, un int o {servicio: filas}. Devuelve filas totales.
+    """
+    import duckdb
+    con = duckdb.connect(path)
+    try:
+        for schema in ('BRONZE', 'SILVER', 'GOLD'):
+            con.execute(f"create schema if not exists {schema}")
+        con.execute(
+            "create or replace table BRONZE.taxi_zones as "
+            "select i as locationid, ['Manhattan','Brooklyn','Queens','Bronx','Staten Island','EWR'][1 + i % 6] as borough, "
+            "'Zone ' || i as zone, 'Boro Zone' as service_zone from range(1, 266) t(i)"
+        )
+        total = 0
+        for s, service in enumerate(services):
+            for month in months:
+                n = rows[service] if isinstance(rows, dict) else rows
+                total += load_sample_partition(con, service, year, month, n, seed=s * 100 + month)
+        return total
+    finally:
+        con.close()
+
+
+def run_dbt(args: List[str], db_path: str, dbt_bin: str = 'dbt', check: bool = True,
+            project_dir: Optional[str] = None) -> float:
+    """`dbt <args>` sobre el archivo `db_path`; con check=True falla si dbt termina con error."""
+    project_dir = project_dir or DBT_PROJECT
+    cmd = [dbt_bin, *args, '--project-dir', project_dir, '--profiles-dir', project_dir]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, env={**os.environ, 'DBT_DUCKDB_PATH': db_path}, capture_output=True, text=True)
+    seconds = time.perf_counter() - t0
+    if check and proc.returncode != 0:
+        raise RuntimeError(f"dbt {' '.join(args)} falló:\n{proc.stdout[-3000:]}")
+    return seconds
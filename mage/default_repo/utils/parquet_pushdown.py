@@ -0,0 +1,105 @@
+"""
+Pushdown de proyección y predicado al leer los Parquet de TLC.
+
+- Proyección: `projection()` devuelve solo las columnas del archivo que la DDL
+  declara (más el drift aceptado); `read_row_group(rg, columns=...)` no
+  decodifica el resto. Los bytes comprimidos de las columnas omitidas se
+  cuentan como no leídos.
+- Predicado sobre el pickup (`PickupFilter`): con las estadísticas min/max /
+  null_count de cada row group se decide antes de leerlo:
+    - 'skip':   todo el row group cae fuera de la ventana -> no se lee.
+    - 'keep':   todo adentro y sin nulls -> se lee sin evaluar filas.
+    - 'filter': mixto o sin estadísticas -> se lee y se filtra con pyarrow.compute.
+  Ventanas (`pickup_window`):
+    - 'silver':    la misma de silver_trips (`pickup_datetime between
+                   '2009-01-01' and '2025-12-31'`), así BRONZE no pierde
+                   nada que silver conserve.
+    - 'partition': el mes de la partición ± `tolerance_days`; descarta los
+                   viajes mal fechados (2002, 2088, ...) de cada archivo.
+  Pickups nulos se descartan en ambos casos (silver tampoco los conserva).
+Los contadores (`rows_skipped`, `row_groups_skipped`, `bytes_skipped`) van al
+resumen de copy_into_bronze.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+SILVER_WINDOW = ('2009-01-01', '2025-12-31')  # = filtro de silver_trips (ambos inclusive)
+MODES = ('silver', 'partition')
+
+
+def pickup_window(mode: str, year: int, month: int, tolerance_days: float = 1,
+                  pickup_min: Optional[str] = None, pickup_max: Optional[str] = None) -> Tuple[datetime, datetime]:
+    """Ventana [lo, hi] (inclusive) de pickups válidos para la partición."""
+    if mode == 'silver':
+        lo = datetime.fromisoformat(pickup_min or SILVER_WINDOW[0])
+        hi = datetime.fromisoformat(pickup_max or SILVER_WINDOW[1])
+        return lo, hi
+    if mode == 'partition':
+        start = datetime(int(year), int(month), 1)
+        end = datetime(int(year) + (int(month) == 12), int(month) % 12 + 1, 1)
+        tol = timedelta(days=float(tolerance_days))
+        return start - tol, end + tol - timedelta(microseconds=1)
+    raise ValueError(f"pickup_filter inválido: {mode} (usar {', '.join(MODES)})")
+
+
+def projection(schema: pa.Schema, column_types: Dict[str, str]) -> List[str]:
+    """Columnas del archivo (nombre original) cuyo nombre en minúsculas está en la DDL."""
+    return [n for n in schema.names if n.lower() in column_types]
+
+
+def column_index(pf: pq.ParquetFile) -> Dict[str, int]:
+    """{nombre de columna: índice del column chunk} (esquemas planos de TLC)."""
+    if pf.metadata.num_row_groups == 0:
+        return {}
+    rg = pf.metadata.row_group(0)
+    return {rg.column(i).path_in_schema: i for i in range(rg.num_columns)}
+
+
+def chunk_bytes(rg_meta, indices) -> int:
+    """Bytes comprimidos de los column chunks `indices` de un row group."""
+    return sum(rg_meta.column(i).total_compressed_size for i in indices)
+
+
+class PickupFilter:
+    def __init__(self, column: str, lo: datetime, hi: datetime, index: Optional[int] = None):
+        self.column = column  # nombre en el archivo (p.ej. tpep_pickup_datetime)
+        self.lo, self.hi = lo, hi
+        self.index = index    # índice del column chunk para leer estadísticas
+
+    def plan(self, rg_meta) -> str:
+        """'skip' | 'keep' | 'filter' a partir de las estadísticas del row group."""
+        if self.index is None:
+            return 'filter'
+        st = rg_meta.column(self.index).statistics
+        if st is None or not st.has_min_max:
+            # sin min/max: o no hay estadísticas o todos los valores son nulos
+            return 'skip' if st is not None and st.null_count == rg_meta.num_rows else 'filter'
+        lo, hi = st.min, st.max
+        if not isinstance(lo, datetime) or not isinstance(hi, datetime):
+            return 'filter'
+        if lo.tzinfo is not None:
+            lo, hi = lo.replace(tzinfo=None), hi.replace(tzinfo=None)
+        if hi < self.lo or lo > self.hi:
+            return 'skip'
+        if lo >= self.lo and hi <= self.hi and not st.null_count:
+            return 'keep'
+        return 'filter'
+
+    def apply(self, tbl: pa.Table) -> pa.Table:
+        """Filas con pickup dentro de la ventana (nulos afuera)."""
+        col = tbl.column(self.column)
+        if not pa.types.is_timestamp(col.type):
+            col = col.cast(pa.timestamp('us'), safe=False)
+        typ = col.type
+        mask = pc.and_(
+            pc.greater_equal(col, pa.scalar(self.lo, type=pa.timestamp(typ.unit, typ.tz))),
+            pc.less_equal(col, pa.scalar(self.hi, type=pa.timestamp(typ.unit, typ.tz))),
+        )
+        return tbl.filter(pc.fill_null(mask, False))
+
+    def __repr__(self) -> str:
+        return f"PickupFilter({self.column!r}, {self.lo:%Y-%m-%d %H:%M}..{self.hi:%Y-%m-%d %H:%M})"
@@ -0,0 +1,174 @@
+"""
+Origen de los Parquet de una partición BRONZE (etapa fetch de copy_into_bronze).
+
+`open_source()` resuelve la URL a un `ParquetSource`:
+  - ruta local / file:// -> se lee en el lugar
+  - read_mode='remote'   -> HttpRangeFile (footer + column chunks por HTTP Range)
+  - con DownloadCache    -> archivo del cache (clave URL + ETag + tamaño)
+  - sin cache            -> descarga por rangos a un temporal que se borra al liberar
+`ParquetSource.row_groups()` aplica el pushdown (utils/parquet_pushdown:
+proyección a la DDL + drift y filtro de pickup) y el offset de reanudación, y
+acumula los contadores `skipped` del archivo.
+"""
+import os
+import tempfile
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from default_repo.utils.arrow_normalize import ddl_type_for
+from default_repo.utils.coverage_frame import local_path
+from default_repo.utils.download_cache import DownloadCache
+from default_repo.utils.http_file import HttpRangeFile
+from default_repo.utils.parquet_pushdown import PickupFilter, chunk_bytes, column_index, projection
+from default_repo.utils.range_download import download_file
+
+
+def download_parquet(url: str, timeout_connect=8, timeout_read=90, dest: str = None,
+                     size: int = None, segments: int = 4) -> str:
+    """
+    Descarga con Range requests en `segments` conexiones (utils/range_download).
+    Con un `dest` estable (cache) el `.part` sobrevive a un fallo y la próxima
+    descarga lo reanuda; con temporal se borra todo.
+    """
+    keep_partial = dest is not None
+    if dest is None:
+        fd, dest = tempfile.mkstemp(suffix='.parquet'); os.close(fd)
+    try:
+        st = download_file(url, dest, size=size, segments=segments,
+                           timeout=(timeout_connect, timeout_read), keep_partial=keep_partial)
+    except BaseException:
+        # no dejar archivos parciales en disco
+        try: os.remove(dest)
+        except OSError: pass
+        raise
+    resumed = f", reanudado desde {st['resumed_bytes'] / 1e6:.1f} MB" if st['resumed_bytes'] else ''
+    print(f"[download] {url.rsplit('/', 1)[-1]}: {st['bytes'] / 1e6:.1f} MB en {st['seconds']}s "
+          f"({st['mb_per_s']} MB/s, {st['segments']} segmentos{resumed})")
+    return dest
+
+
+def _remove(path: str) -> None:
+    try: os.remove(path)
+    except OSError: pass
+
+
+class ParquetSource:
+    """Un Parquet abierto para decodificar; `release()` lo devuelve al cache o lo borra."""
+
+    def __init__(self, url: str, path: str = None, remote: HttpRangeFile = None,
+                 release: Callable[[], None] = None, tag: str = ''):
+        self.url = url
+        self.path = path
+        self.remote = remote
+        self.tag = tag
+        self._release = release
+        self._pf = None
+        self.skipped = {'rows_skipped': 0, 'row_groups_skipped': 0, 'bytes_skipped': 0}
+
+    @property
+    def pf(self) -> pq.ParquetFile:
+        if self._pf is None:
+            self._pf = pq.ParquetFile(self.remote if self.remote is not None else self.path)
+        return self._pf
+
+    @property
+    def num_row_groups(self) -> int:
+        return self.pf.num_row_groups
+
+    def drift(self, column_types: Dict[str, str]) -> Dict[str, str]:
+        """Columnas del origen que la DDL no declara, con el tipo DDL inferido de Arrow."""
+        schema = self.pf.schema_arrow
+        return {n.lower(): ddl_type_for(schema.field(n).type)
+                for n in schema.names if n.lower() not in column_types}
+
+    def row_groups(self, file_types: Dict[str, str], window=None, pickup_col: str = None,
+                   resume_at: int = 0, cancelled: Callable[[], bool] = lambda: False
+                   ) -> Iterator[Tuple[int, pa.Table]]:
+        """
+        (rg, tabla) con solo las columnas de `file_types` y sin las filas fuera de
+        `window`. Con `resume_at` se omiten las primeras filas del archivo (contadas
+        después del filtro, que es determinístico). Corta si `cancelled()`.
+        """
+        pf = self.pf
+        columns = projection(pf.schema_arrow, file_types)
+        chunks = column_index(pf)
+        pruned = [i for n, i in chunks.items() if n not in columns]
+        pickup_src = next((n for n in columns if n.lower() == pickup_col), None)
+        flt = None
+        if window is not None and pickup_src is not None:
+            flt = PickupFilter(pickup_src, *window, index=chunks.get(pickup_src))
+        elif window is not None:
+            print(f"{self.tag} Sin columna {pickup_col}: no se filtra {self.url}")
+
+        rg_offset = 0  # offset de la primera fila del row group (después del filtro)
+        for rg in range(pf.num_row_groups):
+            if cancelled():
+                return
+            rg_meta = pf.metadata.row_group(rg)
+            num_rows = rg_meta.num_rows
+            action = flt.plan(rg_meta) if flt is not None else 'keep'
+            if action == 'skip':
+                self.skipped['rows_skipped'] += num_rows
+                self.skipped['row_groups_skipped'] += 1
+                self.skipped['bytes_skipped'] += chunk_bytes(rg_meta, chunks.values())
+                continue
+            # 'filter': el número de filas que quedan solo se sabe leyendo
+            if action == 'keep' and rg_offset + num_rows <= resume_at:
+                rg_offset += num_rows
+                continue
+            tbl = pf.read_row_group(rg, columns=columns)
+            self.skipped['bytes_skipped'] += chunk_bytes(rg_meta, pruned)
+            if action == 'filter':
+                tbl = flt.apply(tbl)
+                self.skipped['rows_skipped'] += num_rows - tbl.num_rows
+                num_rows = tbl.num_rows
+                if rg_offset + num_rows <= resume_at:
+                    rg_offset += num_rows
+                    continue
+            skip = max(0, resume_at - rg_offset)
+            rg_offset += num_rows
+            yield rg, (tbl.slice(skip) if skip else tbl)
+
+        if flt is not None or pruned:
+            print(f"{self.tag} Pushdown: {len(columns)}/{len(chunks)} columnas | "
+                  f"{self.skipped['row_groups_skipped']}/{pf.num_row_groups} row groups saltados | "
+                  f"{self.skipped['rows_skipped']} filas descartadas | "
+                  f"{self.skipped['bytes_skipped'] / 1e6:.1f} MB no leídos")
+        if self.remote is not None:
+            print(f"{self.tag} Remoto: {self.remote.stats['requests']} requests, "
+                  f"{self.remote.stats['bytes_fetched'] / 1e6:.1f} de {self.remote.size / 1e6:.1f} MB leídos")
+
+    def release(self) -> None:
+        if self.remote is not None:
+            self.remote.close()
+        elif self._release is not None:
+            self._release()
+
+
+def open_source(url: str, *, read_mode: str = 'download', cache: Optional[DownloadCache] = None,
+                size: int = None, etag: str = None, segments: int = 4, tag: str = '') -> ParquetSource:
+    """Resuelve `url` a un ParquetSource (local, remoto, cache o descarga a temporal)."""
+    path = local_path(url)
+    if path is not None:
+        # Parquet en disco (fetch_and_stage_parquet con base_url local): se lee en el lugar
+        print(f"{tag} Parquet local: {path}")
+        return ParquetSource(url, path, tag=tag)
+    if read_mode == 'remote':
+        print(f"{tag} Leyendo remoto (Range): {url}")
+        return ParquetSource(url, remote=HttpRangeFile(url, size=size), tag=tag)
+    if cache is None:
+        print(f"{tag} Descargando: {url}")
+        path = download_parquet(url, size=size, segments=segments)
+        return ParquetSource(url, path, release=lambda: _remove(path), tag=tag)
+    path = cache.acquire(url, lambda dest: download_parquet(url, dest=dest, size=size, segments=segments),
+                         etag=etag, size=size)
+    print(f"{tag} Parquet local (cache): {url}")
+    return ParquetSource(url, path, release=lambda: cache.release(path), tag=tag)
+
+
+def release_source(item) -> None:
+    """`discard` del StagePipeline: libera los ParquetSource que quedaron en cola al abortar."""
+    if isinstance(item, ParquetSource):
+        item.release()
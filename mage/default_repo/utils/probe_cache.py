@@ -0,0 +1,172 @@
+"""
+Cache persistente (SQLite) de resultados de HEAD por URL.
+
+Guarda ETag, Last-Modified, Content-Length, status y fecha de verificación para
+que una re-ejecución solo vuelva a la red por los meses recientes:
+  - 'fresh':      entrada dentro de su TTL -> se usa tal cual, sin request.
+  - 'revalidate': entrada vencida con validadores -> HEAD condicional
+                  (If-None-Match / If-Modified-Since); un 304 la renueva.
+  - 'miss':       sin entrada -> HEAD normal.
+TTLs: meses históricos (archivo de hace más de `historical_after_days`) usan
+`historical_ttl_s`; los recientes `ttl_s`; los negativos (404/403) `negative_ttl_s`.
+Eviction: LRU por `accessed_at` hasta `max_entries` + purga de entradas más
+viejas que `max_age_s`.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+_PERIOD_RE = re.compile(r'(\d{4})-(\d{2})\.parquet$')
+
+_DDL = """
+create table if not exists probe_cache (
+    url            text primary key,
+    http_status    integer,
+    has_parquet    integer,
+    content_length integer,
+    etag           text,
+    last_modified  text,
+    notes          text,
+    checked_at     real,
+    accessed_at    real
+)
+"""
+_COLS = ['url', 'http_status', 'has_parquet', 'content_length', 'etag', 'last_modified', 'notes',
+         'checked_at', 'accessed_at']
+
+
+def default_cache_path() -> str:
+    try:
+        from mage_ai.settings.repo import get_repo_path
+        base = get_repo_path()
+    except Exception:
+        base = os.getcwd()
+    return os.path.join(base, '.cache', 'probe_cache.sqlite')
+
+
+def _file_age_days(url: str, today: Optional[date] = None) -> Optional[int]:
+    m = _PERIOD_RE.search(url)
+    if not m:
+        return None
+    y, mo = int(m.group(1)), int(m.group(2))
+    today = today or date.today()
+    # el archivo del mes M se publica después de terminar M
+    end = date(y + (mo == 12), mo % 12 + 1, 1)
+    return (today - end).days
+
+
+class ProbeCache:
+    def __init__(self, path: Optional[str] = None, ttl_s: float = 24 * 3600,
+                 historical_ttl_s: float = 30 * 24 * 3600, historical_after_days: int = 120,
+                 negative_ttl_s: float = 6 * 3600, max_entries: int = 20_000,
+                 max_age_s: float = 180 * 24 * 3600):
+        self.path = path or default_cache_path()
+        self.ttl_s = float(ttl_s)
+        self.historical_ttl_s = float(historical_ttl_s)
+        self.historical_after_days = int(historical_after_days)
+        self.negative_ttl_s = float(negative_ttl_s)
+        self.max_entries = int(max_entries)
+        self.max_age_s = float(max_age_s)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute('pragma journal_mode=wal')
+        self._db.execute(_DDL)
+        self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ---------- lectura / escritura ----------
+    def get_many(self, urls: Iterable[str]) -> Dict[str, dict]:
+        urls = list(dict.fromkeys(urls))
+        out: Dict[str, dict] = {}
+        with self._lock:
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                q = f"select {', '.join(_COLS)} from probe_cache where url in ({', '.join('?' * len(chunk))})"
+                for row in self._db.execute(q, chunk):
+                    out[row[0]] = dict(zip(_COLS, row))
+            # LRU: una lectura cuenta como acceso
+            now = time.time()
+            self._db.executemany('update probe_cache set accessed_at = ? where url = ?',
+                                 [(now, u) for u in out])
+            self._db.commit()
+        return out
+
+    def put_many(self, entries: List[dict]) -> None:
+        now = time.time()
+        rows = [(
+            e['url'], e.get('http_status'), int(bool(e.get('has_parquet'))), e.get('content_length'),
+            e.get('etag'), e.get('last_modified'), e.get('notes'),
+            e.get('checked_at') or now, now,
+        ) for e in entries]
+        with self._lock:
+            self._db.executemany(
+                f"insert into probe_cache ({', '.join(_COLS)}) values ({', '.join('?' * len(_COLS))}) "
+                "on conflict(url) do update set http_status=excluded.http_status, "
+                "has_parquet=excluded.has_parquet, content_length=excluded.content_length, "
+                "etag=excluded.etag, last_modified=excluded.last_modified, notes=excluded.notes, "
+                "checked_at=excluded.checked_at, accessed_at=excluded.accessed_at",
+                rows,
+            )
+            self._db.commit()
+
+    def evict(self) -> int:
+        """Purga por edad y LRU. Devuelve cuántas entradas se borraron."""
+        now = time.time()
+        with self._lock:
+            n = self._db.execute('delete from probe_cache where checked_at < ?', (now - self.max_age_s,)).rowcount
+            total = self._db.execute('select count(*) from probe_cache').fetchone()[0]
+            if total > self.max_entries:
+                n += self._db.execute(
+                    'delete from probe_cache where url in ('
+                    '  select url from probe_cache order by accessed_at asc limit ?)',
+                    (total - self.max_entries,),
+                ).rowcount
+            self._db.commit()
+        return n
+
+    # ---------- política ----------
+    def ttl_for(self, entry: dict, today: Optional[date] = None) -> float:
+        if not entry.get('has_parquet'):
+            return self.negative_ttl_s
+        age_days = _file_age_days(entry['url'], today)
+        if age_days is not None and age_days >= self.historical_after_days:
+            return self.historical_ttl_s
+        return self.ttl_s
+
+    def decide(self, entry: Optional[dict], now: Optional[float] = None) -> str:
+        if entry is None:
+            return 'miss'
+        now = now or time.time()
+        if now - float(entry.get('checked_at') or 0) < self.ttl_for(entry):
+            return 'fresh'
+        if entry.get('has_parquet') and (entry.get('etag') or entry.get('last_modified')):
+            return 'revalidate'
+        return 'miss'
+
+
+def cache_from_kwargs(kwargs: dict) -> Optional[ProbeCache]:
+    """
+    Construye el cache a partir de los kwargs de un bloque:
+    use_cache (default True), cache_path, cache_ttl_s, cache_historical_ttl_s,
+    cache_negative_ttl_s, cache_max_entries.
+    """
+    if not kwargs.get('use_cache', True):
+        return None
+    opts = {}
+    for key, opt in (('cache_ttl_s', 'ttl_s'), ('cache_historical_ttl_s', 'historical_ttl_s'),
+                     ('cache_negative_ttl_s', 'negative_ttl_s'), ('cache_max_entries', 'max_entries')):
+        if kwargs.get(key) is not None:
+            opts[opt] = kwargs[key]
+    try:
+        return ProbeCache(kwargs.get('cache_path'), **opts)
+    except Exception as e:
+        print(f"[probe][warning] Cache deshabilitado: {e}")
+        return None
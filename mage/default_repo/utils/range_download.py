@@ -0,0 +1,210 @@
+"""
+Descarga de archivos grandes con HTTP Range en varias conexiones y reanudación.
+
+- HEAD inicial: tamaño (`Content-Length`), soporte de rangos (`Accept-Ranges: bytes`) y ETag.
+- El archivo se parte en `segments` rangos (mínimo `min_segment_bytes` cada uno) que
+  se descargan en paralelo sobre un `.part` preasignado.
+- El avance de cada segmento se guarda en `<dest>.part.json`; si la descarga se
+  corta (timeout, conexión cerrada, proceso muerto) la siguiente llamada con el
+  mismo destino retoma desde el último byte escrito de cada segmento (si URL,
+  tamaño y ETag no cambiaron).
+- Cada segmento reintenta con backoff desde su offset actual.
+- Al final se valida el tamaño contra el HEAD y se renombra atómicamente a `dest`.
+- Sin soporte de rangos: un solo GET en streaming (sin reanudación).
+"""
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+
+from default_repo.utils.http_probe import _backoff, make_session
+
+
+class RangeNotSupported(Exception):
+    pass
+
+
+def _head(session: requests.Session, url: str, timeout):
+    r = session.head(url, allow_redirects=True, timeout=timeout)
+    r.raise_for_status()
+    size = int(r.headers.get('Content-Length') or 0) or None
+    ranged = r.headers.get('Accept-Ranges', '').lower() == 'bytes'
+    return size, ranged, r.headers.get('ETag')
+
+
+def _plan_segments(size: int, segments: int, min_segment_bytes: int) -> list:
+    n = max(1, min(int(segments), size // max(1, int(min_segment_bytes))))
+    step = math.ceil(size / n)
+    return [{'start': i * step, 'end': min(size, (i + 1) * step) - 1, 'done': 0} for i in range(n)]
+
+
+class _Progress:
+    """Avance por segmento + sidecar JSON (se persiste cada `flush_bytes`)."""
+
+    def __init__(self, path: Optional[str], state: dict, flush_bytes: int = 8 * 1024 * 1024):
+        self.path = path
+        self.state = state
+        self.flush_bytes = flush_bytes
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def advance(self, seg: dict, n: int) -> None:
+        with self._lock:
+            seg['done'] += n
+            self._pending += n
+            if self._pending >= self.flush_bytes:
+                self._save()
+
+    def reset(self, seg: dict) -> None:
+        with self._lock:
+            seg['done'] = 0
+
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        self._pending = 0
+        if not self.path:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+
+def _load_state(path: str, url: str, size: int, etag: Optional[str], part: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            st = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if st.get('url') != url or st.get('size') != size or st.get('etag') != etag:
+        return None
+    if not os.path.exists(part) or os.path.getsize(part) != size:
+        return None
+    return st
+
+
+def _fetch_segment(session, url: str, part: str, seg: dict, progress: _Progress, ranged: bool,
+                   timeout, chunk_size: int, max_attempts: int, base_sleep: float) -> None:
+    # end=None: tamaño desconocido (solo sin rangos) -> se lee hasta EOF
+    def _complete():
+        return seg['end'] is not None and seg['start'] + seg['done'] > seg['end']
+
+    attempt = 0
+    while not _complete():
+        before = seg['done']
+        if not ranged:
+            progress.reset(seg)  # sin rangos no hay reanudación: se empieza de cero
+        pos = seg['start'] + seg['done']
+        headers = {'Range': f"bytes={pos}-{seg['end']}"} if ranged else {}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                if ranged and r.status_code != 206:
+                    raise RangeNotSupported(f"status {r.status_code} a un Range request")
+                r.raise_for_status()
+                with open(part, 'r+b' if ranged else 'wb') as f:
+                    f.seek(pos)
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        if not chunk:
+                            continue
+                        if seg['end'] is not None:
+                            chunk = chunk[:seg['end'] - (seg['start'] + seg['done']) + 1]
+                        f.write(chunk)
+                        progress.advance(seg, len(chunk))
+                        if _complete():
+                            break
+            if seg['end'] is None:
+                return
+        except RangeNotSupported:
+            raise
+        except Exception:
+            attempt += 1
+            if attempt >= max_attempts:
+                raise
+            time.sleep(_backoff(attempt, base_sleep))
+            continue
+        if not _complete():
+            # la conexión se cerró antes de tiempo; si no hubo avance cuenta como intento
+            attempt = 0 if seg['done'] > before else attempt + 1
+            if attempt >= max_attempts:
+                raise IOError(f"segmento {seg['start']}-{seg['end']} incompleto tras {attempt} intentos")
+
+
+def download_file(url: str, dest: str, size: Optional[int] = None, etag: Optional[str] = None,
+                  segments: int = 4, min_segment_bytes: int = 8 * 1024 * 1024,
+                  session: Optional[requests.Session] = None, timeout=(8, 90), max_attempts: int = 4,
+                  chunk_size: int = 1024 * 1024, base_sleep: float = 0.5, keep_partial: bool = True) -> dict:
+    """
+    Descarga `url` en `dest`. Devuelve {'bytes','seconds','mb_per_s','segments','resumed_bytes'}.
+    keep_partial=False borra el `.part` si falla (sin reanudación posterior).
+    """
+    own_session = session is None
+    session = session or make_session(max(1, int(segments)))
+    part, state_path = dest + '.part', dest + '.part.json'
+    try:
+        head_size, ranged, head_etag = _head(session, url, timeout)
+        size = int(size or head_size or 0) or None
+        etag = etag or head_etag
+        ranged = ranged and size is not None
+
+        state = _load_state(state_path, url, size, etag, part) if ranged else None
+        resumed = sum(s['done'] for s in state['segments']) if state else 0
+        if state is None:
+            segs = (_plan_segments(size, segments, min_segment_bytes) if ranged
+                    else [{'start': 0, 'end': (size - 1) if size else None, 'done': 0}])
+            state = {'url': url, 'size': size, 'etag': etag, 'segments': segs}
+            with open(part, 'wb') as f:
+                if ranged:
+                    f.truncate(size)
+        progress = _Progress(state_path if ranged else None, state)
+        progress.save()
+
+        pending = [s for s in state['segments'] if s['end'] is None or s['start'] + s['done'] <= s['end']]
+        t0 = time.perf_counter()
+        fetch = lambda seg: _fetch_segment(session, url, part, seg, progress, ranged, timeout,
+                                           chunk_size, max_attempts, base_sleep)
+        try:
+            if len(pending) > 1:
+                with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='range') as ex:
+                    list(ex.map(fetch, pending))
+            elif pending:
+                fetch(pending[0])
+        except RangeNotSupported:
+            # el HEAD dijo que sí pero el GET no respeta Range: un solo stream
+            ranged, resumed = False, 0
+            state['segments'] = [{'start': 0, 'end': size - 1, 'done': 0}]
+            progress = _Progress(None, state)
+            _fetch_segment(session, url, part, state['segments'][0], progress, False, timeout,
+                           chunk_size, max_attempts, base_sleep)
+        finally:
+            progress.save()
+        seconds = time.perf_counter() - t0
+
+        got = os.path.getsize(part)
+        if size is not None and got != size:
+            raise IOError(f"tamaño descargado {got} != Content-Length {size}")
+        os.replace(part, dest)
+        try: os.remove(state_path)
+        except OSError: pass
+        fetched = got - resumed
+        return {
+            'bytes': got, 'seconds': round(seconds, 2),
+            'mb_per_s': round(fetched / 1e6 / seconds, 1) if seconds > 0 else None,
+            'segments': len(state['segments']), 'resumed_bytes': resumed,
+        }
+    except BaseException:
+        if not keep_partial:
+            for p in (part, state_path):
+                try: os.remove(p)
+                except OSError: pass
+        raise
+    finally:
+        if own_session:
+            session.close()
@@ -0,0 +1,154 @@
+"""
+Generador de Parquet sintéticos con la forma de los archivos mensuales de TLC.
+
+Sirve para benchmarks y pruebas locales sin descargar datos reales: respeta los
+nombres originales (VendorID, PULocationID, ...), los tipos del Parquet de TLC
+(passenger_count/RatecodeID como double, timestamps en us), algunos nulls y una
+fracción de viajes "mal fechados" fuera del mes del archivo.
+Servicios: yellow / green (taxis) y fhv / fhvhv con sus esquemas propios
+(bases de despacho, PUlocationID como double en fhv, flags Y/N y trip_time en
+segundos en fhvhv). Un mes real de fhvhv tiene ~20M de viajes.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+_PREFIX = {'yellow': 'tpep', 'green': 'lpep'}
+
+
+_BASES = np.array([f'B{i:05d}' for i in (2510, 2800, 2869, 3404, 2682, 2764, 2835, 2866, 2867, 2870)])
+_HVFHS = np.array(['HV0003', 'HV0005', 'HV0004'])  # Uber, Lyft, Via
+
+
+def _f(values, mask=None):
+    return pa.array(values, type=pa.float64(), mask=mask)
+
+
+def _pickups(rng, year: int, month: int, n: int, misdated_frac: float) -> np.ndarray:
+    start = np.datetime64(f'{year}-{month:02d}-01T00:00:00', 'us')
+    end = np.datetime64(f'{year + (month == 12)}-{month % 12 + 1:02d}-01T00:00:00', 'us')
+    span = int((end - start) / np.timedelta64(1, 'us'))
+    pickup = start + rng.integers(0, span, n).astype('timedelta64[us]')
+    # viajes mal fechados (p.ej. 2002, 2088) como en los archivos reales
+    bad = rng.random(n) < misdated_frac
+    if bad.any():
+        pickup[bad] = np.datetime64('2002-12-31T23:00:00', 'us') + rng.integers(0, 10**9, bad.sum()).astype('timedelta64[us]')
+    return pickup
+
+
+def _after(rng, ts: np.ndarray, mean_minutes: float) -> np.ndarray:
+    minutes = rng.gamma(2.0, mean_minutes / 2.0, len(ts))
+    return ts + (minutes * 60e6).astype('int64').astype('timedelta64[us]')
+
+
+def sample_trips_table(service: str, year: int, month: int, rows: int,
+                       misdated_frac: float = 0.001, seed: Optional[int] = 0) -> pa.Table:
+    rng = np.random.default_rng(seed)
+    n = int(rows)
+    if service == 'fhv':
+        return _fhv_table(rng, year, month, n, misdated_frac)
+    if service == 'fhvhv':
+        return _fhvhv_table(rng, year, month, n, misdated_frac)
+    p = _PREFIX[service]
+    pickup = _pickups(rng, year, month, n, misdated_frac)
+    dropoff = _after(rng, pickup, 14.0)
+    dist = np.round(rng.gamma(1.6, 2.0, n), 2)
+    fare = np.round(3.0 + dist * 2.5 + rng.random(n), 2)
+    tip = np.round(np.where(rng.random(n) < 0.6, fare * 0.2, 0.0), 2)
+    nulls = rng.random(n) < 0.03
+
+    cols = {
+        'VendorID': pa.array(rng.integers(1, 3, n), pa.int32()),
+        f'{p}_pickup_datetime': pa.array(pickup),
+        f'{p}_dropoff_datetime': pa.array(dropoff),
+        'passenger_count': _f(rng.integers(0, 6, n).astype('float64'), nulls),
+        'trip_distance': _f(dist),
+        'RatecodeID': _f(rng.choice([1, 1, 1, 1, 2, 5, 99], n).astype('float64'), nulls),
+        'store_and_fwd_flag': pa.array(np.where(rng.random(n) < 0.99, 'N', 'Y'), mask=nulls),
+        'PULocationID': pa.array(rng.integers(1, 266, n), pa.int32()),
+        'DOLocationID': pa.array(rng.integers(1, 266, n), pa.int32()),
+        'payment_type': pa.array(rng.choice([0, 1, 1, 1, 2, 2, 3, 4], n), pa.int64()),
+        'fare_amount': _f(fare),
+        'extra': _f(np.round(rng.choice([0.0, 0.5, 1.0, 2.5], n), 2)),
+        'mta_tax': _f(np.full(n, 0.5)),
+        'tip_amount': _f(tip),
+        'tolls_amount': _f(np.where(rng.random(n) < 0.05, 6.94, 0.0)),
+        'improvement_surcharge': _f(np.full(n, 1.0)),
+        'total_amount': _f(np.round(fare + tip + 2.0, 2)),
+        'congestion_surcharge': _f(np.where(rng.random(n) < 0.9, 2.5, 0.0), nulls),
+    }
+    if service == 'yellow':
+        cols['Airport_fee'] = _f(np.where(rng.random(n) < 0.08, 1.75, 0.0), nulls)
+    else:
+        cols['ehail_fee'] = pa.nulls(n, pa.float64())
+        cols['trip_type'] = _f(rng.choice([1.0, 2.0], n), nulls)
+    return pa.table(cols)
+
+
+def _fhv_table(rng, year: int, month: int, n: int, misdated_frac: float) -> pa.Table:
+    pickup = _pickups(rng, year, month, n, misdated_frac)
+    loc_nulls = rng.random(n) < 0.2  # muchas filas sin zona en los archivos reales
+    return pa.table({
+        'dispatching_base_num': pa.array(rng.choice(_BASES, n)),
+        'pickup_datetime': pa.array(pickup),
+        'dropOff_datetime': pa.array(_after(rng, pickup, 18.0)),
+        'PUlocationID': _f(rng.integers(1, 266, n).astype('float64'), loc_nulls),
+        'DOlocationID': _f(rng.integers(1, 266, n).astype('float64'), loc_nulls),
+        'SR_Flag': pa.array(np.where(rng.random(n) < 0.02, 1, 0), pa.int32(), mask=rng.random(n) < 0.9),
+        'Affiliated_base_number': pa.array(rng.choice(_BASES, n)),
+    })
+
+
+def _fhvhv_table(rng, year: int, month: int, n: int, misdated_frac: float) -> pa.Table:
+    pickup = _pickups(rng, year, month, n, misdated_frac)
+    wait = (rng.gamma(2.0, 2.5, n) * 60e6).astype('int64').astype('timedelta64[us]')
+    request = pickup - wait
+    dropoff = _after(rng, pickup, 18.0)
+    miles = np.round(rng.gamma(1.8, 2.7, n), 3)
+    seconds = ((dropoff - pickup) / np.timedelta64(1, 's')).astype('int64')
+    fare = np.round(5.0 + miles * 1.9 + seconds / 60 * 0.6, 2)
+    license_num = rng.choice(_HVFHS, n, p=[0.72, 0.27, 0.01])
+
+    def flag(p_yes):
+        return pa.array(np.where(rng.random(n) < p_yes, 'Y', 'N'))
+
+    return pa.table({
+        'hvfhs_license_num': pa.array(license_num),
+        'dispatching_base_num': pa.array(rng.choice(_BASES, n)),
+        'originating_base_num': pa.array(rng.choice(_BASES, n), mask=rng.random(n) < 0.25),
+        'request_datetime': pa.array(request),
+        'on_scene_datetime': pa.array(request + wait // 2, mask=license_num != 'HV0003'),
+        'pickup_datetime': pa.array(pickup),
+        'dropoff_datetime': pa.array(dropoff),
+        'PULocationID': pa.array(rng.integers(1, 266, n), pa.int64()),
+        'DOLocationID': pa.array(rng.integers(1, 266, n), pa.int64()),
+        'trip_miles': _f(miles),
+        'trip_time': pa.array(seconds, pa.int64()),
+        'base_passenger_fare': _f(fare),
+        'tolls': _f(np.where(rng.random(n) < 0.06, 6.94, 0.0)),
+        'bcf': _f(np.round(fare * 0.0275, 2)),
+        'sales_tax': _f(np.round(fare * 0.08875, 2)),
+        'congestion_surcharge': _f(np.where(rng.random(n) < 0.6, 2.75, 0.0)),
+        'airport_fee': _f(np.where(rng.random(n) < 0.05, 2.5, 0.0)),
+        'tips': _f(np.round(np.where(rng.random(n) < 0.2, fare * 0.15, 0.0), 2)),
+        'driver_pay': _f(np.round(fare * 0.75, 2)),
+        'shared_request_flag': flag(0.01),
+        'shared_match_flag': flag(0.005),
+        'access_a_ride_flag': pa.array(np.where(rng.random(n) < 0.01, 'Y', ' ')),
+        'wav_request_flag': flag(0.002),
+        'wav_match_flag': flag(0.05),
+    })
+
+
+def write_sample_trips(path: str, service: str, year: int, month: int, rows: int,
+                       row_group_size: int = 1_000_000, **kwargs) -> str:
+    """Escribe un Parquet sintético de `rows` filas (zstd, como los de TLC) y devuelve la ruta."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tbl = sample_trips_table(service, year, month, rows, **kwargs)
+    tmp = path + '.tmp'
+    pq.write_table(tbl, tmp, row_group_size=row_group_size, compression='zstd')
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,175 @@
+"""
+Registro de esquemas de las tablas destino: aplica solo la DDL que falta.
+
+- Cada tabla se declara como {columna: tipo} (p.ej. `ddl_column_types(YELLOW_DDL)`).
+- `ensure(conn, table, columns)`:
+    1. Si la huella (sha de las columnas declaradas) coincide con la última
+       aplicada para db.schema.tabla (memoria del proceso o
+       `.cache/schema_registry.json`), no hace ningún round trip.
+    2. Si no, lee `information_schema.columns` del schema en una sola consulta
+       (todas las tablas a la vez), crea la tabla si no existe o agrega en un
+       único ALTER solo las columnas que faltan, y guarda la huella.
+- `extend(conn, table, columns)`: columnas nuevas detectadas en el Parquet de
+  origen (drift) -> ALTER solo de las que la tabla todavía no tiene.
+Con `refresh=True` se ignora la huella cacheada y se vuelve a introspeccionar
+(p.ej. si alguien borró o recreó la tabla a mano).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def default_cache_path() -> str:
+    try:
+        from mage_ai.settings.repo import get_repo_path
+        base = get_repo_path()
+    except Exception:
+        base = os.getcwd()
+    return os.path.join(base, '.cache', 'schema_registry.json')
+
+
+def fingerprint(columns: Dict[str, str]) -> str:
+    body = ','.join(f'{c.lower()}:{t.lower()}' for c, t in sorted(columns.items()))
+    return hashlib.sha256(body.encode()).hexdigest()[:16]
+
+
+class SchemaRegistry:
+    def __init__(self, db: str, schema: str, cache_path: Optional[str] = None, use_cache: bool = True):
+        self.db = db
+        self.schema = schema
+        self.cache_path = cache_path or default_cache_path()
+        self.use_cache = bool(use_cache)
+        self._lock = threading.Lock()
+        self._live: Optional[Dict[str, Dict[str, str]]] = None  # tabla -> {columna: tipo} introspectado
+        self._cache = self._load_cache() if self.use_cache else {}
+        self.metrics = {'introspections': 0, 'creates': 0, 'alters': 0, 'columns_added': 0, 'cache_hits': 0}
+
+    # ---------- cache de huellas ----------
+    def _fq(self, table: str) -> str:
+        return f'{self.db}.{self.schema}.{table}'
+
+    def _cache_key(self, table: str) -> str:
+        return self._fq(table).lower()
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self) -> None:
+        if not self.use_cache:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        # otros procesos pueden haber registrado otras tablas: se fusiona antes de escribir
+        merged = {**self._load_cache(), **self._cache}
+        tmp = f'{self.cache_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(merged, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.cache_path)
+
+    def _remember(self, table: str, declared: Dict[str, str], live: Dict[str, str]) -> None:
+        self._cache[self._cache_key(table)] = {
+            'fingerprint': fingerprint(declared),
+            'columns': sorted(live),
+            'checked_at': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()),
+        }
+
+    def known_columns(self, table: str) -> List[str]:
+        """Columnas que la tabla tiene según el registro (sin round trip)."""
+        with self._lock:
+            if self._live is not None and table.lower() in self._live:
+                return list(self._live[table.lower()])
+            return list(self._cache.get(self._cache_key(table), {}).get('columns', []))
+
+    # ---------- introspección ----------
+    def _introspect(self, conn) -> Dict[str, Dict[str, str]]:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"select table_name, column_name, data_type from {self.db}.information_schema.columns "
+                "where table_schema = %s",
+                (self.schema.upper(),),
+            )
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+        live: Dict[str, Dict[str, str]] = {}
+        for table, col, typ in rows:
+            live.setdefault(str(table).lower(), {})[str(col).lower()] = str(typ).lower()
+        self.metrics['introspections'] += 1
+        return live
+
+    def _live_tables(self, conn, refresh: bool) -> Dict[str, Dict[str, str]]:
+        if self._live is None or refresh:
+            self._live = self._introspect(conn)
+        return self._live
+
+    def _apply(self, conn, table: str, columns: Dict[str, str], live: Dict[str, Dict[str, str]]) -> List[str]:
+        current = live.get(table.lower())
+        cur = conn.cursor()
+        try:
+            if current is None:
+                cols = ',\n    '.join(f'{c} {t}' for c, t in columns.items())
+                cur.execute(f"create table if not exists {self._fq(table)} (\n    {cols}\n)")
+                live[table.lower()] = {c: t for c, t in columns.items()}
+                self.metrics['creates'] += 1
+                print(f"[schema] {self._fq(table)}: creada ({len(columns)} columnas)")
+                return list(columns)
+            missing = {c: t for c, t in columns.items() if c.lower() not in current}
+            if missing:
+                cur.execute(f"alter table {self._fq(table)} add column "
+                            + ', '.join(f'{c} {t}' for c, t in missing.items()))
+                current.update(missing)
+                self.metrics['alters'] += 1
+                self.metrics['columns_added'] += len(missing)
+                print(f"[schema] {self._fq(table)}: + {', '.join(missing)}")
+            return list(missing)
+        finally:
+            cur.close()
+
+    # ---------- API ----------
+    def ensure(self, conn, table: str, columns: Dict[str, str], refresh: bool = False) -> List[str]:
+        """Deja `table` con al menos `columns`. Devuelve las columnas agregadas."""
+        with self._lock:
+            entry = self._cache.get(self._cache_key(table))
+            if not refresh and entry and entry.get('fingerprint') == fingerprint(columns):
+                self.metrics['cache_hits'] += 1
+                return []
+            live = self._live_tables(conn, refresh)
+            added = self._apply(conn, table, columns, live)
+            self._remember(table, columns, live[table.lower()])
+            self._save_cache()
+            return added
+
+    def extend(self, conn, table: str, columns: Dict[str, str]) -> List[str]:
+        """Agrega columnas nuevas (drift del origen) que la tabla no tenga todavía."""
+        known = set(self.known_columns(table))
+        if known and all(c.lower() in known for c in columns):
+            return []
+        with self._lock:
+            live = self._live_tables(conn, False)
+            added = self._apply(conn, table, columns, live)
+            if added:
+                entry = self._cache.setdefault(self._cache_key(table), {})
+                entry['columns'] = sorted(live[table.lower()])
+                self._save_cache()
+            return added
+
+
+# ===================== Registro del proceso =====================
+_REGISTRIES: Dict[tuple, SchemaRegistry] = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def get_registry(db: str, schema: str) -> SchemaRegistry:
+    """Registro compartido por proceso para db.schema (la introspección se hace una vez)."""
+    key = (db.lower(), schema.lower())
+    with _REGISTRIES_LOCK:
+        if key not in _REGISTRIES:
+            _REGISTRIES[key] = SchemaRegistry(db, schema)
+        return _REGISTRIES[key]
@@ -0,0 +1,209 @@
+"""
+Pool de conexiones Snowflake compartido por todos los bloques de Mage.
+
+- Una sola definición de la conexión (secretos SNOWFLAKE_*), con
+  `client_session_keep_alive=True` para que las sesiones ociosas no expiren
+  entre ejecuciones de bloques (el kernel de Mage mantiene vivo el proceso).
+- Sesiones por schema: `acquire(schema)` reutiliza una conexión ociosa de ese
+  schema (RAW, SILVER, ...) o abre una nueva. La conexión entregada es un proxy:
+  `close()` la devuelve al pool en vez de cerrarla, así que el código que ya
+  hacía `conn.close()` (y `run_partitions`) funciona sin cambios.
+- Health check al reutilizar: si está cerrada se descarta; si estuvo ociosa más
+  de `check_after_s` se valida con `select 1` antes de entregarla.
+- `ensure_once(conn, key, fn)`: DDL/ALTER idempotentes una sola vez por proceso.
+- `stats()`: conexiones abiertas / reutilizadas / descartadas y tiempo de apertura.
+Cada conexión entregada es de uso exclusivo de quien la pidió hasta devolverla.
+"""
+import atexit
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import snowflake.connector
+from mage_ai.data_preparation.shared.secrets import get_secret_value
+
+
+def connect(schema: Optional[str] = None, **overrides):
+    """Conexión nueva (sin pool) con los secretos del proyecto."""
+    params = dict(
+        account=get_secret_value('SNOWFLAKE_ACCOUNT'),
+        user=get_secret_value('SNOWFLAKE_USER'),
+        password=get_secret_value('SNOWFLAKE_PASSWORD'),
+        role=get_secret_value('SNOWFLAKE_ROLE'),
+        warehouse=get_secret_value('SNOWFLAKE_WAREHOUSE'),
+        database=get_secret_value('SNOWFLAKE_DATABASE'),
+        schema=schema or get_secret_value('SNOWFLAKE_SCHEMA_RAW'),
+        client_session_keep_alive=True,
+        ocsp_fail_open=True,
+        insecure_mode=True,
+    )
+    params.update(overrides)
+    return snowflake.connector.connect(**params)
+
+
+class PooledConnection:
+    """Proxy de una conexión del pool: `close()` la devuelve en vez de cerrarla."""
+
+    def __init__(self, pool: 'SnowflakePool', schema: str, conn):
+        self._pool = pool
+        self._schema = schema
+        self._conn = conn
+        self._released = False
+
+    @property
+    def raw(self):
+        return self._conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self) -> None:
+        if not self._released:
+            self._released = True
+            self._pool._release(self._schema, self._conn)
+
+    def discard(self) -> None:
+        """Cierra de verdad la conexión (p.ej. tras un error de red)."""
+        if not self._released:
+            self._released = True
+            self._pool._discard(self._conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SnowflakePool:
+    def __init__(self, connect_fn: Callable = connect, max_idle_per_schema: int = 4,
+                 check_after_s: float = 300):
+        self._connect = connect_fn
+        self.max_idle = int(max_idle_per_schema)
+        self.check_after_s = float(check_after_s)
+        self._idle: Dict[str, List[Tuple[object, float]]] = {}  # schema -> [(conn, ociosa_desde)]
+        self._lock = threading.Lock()
+        self.metrics = {'opened': 0, 'reused': 0, 'discarded': 0, 'health_checks': 0, 'open_seconds': 0.0}
+
+    # ---------- helpers ----------
+    def _healthy(self, conn, idle_since: float) -> bool:
+        try:
+            if getattr(conn, 'is_closed', None) and conn.is_closed():
+                return False
+            if time.time() - idle_since < self.check_after_s:
+                return True
+            with self._lock:
+                self.metrics['health_checks'] += 1
+            cur = conn.cursor()
+            try:
+                cur.execute('select 1')
+                cur.fetchone()
+            finally:
+                cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _release(self, schema: str, conn) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(schema, [])
+            if len(idle) < self.max_idle:
+                idle.append((conn, time.time()))
+                return
+        self._discard(conn)
+
+    def _discard(self, conn) -> None:
+        with self._lock:
+            self.metrics['discarded'] += 1
+        try: conn.close()
+        except Exception: pass
+
+    # ---------- API ----------
+    def acquire(self, schema: Optional[str] = None) -> PooledConnection:
+        schema = (schema or get_secret_value('SNOWFLAKE_SCHEMA_RAW')).upper()
+        while True:
+            with self._lock:
+                idle = self._idle.get(schema)
+                entry = idle.pop() if idle else None
+            if entry is None:
+                break
+            conn, idle_since = entry
+            if self._healthy(conn, idle_since):
+                with self._lock:
+                    self.metrics['reused'] += 1
+                return PooledConnection(self, schema, conn)
+            self._discard(conn)
+
+        t0 = time.perf_counter()
+        conn = self._connect(schema)
+        dt = time.perf_counter() - t0
+        with self._lock:
+            self.metrics['opened'] += 1
+            self.metrics['open_seconds'] += dt
+        print(f"[sf_pool] Nueva sesión {schema} en {dt:.2f}s")
+        return PooledConnection(self, schema, conn)
+
+    def factory(self, schema: Optional[str] = None) -> Callable[[], PooledConnection]:
+        """conn_factory para `run_partitions` y los bloques que aceptan uno."""
+        return lambda: self.acquire(schema)
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                try: conn.close()
+                except Exception: pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.metrics)
+            out['idle'] = sum(len(v) for v in self._idle.values())
+        out['open_seconds'] = round(out['open_seconds'], 2)
+        out['avg_open_s'] = round(out['open_seconds'] / out['opened'], 3) if out['opened'] else None
+        return out
+
+    def log_stats(self, prefix: str = '[sf_pool]') -> None:
+        st = self.stats()
+        print(f"{prefix} abiertas={st['opened']} ({st['open_seconds']}s, prom {st['avg_open_s']}s) | "
+              f"reutilizadas={st['reused']} | descartadas={st['discarded']} | ociosas={st['idle']}")
+
+
+# ===================== DDL una vez por proceso =====================
+_DDL_DONE = set()
+_DDL_LOCK = threading.Lock()
+
+
+def ensure_once(conn, key: str, fn: Callable) -> bool:
+    """
+    Ejecuta `fn(conn)` (CREATE/ALTER idempotentes) solo la primera vez que se
+    pide `key` en este proceso. Devuelve True si lo ejecutó. Si `fn` falla no
+    se marca, así que el próximo intento lo vuelve a correr.
+    """
+    with _DDL_LOCK:
+        if key in _DDL_DONE:
+            return False
+        fn(conn)
+        _DDL_DONE.add(key)
+        return True
+
+
+def reset_ddl(prefix: str = '') -> None:
+    """Olvida las DDL ya ejecutadas (todas o las de claves con `prefix`)."""
+    with _DDL_LOCK:
+        for key in [k for k in _DDL_DONE if k.startswith(prefix)]:
+            _DDL_DONE.discard(key)
+
+
+# ===================== Pool del proceso =====================
+_POOL: Optional[SnowflakePool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> SnowflakePool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = SnowflakePool()
+            atexit.register(_POOL.close_all)
+        return _POOL
@@ -0,0 +1,136 @@
+"""
+Pipeline de etapas productor/consumidor con colas acotadas.
+
+Cada etapa es una función `fn(item) -> iterable` que corre en su propio hilo y
+se conecta con la siguiente mediante una `queue.Queue(maxsize=queue_size)`.
+Cuando una cola se llena, la etapa productora se bloquea (backpressure), así
+que la memoria queda acotada a ~queue_size elementos por etapa.
+
+La última etapa la consume quien itera `run()` (en el hilo que llama), lo que
+permite que la subida use la conexión del worker sin compartirla entre hilos.
+
+Si una etapa falla con un item, se emite un `StageFailure` hacia abajo (las
+etapas siguientes lo dejan pasar) y el pipeline continúa con el siguiente item.
+"""
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+_DONE = object()
+
+
+class StageFailure:
+    """Marcador de error de una etapa para un item concreto."""
+
+    def __init__(self, stage: str, item: Any, error: BaseException):
+        self.stage = stage
+        self.item = item
+        self.error = error
+
+    def __repr__(self):
+        return f"StageFailure(stage={self.stage!r}, error={type(self.error).__name__}: {self.error})"
+
+
+def _apply(name: str, fn: Callable[[Any], Iterable[Any]], items: Iterable[Any]) -> Iterator[Any]:
+    for item in items:
+        if isinstance(item, StageFailure):
+            yield item
+            continue
+        try:
+            for out in fn(item):
+                yield out
+        except Exception as e:
+            yield StageFailure(name, item, e)
+
+
+class StagePipeline:
+    """
+    stages: [(nombre, fn), ...] en orden. fn(item) devuelve un iterable de salidas.
+    queue_size: capacidad de cada cola entre etapas (backpressure).
+    threaded: False ejecuta todo en el hilo actual (modo secuencial, mismo código).
+    discard: callback opcional para items que quedan en cola si se aborta (limpieza).
+    """
+
+    def __init__(
+        self,
+        stages: List[Tuple[str, Callable[[Any], Iterable[Any]]]],
+        queue_size: int = 2,
+        threaded: bool = True,
+        discard: Optional[Callable[[Any], None]] = None,
+    ):
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+        self.threaded = threaded
+        self.discard = discard
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        if not self.threaded:
+            stream = iter(items)
+            for name, fn in self.stages:
+                stream = _apply(name, fn, stream)
+            yield from stream
+            return
+
+        stop = threading.Event()
+        queues: List[queue.Queue] = []
+        threads: List[threading.Thread] = []
+
+        def _put(q: queue.Queue, obj: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(obj, timeout=0.2)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _iter_queue(q: queue.Queue) -> Iterator[Any]:
+            while True:
+                try:
+                    obj = q.get(timeout=0.2)
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+                    continue
+                if obj is _DONE:
+                    return
+                yield obj
+
+        def _worker(name, fn, src: Iterable[Any], dst: queue.Queue):
+            try:
+                for out in _apply(name, fn, src):
+                    if not _put(dst, out):
+                        if self.discard is not None and not isinstance(out, StageFailure):
+                            self.discard(out)
+                        return
+            except Exception as e:
+                # error en la fuente misma (p.ej. el iterable de entrada)
+                _put(dst, StageFailure(name, None, e))
+            finally:
+                _put(dst, _DONE)
+
+        src: Iterable[Any] = items
+        for name, fn in self.stages:
+            q = queue.Queue(maxsize=self.queue_size)
+            t = threading.Thread(target=_worker, args=(name, fn, src, q), name=f'stage-{name}', daemon=True)
+            queues.append(q)
+            threads.append(t)
+            src = _iter_queue(q)
+
+        for t in threads:
+            t.start()
+        try:
+            yield from src
+        finally:
+            stop.set()
+            for t in threads:
+                t.join(timeout=5)
+            if self.discard is not None:
+                for q in queues:
+                    while True:
+                        try:
+                            obj = q.get_nowait()
+                        except queue.Empty:
+                            break
+                        if obj is not _DONE and not isinstance(obj, StageFailure):
+                            self.discard(obj)
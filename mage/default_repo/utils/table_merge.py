@@ -0,0 +1,81 @@
+"""
+Upsert set-based de tablas chicas (auditoría / cobertura) con MERGE.
+
+En vez de `DELETE ... where (k1,k2,k3) in (<una tupla formateada por clave>)`
+o `TRUNCATE` + `write_pandas`, cada DataFrame se sube una sola vez a una tabla
+temporal de la sesión (`<tabla>__stage`) y después, en una única transacción:
+  merge into <tabla> t using <tabla>__stage s on <claves>
+    when matched then update set ...
+    when not matched then insert ...
+  [delete from <tabla> t where not exists (clave en stage)]   -- solo con replace=True
+Cada tabla se describe con un dict:
+  {'table': str, 'df': DataFrame, 'columns': {columna: tipo}, 'keys': [..],
+   'replace': bool (default False -> no borra claves ausentes de `df`)}
+Si cualquiera de los MERGE falla se hace rollback de todos: ninguna tabla queda
+a medio actualizar respecto de la otra.
+`writer` sube los stages (default write_pandas; `Warehouse.write_pandas` de
+utils/warehouse para DuckDB).
+"""
+from typing import Dict, List, Sequence
+
+import pandas as pd
+from snowflake.connector.pandas_tools import write_pandas
+
+
+def stage_name(table: str) -> str:
+    return f'{table}__stage'
+
+
+def merge_sql(fq_table: str, fq_stage: str, columns: Sequence[str], keys: Sequence[str]) -> str:
+    on = ' and '.join(f't.{k} = s.{k}' for k in keys)
+    updates = ', '.join(f'{c} = s.{c}' for c in columns if c not in keys)
+    cols = ', '.join(columns)
+    vals = ', '.join(f's.{c}' for c in columns)
+    return (f"merge into {fq_table} t using {fq_stage} s on {on}\n"
+            f"when matched then update set {updates}\n"
+            f"when not matched then insert ({cols}) values ({vals})")
+
+
+def delete_missing_sql(fq_table: str, fq_stage: str, keys: Sequence[str]) -> str:
+    on = ' and '.join(f't.{k} = s.{k}' for k in keys)
+    return f"delete from {fq_table} t where not exists (select 1 from {fq_stage} s where {on})"
+
+
+def _stage(conn, cur, db: str, schema: str, spec: dict, writer=write_pandas) -> str:
+    name = stage_name(spec['table'])
+    columns = spec['columns']
+    cur.execute(f"create or replace temporary table {db}.{schema}.{name} ("
+                + ', '.join(f'{c} {t}' for c, t in columns.items()) + ")")
+    if not spec['df'].empty:
+        writer(conn, spec['df'][list(columns)], table_name=name, database=db, schema=schema,
+                     quote_identifiers=False, chunk_size=100_000)
+    return f'{db}.{schema}.{name}'
+
+
+def merge_frames(conn, db: str, schema: str, specs: List[dict], writer=write_pandas) -> Dict[str, int]:
+    """Sube cada `df` a su stage y aplica todos los MERGE en una transacción."""
+    cur = conn.cursor()
+    staged = []
+    try:
+        for spec in specs:
+            staged.append(_stage(conn, cur, db, schema, spec, writer))
+        out = {}
+        cur.execute("begin")
+        try:
+            for spec, fq_stage in zip(specs, staged):
+                fq_table = '.'.join((db, schema, spec['table']))
+                cur.execute(merge_sql(fq_table, fq_stage, list(spec['columns']), spec['keys']))
+                out[spec['table']] = len(spec['df'])
+                if spec.get('replace'):
+                    cur.execute(delete_missing_sql(fq_table, fq_stage, spec['keys']))
+            cur.execute("commit")
+        except Exception:
+            try: cur.execute("rollback")
+            except Exception: pass
+            raise
+        return out
+    finally:
+        for fq_stage in staged:
+            try: cur.execute(f"drop table if exists {fq_stage}")
+            except Exception: pass
+        cur.close()
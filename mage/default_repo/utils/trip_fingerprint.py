@@ -0,0 +1,92 @@
+"""
+Huella de viaje (`trip_fp`) calculada en la carga a BRONZE.
+
+Un hash binario de 16 bytes sobre las columnas que identifican un viaje en cada
+servicio (`TripService.key_cols`: vendor, pickup/dropoff, zonas, pago, tarifa,
+distancia, monto). fct_trips la usa como clave de dedup y como `trip_sk`, así
+que dbt ya no ordena ni hashea diez columnas por fila.
+
+- Vectorizado en numpy: cada columna se lleva a uint64 (enteros tal cual,
+  floats por sus bits con -0.0 = 0.0, timestamps en microsegundos, strings por
+  un blake2b de cada valor distinto del diccionario) y se mezcla en dos
+  carriles de 64 bits con el finalizador de splitmix64.
+- Los nulls se mezclan con un marcador propio: null y 0 dan huellas distintas.
+- La semilla es el servicio, así que la huella es única entre tablas.
+La huella depende de los valores ya casteados a los tipos de la DDL: el path
+Arrow y el pandas de copy_into_bronze calculan la misma.
+"""
+import hashlib
+from typing import Dict, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+FINGERPRINT_COL = 'trip_fp'
+FINGERPRINT_BYTES = 16
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_NULL = np.uint64(0xA5A5A5A5A5A5A5A5)
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+
+
+def _seed(text: str) -> np.uint64:
+    return np.uint64(int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little'))
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """Finalizador de splitmix64 (en uint64 la multiplicación da la vuelta)."""
+    h = (h ^ (h >> np.uint64(30))) * _M1
+    h = (h ^ (h >> np.uint64(27))) * _M2
+    return h ^ (h >> np.uint64(31))
+
+
+def _as_uint64(arr) -> np.ndarray:
+    """Valores de la columna como uint64 (los nulls quedan en 0; el marcador va aparte)."""
+    typ = arr.type
+    if pa.types.is_dictionary(typ):
+        arr = arr.cast(typ.value_type)
+        typ = arr.type
+    if pa.types.is_string(typ) or pa.types.is_large_string(typ) or pa.types.is_binary(typ):
+        enc = arr.dictionary_encode()
+        codes = np.array([int.from_bytes(hashlib.blake2b(str(v).encode(), digest_size=8).digest(), 'little')
+                          for v in enc.dictionary.to_pylist()], dtype=np.uint64)
+        idx = enc.indices.fill_null(0).to_numpy(zero_copy_only=False)
+        return codes[idx] if len(codes) else np.zeros(len(arr), dtype=np.uint64)
+    if pa.types.is_timestamp(typ):
+        arr = arr.cast(pa.timestamp('us'), safe=False).cast(pa.int64())
+    elif pa.types.is_floating(typ):
+        arr = pc.add(arr.cast(pa.float64()), 0.0)  # -0.0 + 0.0 = 0.0
+        return arr.fill_null(0.0).to_numpy(zero_copy_only=False).view(np.uint64)
+    elif pa.types.is_boolean(typ):
+        arr = arr.cast(pa.int64())
+    return arr.cast(pa.int64()).fill_null(0).to_numpy(zero_copy_only=False).view(np.uint64)
+
+
+def trip_fingerprint(columns: Dict[str, pa.Array], key_cols: Sequence[str], service: str) -> pa.Array:
+    """
+    Huella binaria (16 bytes) por fila de las `key_cols` de `columns` (arrays
+    ya casteados a la DDL). Una columna que falta cuenta como toda null.
+    """
+    n = len(next(iter(columns.values()))) if columns else 0
+    h1 = np.full(n, _seed(f'{service}:1'), dtype=np.uint64)
+    h2 = np.full(n, _seed(f'{service}:2'), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for i, col in enumerate(key_cols):
+            arr = columns.get(col)
+            if arr is None:
+                values, nulls = np.zeros(n, dtype=np.uint64), np.ones(n, dtype=bool)
+            else:
+                if isinstance(arr, pa.ChunkedArray):
+                    arr = arr.combine_chunks()
+                values = _as_uint64(arr)
+                nulls = arr.is_null().to_numpy(zero_copy_only=False)
+            values = np.where(nulls, _NULL, values)
+            salt = np.uint64(i + 1) * _GOLDEN
+            h1 = _mix(h1 ^ (values + salt))
+            h2 = _mix((h2 + salt) ^ _mix(values ^ h1))
+    raw = np.empty((n, 2), dtype='>u8')
+    raw[:, 0], raw[:, 1] = h1, h2
+    fixed = pa.FixedSizeBinaryArray.from_buffers(pa.binary(FINGERPRINT_BYTES), n, [None, pa.py_buffer(raw.tobytes())])
+    return fixed.cast(pa.binary())
@@ -0,0 +1,222 @@
+"""
+Registro de servicios de TLC que carga el pipeline.
+
+Cada servicio declara su tabla BRONZE (DDL), las columnas de datos, los campos
+de timestamp, las columnas que identifican un viaje (huella `trip_fp`), el
+modelo dbt de staging y el tamaño de batch por defecto en modo no adaptativo.
+Los bloques (generate_months, copy_into_bronze, sync_coverage_to_audit_py,
+update_coverage) iteran sobre este registro en vez de tener
+`['yellow','green']` fijo; agregar un servicio es agregar una entrada acá + su
+modelo `stg_<servicio>.sql`.
+  - yellow / green: taxis (tpep_* / lpep_*).
+  - fhv:   For-Hire Vehicles (bases de despacho), pocas columnas.
+  - fhvhv: High-Volume FHV (Uber, Lyft, ...); los archivos mensuales son varias
+           veces más grandes que los de yellow.
+La malla por defecto (DEFAULT_SERVICES) sigue siendo yellow + green; fhv/fhvhv
+se piden explícitamente con el kwarg `services`.
+"""
+from functools import cached_property
+from typing import Dict, List
+
+from default_repo.utils.arrow_normalize import META_TYPES, ddl_column_types
+from default_repo.utils.trip_fingerprint import FINGERPRINT_COL
+
+# ===================== DDL BRONZE (ingest_ts como STRING) =====================
+YELLOW_DDL = """
+create table if not exists {db}.{schema}.yellow_trips (
+    vendorid integer,
+    tpep_pickup_datetime timestamp,
+    tpep_dropoff_datetime timestamp,
+    passenger_count integer,
+    trip_distance float,
+    ratecodeid integer,
+    store_and_fwd_flag string,
+    pulocationid integer,
+    dolocationid integer,
+    payment_type integer,
+    fare_amount float,
+    extra float,
+    mta_tax float,
+    tip_amount float,
+    tolls_amount float,
+    improvement_surcharge float,
+    total_amount float,
+    congestion_surcharge float,
+    airport_fee float,
+    cbd_congestion_fee float,
+    trip_fp binary,      -- huella del viaje (utils/trip_fingerprint)
+    -- metadatos
+    run_id string,
+    ingest_ts string,    -- ISO string
+    year int,
+    month int,
+    service_type string,
+    source_url string
+);
+"""
+
+GREEN_DDL = """
+create table if not exists {db}.{schema}.green_trips (
+    vendorid integer,
+    lpep_pickup_datetime timestamp,
+    lpep_dropoff_datetime timestamp,
+    passenger_count integer,
+    trip_distance float,
+    ratecodeid integer,
+    store_and_fwd_flag string,
+    pulocationid integer,
+    dolocationid integer,
+    payment_type integer,
+    fare_amount float,
+    extra float,
+    mta_tax float,
+    tip_amount float,
+    tolls_amount float,
+    improvement_surcharge float,
+    total_amount float,
+    congestion_surcharge float,
+    trip_type integer,
+    cbd_congestion_fee float,
+    ehail_fee float,
+    trip_fp binary,      -- huella del viaje (utils/trip_fingerprint)
+    -- metadatos
+    run_id string,
+    ingest_ts string,    -- ISO string
+    year int,
+    month int,
+    service_type string,
+    source_url string
+);
+"""
+
+FHV_DDL = """
+create table if not exists {db}.{schema}.fhv_trips (
+    dispatching_base_num string,
+    pickup_datetime timestamp,
+    dropoff_datetime timestamp,      -- dropOff_datetime en el Parquet
+    pulocationid integer,            -- PUlocationID (double en el Parquet)
+    dolocationid integer,
+    sr_flag integer,                 -- 1 = viaje compartido
+    affiliated_base_number string,
+    trip_fp binary,      -- huella del viaje (utils/trip_fingerprint)
+    -- metadatos
+    run_id string,
+    ingest_ts string,    -- ISO string
+    year int,
+    month int,
+    service_type string,
+    source_url string
+);
+"""
+
+FHVHV_DDL = """
+create table if not exists {db}.{schema}.fhvhv_trips (
+    hvfhs_license_num string,        -- HV0003 Uber, HV0005 Lyft, ...
+    dispatching_base_num string,
+    originating_base_num string,
+    request_datetime timestamp,
+    on_scene_datetime timestamp,
+    pickup_datetime timestamp,
+    dropoff_datetime timestamp,
+    pulocationid integer,
+    dolocationid integer,
+    trip_miles float,
+    trip_time integer,               -- segundos
+    base_passenger_fare float,
+    tolls float,
+    bcf float,
+    sales_tax float,
+    congestion_surcharge float,
+    airport_fee float,
+    tips float,
+    driver_pay float,
+    shared_request_flag string,
+    shared_match_flag string,
+    access_a_ride_flag string,
+    wav_request_flag string,
+    wav_match_flag string,
+    cbd_congestion_fee float,
+    trip_fp binary,      -- huella del viaje (utils/trip_fingerprint)
+    -- metadatos
+    run_id string,
+    ingest_ts string,    -- ISO string
+    year int,
+    month int,
+    service_type string,
+    source_url string
+);
+"""
+
+
+class TripService:
+    def __init__(self, name: str, ddl: str, timestamp_cols: List[str], batch_rows: int,
+                 key_cols: List[str], staging_model: str = None):
+        self.name = name
+        self.ddl = ddl
+        self.timestamp_cols = list(timestamp_cols)  # el primero es el pickup
+        self.key_cols = list(key_cols)              # grano de dedup -> trip_fp
+        self.batch_rows = int(batch_rows)           # filas por batch con adaptive_batches=False
+        self.staging_model = staging_model or f'stg_{name}'
+
+    @property
+    def table(self) -> str:
+        return f'{self.name}_trips'
+
+    @cached_property
+    def column_types(self) -> Dict[str, str]:
+        """{columna: tipo} de la DDL completa (datos + metadatos), en orden. Se parsea una
+        vez por servicio y se comparte: quien lo extienda trabaja sobre una copia (dict(...))."""
+        return ddl_column_types(self.ddl)
+
+    @cached_property
+    def columns(self) -> List[str]:
+        """Columnas de datos (sin metadatos ni trip_fp), en el orden de la DDL."""
+        return [c for c in self.column_types if c not in META_TYPES and c != FINGERPRINT_COL]
+
+    @property
+    def pickup_col(self) -> str:
+        return self.timestamp_cols[0]
+
+    def __repr__(self) -> str:
+        return f"TripService({self.name!r}, table={self.table!r})"
+
+
+# Mismo grano que el dedup original de fct_trips (vendor, tiempos, zonas, pago,
+# tarifa, distancia, monto), en nombres de BRONZE
+_TAXI_KEY = ['vendorid', '{p}_pickup_datetime', '{p}_dropoff_datetime', 'pulocationid', 'dolocationid',
+             'payment_type', 'ratecodeid', 'trip_distance', 'total_amount']
+
+SERVICES: Dict[str, TripService] = {
+    'yellow': TripService('yellow', YELLOW_DDL, ['tpep_pickup_datetime', 'tpep_dropoff_datetime'], 400_000,
+                          [c.format(p='tpep') for c in _TAXI_KEY]),
+    'green':  TripService('green', GREEN_DDL, ['lpep_pickup_datetime', 'lpep_dropoff_datetime'], 600_000,
+                          [c.format(p='lpep') for c in _TAXI_KEY]),
+    'fhv':    TripService('fhv', FHV_DDL, ['pickup_datetime', 'dropoff_datetime'], 1_000_000,
+                          ['dispatching_base_num', 'pickup_datetime', 'dropoff_datetime',
+                           'pulocationid', 'dolocationid']),
+    'fhvhv':  TripService('fhvhv', FHVHV_DDL,
+                          ['pickup_datetime', 'dropoff_datetime', 'request_datetime', 'on_scene_datetime'],
+                          400_000,
+                          ['hvfhs_license_num', 'dispatching_base_num', 'pickup_datetime', 'dropoff_datetime',
+                           'pulocationid', 'dolocationid', 'trip_miles', 'base_passenger_fare']),
+}
+DEFAULT_SERVICES = ['yellow', 'green']
+
+
+def get_service(name: str) -> TripService:
+    try:
+        return SERVICES[str(name).lower()]
+    except KeyError:
+        raise ValueError(f"Servicio desconocido: {name} (registrados: {', '.join(SERVICES)})") from None
+
+
+def resolve_services(services=None) -> List[str]:
+    """Normaliza un kwarg `services` (None -> DEFAULT_SERVICES); falla con servicios desconocidos."""
+    if not services:
+        return list(DEFAULT_SERVICES)
+    if isinstance(services, str):
+        services = [services]
+    unknown = [s for s in services if str(s).lower() not in SERVICES]
+    if unknown:
+        raise ValueError(f"Servicios desconocidos: {', '.join(map(str, unknown))} (registrados: {', '.join(SERVICES)})")
+    return [get_service(s).name for s in services]
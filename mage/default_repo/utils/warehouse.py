@@ -0,0 +1,334 @@
+"""
+Backend del warehouse: Snowflake (producción) o DuckDB local, intercambiables.
+
+`Warehouse` reúne lo que los bloques necesitan de la base:
+  - `database` / `schema(capa)`: base y schemas por capa ('raw', 'silver', 'gold').
+  - `connect(schema)` / `factory(schema)`: conexiones con la interfaz del conector
+    de Snowflake (`cursor()`, `execute(sql, params)` con `%s`, `fetchall()`,
+    `fetch_pandas_all()`, `rowcount`, `close()`).
+  - `write_pandas(conn, df, table_name=, database=, schema=, ...)`: misma firma y
+    retorno (ok, chunks, filas, _) que `snowflake.connector.pandas_tools.write_pandas`.
+  - `stage_backend()` (copy_into), `registry()` (utils/schema_registry),
+    `ensure_once()` (DDL idempotente) y `log_stats()`.
+Implementaciones:
+  - SnowflakeWarehouse: pool compartido (utils/snowflake_pool), write_pandas y stage
+    interno; base y schemas de los secretos SNOWFLAKE_*.
+  - DuckDBWarehouse: un archivo .duckdb; la base es el nombre del archivo (NYC_TLC
+    para `nyc_tlc.duckdb`, el mismo de los targets `duckdb` / `duckdb_gold` de dbt)
+    y los schemas BRONZE / SILVER / GOLD. Cada statement se traduce al dialecto de
+    DuckDB (`to_duckdb_sql`): `%s` -> `?`, tipos de Snowflake en la DDL (number,
+    timestamp_ntz), un solo ADD COLUMN por ALTER, tablas temporales calificadas e
+    `information_schema` sin base; `try_to_timestamp` es una macro de la sesión.
+`get_warehouse(kwargs)` elige el backend con el kwarg `warehouse` ('snowflake' |
+'duckdb', default env WAREHOUSE_BACKEND o 'snowflake') y `duckdb_path` (default env
+DBT_DUCKDB_PATH o `nyc_tlc.duckdb`). Los imports de Snowflake / Mage son perezosos:
+el backend DuckDB no los necesita.
+"""
+import os
+import re
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from default_repo.utils.bulk_load import LocalStageBackend, StageBackend
+from default_repo.utils.schema_registry import SchemaRegistry
+
+BACKENDS = ('snowflake', 'duckdb')
+
+
+class Warehouse:
+    """Interfaz del backend (ver docstring del módulo)."""
+
+    name = ''
+
+    @property
+    def database(self) -> str:
+        raise NotImplementedError
+
+    def schema(self, layer: str = 'raw') -> str:
+        raise NotImplementedError
+
+    def connect(self, schema: Optional[str] = None):
+        raise NotImplementedError
+
+    def factory(self, schema: Optional[str] = None) -> Callable:
+        """conn_factory para `run_partitions` y los bloques que aceptan uno."""
+        return lambda: self.connect(schema)
+
+    def write_pandas(self, conn, df, table_name: str, database: Optional[str] = None,
+                     schema: Optional[str] = None, **kwargs) -> tuple:
+        raise NotImplementedError
+
+    def stage_backend(self, conn, db: str, schema: str) -> StageBackend:
+        raise NotImplementedError
+
+    def registry(self, db: str, schema: str) -> SchemaRegistry:
+        raise NotImplementedError
+
+    def ensure_once(self, conn, key: str, fn: Callable) -> bool:
+        raise NotImplementedError
+
+    def log_stats(self) -> None:
+        """Métricas de conexiones (si el backend las lleva)."""
+
+
+# ===================== Snowflake =====================
+class SnowflakeWarehouse(Warehouse):
+    name = 'snowflake'
+
+    def __init__(self, pool=None):
+        self._pool = pool
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from default_repo.utils.snowflake_pool import get_pool
+            self._pool = get_pool()
+        return self._pool
+
+    @property
+    def database(self) -> str:
+        from mage_ai.data_preparation.shared.secrets import get_secret_value
+        return get_secret_value('SNOWFLAKE_DATABASE')
+
+    def schema(self, layer: str = 'raw') -> str:
+        from mage_ai.data_preparation.shared.secrets import get_secret_value
+        return get_secret_value(f'SNOWFLAKE_SCHEMA_{layer.upper()}')
+
+    def connect(self, schema: Optional[str] = None):
+        return self.pool.acquire(schema)
+
+    def factory(self, schema: Optional[str] = None) -> Callable:
+        return self.pool.factory(schema)
+
+    def write_pandas(self, conn, df, table_name: str, database: Optional[str] = None,
+                     schema: Optional[str] = None, **kwargs) -> tuple:
+        from snowflake.connector.pandas_tools import write_pandas
+        return write_pandas(conn, df, table_name=table_name, database=database, schema=schema, **kwargs)
+
+    def stage_backend(self, conn, db: str, schema: str) -> StageBackend:
+        from default_repo.utils.bulk_load import SnowflakeStageBackend
+        return SnowflakeStageBackend(conn, db, schema)
+
+    def registry(self, db: str, schema: str) -> SchemaRegistry:
+        from default_repo.utils.schema_registry import get_registry
+        return get_registry(db, schema)
+
+    def ensure_once(self, conn, key: str, fn: Callable) -> bool:
+        from default_repo.utils.snowflake_pool import ensure_once
+        return ensure_once(conn, key, fn)
+
+    def log_stats(self) -> None:
+        self.pool.log_stats()
+
+
+# ===================== DuckDB =====================
+_DDL = re.compile(r'^\s*(create|alter)\b', re.I)
+_DML = re.compile(r'^\s*(insert|update|delete|merge)\b', re.I)
+_TYPES = [
+    (re.compile(r'\btimestamp_ntz\b', re.I), 'timestamp'),
+    (re.compile(r'\bnumber\s*\(\s*\d+\s*,\s*0\s*\)', re.I), 'bigint'),
+    (re.compile(r'\bnumber\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)', re.I), r'decimal(\1,\2)'),
+    (re.compile(r'\bnumber\b', re.I), 'bigint'),
+    # FLOAT de Snowflake es de 64 bits; el de DuckDB, de 32
+    (re.compile(r'\bfloat\b', re.I), 'double'),
+]
+_TEMP_TABLE = re.compile(r'\bcreate\s+or\s+replace\s+temporary\s+table\b', re.I)
+_INFO_SCHEMA = re.compile(r'\b\w+\.information_schema\.', re.I)
+_ADD_COLUMNS = re.compile(r'^\s*(alter\s+table\s+\S+\s+add\s+column)\s+(.*)$', re.I | re.S)
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Separa por comas fuera de paréntesis (`a int, b decimal(38,2)` -> 2 partes)."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    return [p for p in parts if p]
+
+
+def to_duckdb_sql(sql: str) -> str:
+    """Traduce un statement escrito para Snowflake al dialecto de DuckDB."""
+    sql = sql.replace('%s', '?')
+    sql = _INFO_SCHEMA.sub('information_schema.', sql)
+    if not _DDL.match(sql):
+        return sql
+    for pattern, repl in _TYPES:
+        sql = pattern.sub(repl, sql)
+    # DuckDB no acepta temporales calificadas con db.schema: tabla común (table_merge la borra)
+    sql = _TEMP_TABLE.sub('create or replace table', sql)
+    m = _ADD_COLUMNS.match(sql)
+    if m:
+        sql = '; '.join(f'{m.group(1)} {col}' for col in _split_top_level(m.group(2)))
+    return sql
+
+
+class DuckDBCursor:
+    """Cursor sobre la conexión DuckDB con la interfaz del conector de Snowflake."""
+
+    def __init__(self, con):
+        self._con = con
+        self.rowcount = -1
+
+    def execute(self, sql: str, params=None):
+        if params is None:
+            self._con.execute(to_duckdb_sql(sql))
+        else:
+            self._con.execute(to_duckdb_sql(sql), list(params))
+        self.rowcount = -1
+        if _DML.match(sql):
+            # DuckDB devuelve una fila con las filas afectadas
+            row = self._con.fetchone()
+            self.rowcount = int(row[0]) if row else 0
+        return self
+
+    def fetchone(self):
+        return self._con.fetchone()
+
+    def fetchall(self):
+        return self._con.fetchall()
+
+    def fetch_pandas_all(self):
+        return self._con.df()
+
+    def close(self) -> None:
+        pass  # comparte la conexión: se cierra con ella
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DuckDBConnection:
+    """
+    Conexión DuckDB propia de quien la pidió. `cursor()` comparte la sesión (un
+    begin/commit cubre todo lo ejecutado con cualquiera de sus cursores); el
+    resto de atributos (`execute`, `register`, ...) son los de DuckDB.
+    """
+
+    def __init__(self, con):
+        self._con = con
+        self._closed = False
+
+    @property
+    def raw(self):
+        return self._con
+
+    def __getattr__(self, name):
+        return getattr(self._con, name)
+
+    def cursor(self) -> DuckDBCursor:
+        return DuckDBCursor(self._con)
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._con.close()
+
+    discard = close
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DuckDBWarehouse(Warehouse):
+    name = 'duckdb'
+    SCHEMAS = {'raw': 'BRONZE', 'silver': 'SILVER', 'gold': 'GOLD'}
+
+    def __init__(self, path: Optional[str] = None, stage_dir: Optional[str] = None):
+        from default_repo.utils.local_warehouse import DB_FILE
+        self.path = os.path.abspath(path or os.environ.get('DBT_DUCKDB_PATH') or DB_FILE)
+        self.stage_dir = stage_dir or os.path.join(os.path.dirname(self.path), 'bronze_stage')
+        self._registries: Dict[tuple, SchemaRegistry] = {}
+        self._lock = threading.Lock()
+        self.metrics = {'opened': 0}
+
+    @property
+    def database(self) -> str:
+        # DuckDB nombra la base como el archivo: nyc_tlc.duckdb -> NYC_TLC
+        return os.path.splitext(os.path.basename(self.path))[0].upper()
+
+    def schema(self, layer: str = 'raw') -> str:
+        return self.SCHEMAS[layer.lower()]
+
+    def connect(self, schema: Optional[str] = None) -> DuckDBConnection:
+        """
+        Conexión nueva al archivo (las de un mismo proceso comparten la base).
+        Se cierra de verdad al terminar: dbt corre en otro proceso y necesita el lock.
+        """
+        import duckdb
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        schema = (schema or self.schema('raw')).upper()
+        con = duckdb.connect(self.path)
+        for sch in {*self.SCHEMAS.values(), schema}:
+            con.execute(f"create schema if not exists {sch}")
+        con.execute(f"use {self.database}.{schema}")
+        con.execute("create or replace temp macro try_to_timestamp(x) as try_cast(x as timestamp)")
+        with self._lock:
+            self.metrics['opened'] += 1
+        return DuckDBConnection(con)
+
+    def write_pandas(self, conn, df, table_name: str, database: Optional[str] = None,
+                     schema: Optional[str] = None, **kwargs) -> tuple:
+        """INSERT BY NAME desde el DataFrame registrado (chunk_size / use_logical_type no aplican)."""
+        con = getattr(conn, 'raw', conn)
+        fq = '.'.join(p for p in (database or self.database, schema or self.schema('raw'), table_name))
+        view = f'__wp_{uuid.uuid4().hex}'
+        con.register(view, df)
+        try:
+            con.execute(f"insert into {fq} by name select * from {view}")
+        finally:
+            con.unregister(view)
+        return True, 1, len(df), []
+
+    def stage_backend(self, conn, db: str, schema: str) -> StageBackend:
+        return LocalStageBackend(self.stage_dir, conn)
+
+    def registry(self, db: str, schema: str) -> SchemaRegistry:
+        # sin cache de huellas: la del repo es de Snowflake y el archivo local se recrea seguido
+        key = (db.lower(), schema.lower())
+        with self._lock:
+            if key not in self._registries:
+                self._registries[key] = SchemaRegistry(db, schema, use_cache=False)
+            return self._registries[key]
+
+    def ensure_once(self, conn, key: str, fn: Callable) -> bool:
+        # local la DDL idempotente no cuesta un round trip: siempre se aplica
+        fn(conn)
+        return True
+
+    def log_stats(self) -> None:
+        print(f"[warehouse] duckdb {self.path} | conexiones abiertas={self.metrics['opened']}")
+
+
+# ===================== Backend del proceso =====================
+_WAREHOUSES: Dict[tuple, Warehouse] = {}
+_WAREHOUSES_LOCK = threading.Lock()
+
+
+def get_warehouse(kwargs: Optional[dict] = None) -> Warehouse:
+    """Backend según los kwargs del bloque (`warehouse`, `duckdb_path`); uno por proceso y destino."""
+    kwargs = kwargs or {}
+    backend = str(kwargs.get('warehouse') or os.environ.get('WAREHOUSE_BACKEND') or 'snowflake').lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"warehouse inválido: {backend}")
+    key = (backend, kwargs.get('duckdb_path') if backend == 'duckdb' else None)
+    with _WAREHOUSES_LOCK:
+        if key not in _WAREHOUSES:
+            _WAREHOUSES[key] = (DuckDBWarehouse(kwargs.get('duckdb_path')) if backend == 'duckdb'
+                                else SnowflakeWarehouse())
+        return _WAREHOUSES[key]
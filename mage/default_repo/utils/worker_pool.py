@@ -0,0 +1,106 @@
+"""
+Pool de workers para procesar particiones (service_type, year, month) en paralelo.
+
+Cada hilo abre (de forma perezosa) su propia conexión con `conn_factory` y la
+reutiliza para todas las particiones que le toquen; las conexiones de Snowflake
+no son seguras para compartir entre hilos. La función de trabajo recibe
+`(conn, task)` y devuelve un dict de resultado; si lanza una excepción, el error
+queda registrado en el resultado y el resto de particiones sigue su curso.
+"""
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List
+
+
+class _ConnectionRegistry:
+    """Una conexión por hilo + registro de todas para cerrarlas al final."""
+
+    def __init__(self, conn_factory: Callable[[], Any]):
+        self._factory = conn_factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._factory()
+            self._local.conn = conn
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def reset(self):
+        """Descarta la conexión del hilo actual (p.ej. tras un error de red)."""
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            # conexiones del pool: descartar en vez de devolverlas
+            try: getattr(conn, 'discard', conn.close)()
+            except Exception: pass
+            with self._lock:
+                if conn in self._all:
+                    self._all.remove(conn)
+
+    def close_all(self):
+        with self._lock:
+            conns, self._all = self._all, []
+        for c in conns:
+            try: c.close()
+            except Exception: pass
+
+
+def _run_one(registry: _ConnectionRegistry, fn, task) -> Dict[str, Any]:
+    t0 = time.time()
+    try:
+        conn = registry.get()
+        # Cursor de prueba: si la sesión murió, reconectar una vez
+        try:
+            conn.cursor().close()
+        except Exception:
+            registry.reset()
+            conn = registry.get()
+        result = dict(fn(conn, task) or {})
+    except Exception as e:
+        registry.reset()
+        result = {'errors': [f'{type(e).__name__}: {e}'], 'traceback': traceback.format_exc()}
+    result.setdefault('errors', [])
+    if isinstance(task, dict):
+        # identificar la partición aunque `fn` haya fallado antes de devolver nada
+        for k in ('service_type', 'year', 'month'):
+            result.setdefault(k, task.get(k))
+    result.setdefault('seconds', round(time.time() - t0, 1))
+    result['worker'] = threading.current_thread().name
+    return result
+
+
+def run_partitions(
+    tasks: Iterable[Any],
+    fn: Callable[[Any, Any], Dict[str, Any]],
+    conn_factory: Callable[[], Any],
+    max_workers: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    Ejecuta `fn(conn, task)` para cada task.
+      - max_workers <= 1: secuencial en el hilo actual (una sola conexión).
+      - max_workers  > 1: ThreadPoolExecutor, una conexión por worker.
+    Devuelve la lista de resultados en el mismo orden que `tasks`.
+    """
+    tasks = list(tasks)
+    registry = _ConnectionRegistry(conn_factory)
+    results: List[Dict[str, Any]] = [None] * len(tasks)
+    try:
+        if max_workers <= 1 or len(tasks) <= 1:
+            for i, task in enumerate(tasks):
+                results[i] = _run_one(registry, fn, task)
+        else:
+            workers = min(int(max_workers), len(tasks))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bronze') as ex:
+                futures = {ex.submit(_run_one, registry, fn, task): i for i, task in enumerate(tasks)}
+                for fut in as_completed(futures):
+                    results[futures[fut]] = fut.result()
+    finally:
+        registry.close_all()
+    return results